@@ -0,0 +1,218 @@
+"""Lunile închise din stock_moves / invoice_items: partiții (Postgres) și arhivă (SQLite).
+
+    python -m archive list
+    python -m archive ensure [--ahead 3]            # partițiile lunilor următoare (Postgres)
+    python -m archive archive [--keep-months 12]    # lunile închise -> cold storage
+    python -m archive drop --before 2024-01         # lunile arhivate mai vechi: DROP, nu DELETE
+
+Postgres: o partiție pe lună; arhivarea mută partiția în ARCHIVE_TABLESPACE (rămâne
+atașată, iar interogările pe interval o elimină din plan). SQLite: lunile închise se
+mută în tabele <tabel>_aYYYYMM, incluse în interogări doar când intervalul le atinge
+(history_source). stock_moves se arhivează doar înaintea ultimului checkpoint de stoc.
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime
+
+import pandas as pd
+
+from database import (
+    make_db, init_db, db_connect, db_query, db_exec, adapt_params, placeholder, now_ts, ensure_partitions,
+    PARTITIONED, APP_TZ, month_start, add_months, month_bounds, partition_name,
+)
+
+
+# -------------------- CONFIG --------------------
+ARCHIVE_KEEP_MONTHS = int(os.getenv("ARCHIVE_KEEP_MONTHS", "12"))     # luni păstrate "hot"
+ARCHIVE_TABLESPACE = os.getenv("ARCHIVE_TABLESPACE", "").strip()       # Postgres: tablespace pe disc ieftin
+
+
+def archive_table(table, month):
+    return f"{table}_a{month:%Y%m}"
+
+def _period(month):
+    return f"{month:%Y%m}"
+
+def _month_of(period):
+    return date(int(period[:4]), int(period[4:6]), 1)
+
+def _as_date(v):
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return (v.astimezone(APP_TZ) if v.tzinfo else v).date()
+    return v
+
+def archived_periods(db, table):
+    ph = placeholder(db)
+    df = db_query(db, f"SELECT period FROM archive_log WHERE table_name={ph} ORDER BY period", (table,))
+    return [_month_of(p) for p in df["period"].tolist()]
+
+
+# -------------------- QUERIES --------------------
+def history_source(db, table, start=None, end=None):
+    """Sursa FROM pentru istoricul din [start, end]: tabelul + lunile arhivate atinse de interval (SQLite).
+
+    Pe Postgres e chiar tabelul partiționat (pruning-ul îl face planner-ul din WHERE pe cheie).
+    """
+    if db["type"] == "postgres":
+        return table
+    start, end = _as_date(start), _as_date(end)
+    months = [m for m in archived_periods(db, table)
+              if (start is None or add_months(m, 1) > start) and (end is None or m <= end)]
+    if not months:
+        return table
+    parts = [f"SELECT * FROM {table}"] + [f"SELECT * FROM {archive_table(table, m)}" for m in months]
+    return "(" + " UNION ALL ".join(parts) + ")"
+
+
+# -------------------- MAINTENANCE --------------------
+def cutoff_month(db, table, keep_months=None):
+    """Prima lună care rămâne hot; lunile dinaintea ei sunt închise."""
+    keep = ARCHIVE_KEEP_MONTHS if keep_months is None else keep_months
+    cutoff = add_months(month_start(now_ts().date()), -keep)
+    if table == "stock_moves":
+        # registrul de stoc trebuie să poată reconcilia fără mișcările arhivate
+        cp = db_query(db, "SELECT MAX(taken_at) AS last_taken_at FROM stock_checkpoints").iloc[0]["last_taken_at"]
+        if pd.isna(cp):
+            return None
+        cutoff = min(cutoff, month_start(cp.date()))
+    return cutoff
+
+def _pg_partitions(db, table):
+    df = db_query(db, """
+        SELECT c.relname AS name FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (table,))
+    prefix = f"{table}_p"
+    return sorted(_month_of(n[len(prefix):]) for n in df["name"].tolist() if n.startswith(prefix))
+
+def _log(db, table, month, location):
+    ph = placeholder(db)
+    db_exec(db, f"DELETE FROM archive_log WHERE table_name={ph} AND period={ph}", (table, _period(month)))
+    db_exec(db, f"INSERT INTO archive_log (table_name, period, location, archived_at) VALUES ({ph},{ph},{ph},{ph})",
+            (table, _period(month), location, now_ts()))
+
+def _sqlite_archive_month(db, table, month):
+    """Mută rândurile lunii în <tabel>_aYYYYMM (o tranzacție). Return numărul de rânduri."""
+    key = PARTITIONED[table]
+    lo, hi = adapt_params(db, month_bounds(table, month))
+    dest = archive_table(table, month)
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {dest} AS SELECT * FROM {table} WHERE 0")
+        cur.execute(f"INSERT INTO {dest} SELECT * FROM {table} WHERE {key} >= ? AND {key} < ?", (lo, hi))
+        n = cur.rowcount
+        cur.execute(f"DELETE FROM {table} WHERE {key} >= ? AND {key} < ?", (lo, hi))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return n
+
+def archive_closed(db, keep_months=None):
+    """Mută lunile închise în cold storage. Return [(tabel, YYYYMM, locație)] (gol pe Postgres fără ARCHIVE_TABLESPACE)."""
+    done = []
+    for table, key in PARTITIONED.items():
+        cutoff = cutoff_month(db, table, keep_months)
+        if cutoff is None:
+            continue
+        if db["type"] == "postgres":
+            # fără tablespace de arhivă nu se mută nimic: luna rămâne hot (și nelogată, ca să fie
+            # mutată când ARCHIVE_TABLESPACE e configurat)
+            if not ARCHIVE_TABLESPACE:
+                continue
+            # lunile logate în alt loc (inclusiv "pg_default" de la versiunile vechi) se mută acum
+            log = db_query(db, f"SELECT period, location FROM archive_log WHERE table_name={placeholder(db)}", (table,))
+            already = {_month_of(p) for p, loc in zip(log["period"], log["location"]) if loc == ARCHIVE_TABLESPACE}
+            for month in _pg_partitions(db, table):
+                if month >= cutoff or month in already:
+                    continue
+                db_exec(db, f"ALTER TABLE {partition_name(table, month)} SET TABLESPACE {ARCHIVE_TABLESPACE}")
+                _log(db, table, month, ARCHIVE_TABLESPACE)
+                done.append((table, _period(month), ARCHIVE_TABLESPACE))
+            continue
+
+        lo = db_query(db, f"SELECT MIN({key}) AS first_{key} FROM {table}").iloc[0][f"first_{key}"]
+        if pd.isna(lo):
+            continue
+        month = month_start(lo.date())
+        while month < cutoff:
+            if _sqlite_archive_month(db, table, month):
+                _log(db, table, month, archive_table(table, month))
+                done.append((table, _period(month), archive_table(table, month)))
+            month = add_months(month, 1)
+    return done
+
+def drop_archived(db, before):
+    """Șterge lunile arhivate anterioare lui `before` (DROP TABLE / DETACH + DROP). Return [(tabel, YYYYMM)]."""
+    before = month_start(_as_date(before))
+    ph = placeholder(db)
+    dropped = []
+    for table in PARTITIONED:
+        for month in archived_periods(db, table):
+            if month >= before:
+                continue
+            if db["type"] == "postgres":
+                part = partition_name(table, month)
+                db_exec(db, f"ALTER TABLE {table} DETACH PARTITION {part}")
+                db_exec(db, f"DROP TABLE {part}")
+            else:
+                db_exec(db, f"DROP TABLE IF EXISTS {archive_table(table, month)}")
+            db_exec(db, f"DELETE FROM archive_log WHERE table_name={ph} AND period={ph}", (table, _period(month)))
+            dropped.append((table, _period(month)))
+    return dropped
+
+def overview(db):
+    """Lunile arhivate (archive_log) + pe Postgres partițiile încă hot."""
+    log = db_query(db, "SELECT table_name, period, location, archived_at FROM archive_log ORDER BY table_name, period")
+    if db["type"] != "postgres":
+        return log
+    archived = set(zip(log["table_name"], log["period"]))
+    hot = [{"table_name": t, "period": _period(m), "location": "hot", "archived_at": None}
+           for t in PARTITIONED for m in _pg_partitions(db, t) if (t, _period(m)) not in archived]
+    out = pd.concat([pd.DataFrame(hot, columns=log.columns), log], ignore_index=True)
+    return out.sort_values(["table_name", "period"]).reset_index(drop=True)
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Partiții lunare / arhivarea lunilor închise.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    ens = sub.add_parser("ensure")
+    ens.add_argument("--ahead", type=int, default=None)
+    arc = sub.add_parser("archive")
+    arc.add_argument("--keep-months", type=int, default=None)
+    drp = sub.add_parser("drop")
+    drp.add_argument("--before", required=True, help="YYYY-MM (lunile arhivate anterioare se șterg)")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "list":
+        print(overview(db).to_csv(index=False), end="")
+    elif args.cmd == "ensure":
+        ensure_partitions(db, months_ahead=args.ahead)
+    elif args.cmd == "archive":
+        done = archive_closed(db, args.keep_months)
+        for table, period, location in done:
+            print(f"{table} {period} -> {location}", file=sys.stderr)
+        if not done:
+            hint = " (ARCHIVE_TABLESPACE nu e setat)" if db["type"] == "postgres" and not ARCHIVE_TABLESPACE else ""
+            print(f"nimic de arhivat{hint}", file=sys.stderr)
+    else:
+        for table, period in drop_archived(db, date.fromisoformat(args.before + "-01")):
+            print(f"{table} {period} șters", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
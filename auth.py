@@ -0,0 +1,157 @@
+"""Login: hashing pe un pool de workeri limitat + throttling per user / IP.
+
+PBKDF2 eliberează GIL-ul, deci rulat pe pool nu blochează rerun-urile altor
+sesiuni; pool-ul + coada limitată plafonează CPU-ul consumat de un val de login-uri.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from database import db_query, db_exec
+from statements import render
+from security import hash_password, make_salt, verify_password, needs_rehash
+
+
+# -------------------- CONFIG --------------------
+LOGIN_WORKERS = int(os.getenv("LOGIN_WORKERS", "2"))
+LOGIN_QUEUE = int(os.getenv("LOGIN_QUEUE", "16"))                 # login-uri în așteptare peste care răspundem "busy"
+LOGIN_TIMEOUT = float(os.getenv("LOGIN_TIMEOUT", "10"))
+LOGIN_WINDOW = float(os.getenv("LOGIN_WINDOW", "900"))            # fereastra pentru eșecuri (secunde)
+LOGIN_MAX_FAILS_USER = int(os.getenv("LOGIN_MAX_FAILS_USER", "5"))
+LOGIN_MAX_FAILS_IP = int(os.getenv("LOGIN_MAX_FAILS_IP", "20"))
+LOGIN_MAX_ATTEMPTS_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_IP", "30"))  # încercări / minut / IP (inclusiv reușite)
+
+# salt + hash fix pentru user inexistent: aceeași durată ca un user real (nu dezvăluim ce useri există)
+_DUMMY_SALT = make_salt()
+_DUMMY_HASH = hash_password("dummy-password", _DUMMY_SALT)
+
+
+class SlidingWindow:
+    """Contor de evenimente pe fereastră glisantă, per cheie (număr limitat de chei)."""
+
+    def __init__(self, limit, window, max_keys=10_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        q = self._events.get(key)
+        if q is None:
+            return None
+        while q and q[0] <= now - self.window:
+            q.popleft()
+        if not q:
+            del self._events[key]
+            return None
+        return q
+
+    def retry_after(self, key, now=None):
+        """0 dacă cheia e sub limită, altfel secundele până se eliberează un loc."""
+        if not key or self.limit <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            q = self._prune(key, now)
+            if q is None or len(q) < self.limit:
+                return 0.0
+            return max(0.0, q[-self.limit] + self.window - now)
+
+    def hit(self, key, now=None):
+        if not key:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            q = self._prune(key, now)
+            if q is None:
+                q = self._events[key] = deque()
+            q.append(now)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+class LoginResult:
+    __slots__ = ("user", "reason", "retry_after")
+
+    def __init__(self, user=None, reason="ok", retry_after=0.0):
+        self.user = user
+        self.reason = reason              # ok / unknown_user / bad_password / throttled / busy
+        self.retry_after = retry_after
+
+    @property
+    def ok(self):
+        return self.user is not None
+
+
+_pool = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="login")
+_slots = threading.BoundedSemaphore(LOGIN_WORKERS + LOGIN_QUEUE)
+fails_user = SlidingWindow(LOGIN_MAX_FAILS_USER, LOGIN_WINDOW)
+fails_ip = SlidingWindow(LOGIN_MAX_FAILS_IP, LOGIN_WINDOW)
+attempts_ip = SlidingWindow(LOGIN_MAX_ATTEMPTS_IP, 60.0)
+
+
+def _offload(fn, *args):
+    """Rulează fn pe pool; None dacă pool-ul e plin (val de login-uri)."""
+    if not _slots.acquire(blocking=False):
+        return None
+    try:
+        future = _pool.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    # locul se eliberează când hash-ul chiar s-a terminat, nu la timeout-ul celui care așteaptă:
+    # altfel un val de login-uri ar putea pune în coada pool-ului oricât de multă muncă
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result(timeout=LOGIN_TIMEOUT)
+
+def _upgrade_hash(db, user_id, password):
+    salt = make_salt()
+    ph = hash_password(password, salt)
+    db_exec(db, render(db, "user_password_update"), (salt, ph, int(user_id)))
+
+def _result(reason, user=None, retry_after=0.0):
+    metrics.LOGINS.labels(reason).inc()
+    return LoginResult(user, reason, retry_after)
+
+def login(db, username, password, ip=None):
+    """Autentificare cu throttling. Return LoginResult (user = rândul din users la succes)."""
+    username = (username or "").strip()
+    user_key = username.lower()
+    wait = max(attempts_ip.retry_after(ip), fails_ip.retry_after(ip), fails_user.retry_after(user_key))
+    if wait > 0:
+        return _result("throttled", retry_after=wait)
+    attempts_ip.hit(ip)
+
+    df = db_query(db, render(db, "user_by_username"), (username,))
+    row = df.iloc[0].to_dict() if not df.empty else None
+    salt, stored = (row["salt"], row["pass_hash"]) if row else (_DUMMY_SALT, _DUMMY_HASH)
+
+    try:
+        ok = _offload(verify_password, password, salt, stored)
+    except TimeoutError:
+        ok = None
+    if ok is None:
+        return _result("busy", retry_after=1.0)
+
+    if not row or not ok:
+        fails_user.hit(user_key)
+        fails_ip.hit(ip)
+        return _result("unknown_user" if not row else "bad_password")
+
+    fails_user.reset(user_key)
+    if needs_rehash(stored):
+        # upgrade transparent la algoritmul / iterațiile configurate (nu blochează login-ul dacă eșuează)
+        try:
+            _offload(_upgrade_hash, db, row["id"], password)
+        except Exception:
+            pass
+    return _result("ok", user=row)
@@ -0,0 +1,373 @@
+"""Backup-uri: snapshot-uri online, retenție, restaurare.
+
+    python -m backup snapshot [--label manual]   # snapshot acum
+    python -m backup list
+    python -m backup prune                       # aplică retenția (BACKUP_KEEP_LAST / BACKUP_KEEP_DAILY)
+    python -m backup restore FILE                # restaurează (întâi face un snapshot "pre-restore")
+
+SQLite: copia se face cu sqlite3.Connection.backup în pași de BACKUP_PAGES pagini, cu pauză
+între pași, deci scrierile din aplicație nu așteaptă după backup; rezultatul se verifică
+(quick_check) și se comprimă (.db.gz). Restaurarea copiază înapoi tot prin backup API, într-un
+singur pas, peste baza deschisă. Postgres: pg_dump (format custom) dacă e instalat, altfel
+export CSV al tuturor tabelelor dintr-o singură tranzacție REPEATABLE READ (.tar.gz).
+În aplicație, snapshot-urile programate (BACKUP_INTERVAL_HOURS) și cele manuale rulează pe
+un thread de fundal, câte un job odată.
+"""
+import argparse
+import csv
+import gzip
+import io
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from database import make_db, init_db, db_connect, sqlite_connect, schema_version, now_ts, PG_TABLES, PG_OBJECTS, APP_TZ
+import sync
+
+
+# -------------------- CONFIG --------------------
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))   # 0 = fără snapshot-uri programate
+BACKUP_KEEP_LAST = int(os.getenv("BACKUP_KEEP_LAST", "7"))               # ultimele N, oricum
+BACKUP_KEEP_DAILY = int(os.getenv("BACKUP_KEEP_DAILY", "30"))            # + cel mai nou din fiecare zi, N zile
+BACKUP_PAGES = int(os.getenv("BACKUP_PAGES", "1024"))                    # pagini SQLite copiate per pas
+BACKUP_SLEEP = float(os.getenv("BACKUP_SLEEP", "0.01"))                  # pauză între pași (scrierile trec)
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))         # apoi copia se termină într-un singur pas
+BACKUP_CHECK_SECONDS = 300
+PG_DUMP = os.getenv("PG_DUMP", "pg_dump")
+PG_RESTORE = os.getenv("PG_RESTORE", "pg_restore")
+
+NAME_RE = re.compile(r"^backup-(\d{8}-\d{6})-([a-z-]+)(\.db\.gz|\.dump|\.tar\.gz)$")
+
+
+def _path(name):
+    return os.path.join(BACKUP_DIR, os.path.basename(name))
+
+def _stamp(name):
+    m = NAME_RE.match(os.path.basename(name))
+    return datetime.strptime(m.group(1), "%Y%m%d-%H%M%S").replace(tzinfo=APP_TZ) if m else None
+
+def list_snapshots():
+    """Snapshot-urile din BACKUP_DIR, cele mai noi primele (file, label, created_at, size_mb)."""
+    rows = []
+    if os.path.isdir(BACKUP_DIR):
+        for name in os.listdir(BACKUP_DIR):
+            m = NAME_RE.match(name)
+            if m:
+                rows.append({"file": name, "label": m.group(2), "created_at": _stamp(name),
+                             "size_mb": round(os.path.getsize(_path(name)) / 1e6, 2)})
+    df = pd.DataFrame(rows, columns=["file", "label", "created_at", "size_mb"])
+    return df.sort_values("created_at", ascending=False).reset_index(drop=True)
+
+def latest_snapshot_time():
+    snaps = list_snapshots()
+    return None if snaps.empty else snaps.iloc[0]["created_at"]
+
+
+# -------------------- SNAPSHOT --------------------
+class _Restarted(Exception):
+    pass
+
+def snapshot(db, label="manual", progress=None):
+    """Snapshot complet în BACKUP_DIR; return numele fișierului."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    label = re.sub(r"[^a-z-]", "", label.lower()) or "manual"
+    base = os.path.join(BACKUP_DIR, f"backup-{now_ts():%Y%m%d-%H%M%S}-{label}")
+    if db["type"] == "sqlite":
+        dest = _sqlite_snapshot(db, base + ".db.gz", progress)
+    else:
+        dest = _pg_snapshot(db, base, progress)
+    return os.path.basename(dest)
+
+def _sqlite_snapshot(db, dest, progress=None):
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=BACKUP_DIR)
+    os.close(fd)
+    try:
+        src, dst = sqlite_connect(db["path"]), sqlite3.connect(tmp)
+        try:
+            seen = {"remaining": None, "restarts": 0}
+
+            def step(status, remaining, total):
+                # între pași sursa nu e blocată; dacă altă conexiune scrie, SQLite reia copia de la capăt
+                if seen["remaining"] is not None and remaining > seen["remaining"]:
+                    seen["restarts"] += 1
+                    if seen["restarts"] > BACKUP_MAX_RESTARTS:
+                        raise _Restarted()
+                seen["remaining"] = remaining
+                if progress and total:
+                    progress(0.9 * (1 - remaining / total))
+
+            try:
+                src.backup(dst, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, progress=step)
+            except _Restarted:
+                # scrieri prea dese: un singur pas (scrierile așteaptă cât durează copia)
+                src.backup(dst)
+            ok = dst.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
+        if ok != "ok":
+            raise RuntimeError(f"Copia nu trece quick_check: {ok}")
+        with open(tmp, "rb") as f, gzip.open(dest + ".part", "wb", compresslevel=6) as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        os.replace(dest + ".part", dest)
+    finally:
+        for p in (tmp, dest + ".part"):
+            if os.path.exists(p):
+                os.remove(p)
+    if progress:
+        progress(1.0)
+    return dest
+
+def _pg_tables():
+    return list(PG_TABLES) + ["schema_version"]
+
+def _pg_snapshot(db, base, progress=None):
+    exe = shutil.which(PG_DUMP)
+    if exe:
+        dest = base + ".dump"
+        subprocess.run([exe, "--format=custom", "--no-owner", "--file", dest + ".part", "--dbname", db["url"]],
+                       check=True, capture_output=True)
+        os.replace(dest + ".part", dest)
+        if progress:
+            progress(1.0)
+        return dest
+
+    # fără pg_dump: date CSV per tabel, schema o recreează init_db la restaurare
+    dest = base + ".tar.gz"
+    tables = _pg_tables()
+    conn = db_connect(db)
+    try:
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with conn.cursor() as cur, tarfile.open(dest + ".part", "w:gz") as tar:
+            for i, table in enumerate(tables):
+                with tempfile.TemporaryFile() as f:
+                    cur.copy_expert(f"COPY (SELECT * FROM {table}) TO STDOUT WITH CSV HEADER", f)
+                    info = tarfile.TarInfo(f"{table}.csv")
+                    info.size = f.tell()
+                    info.mtime = int(time.time())
+                    f.seek(0)
+                    tar.addfile(info, f)
+                if progress:
+                    progress((i + 1) / len(tables))
+        conn.rollback()
+    finally:
+        conn.close()
+    os.replace(dest + ".part", dest)
+    return dest
+
+
+# -------------------- RETENTION --------------------
+def prune(keep_last=None, keep_daily=None):
+    """Șterge snapshot-urile în afara retenției; return numele șterse."""
+    keep_last = BACKUP_KEEP_LAST if keep_last is None else keep_last
+    keep_daily = BACKUP_KEEP_DAILY if keep_daily is None else keep_daily
+    snaps = list_snapshots()
+    if snaps.empty:
+        return []
+    keep = set(snaps["file"].head(keep_last))
+    since = now_ts() - timedelta(days=keep_daily)
+    days = set()
+    for file, created in zip(snaps["file"], snaps["created_at"]):
+        if created >= since and created.date() not in days:
+            days.add(created.date())
+            keep.add(file)
+    removed = [f for f in snaps["file"] if f not in keep]
+    for f in removed:
+        os.remove(_path(f))
+    return removed
+
+
+# -------------------- RESTORE --------------------
+def restore(db, name, progress=None):
+    """Restaurează snapshot-ul `name` peste baza curentă (după un snapshot "pre-restore")."""
+    path = _path(name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if db["type"] == "sqlite" and not path.endswith(".db.gz"):
+        raise ValueError("Snapshot-ul nu e de SQLite.")
+    if db["type"] == "postgres" and path.endswith(".db.gz"):
+        raise ValueError("Snapshot-ul nu e de Postgres.")
+
+    snapshot(db, label="pre-restore")
+    if progress:
+        progress(0.3)
+    if path.endswith(".db.gz"):
+        _sqlite_restore(db, path)
+    elif path.endswith(".dump"):
+        _pg_dump_restore(db, path)
+    else:
+        _pg_csv_restore(db, path)
+    # snapshot mai vechi: migrările îl aduc la schema curentă
+    init_db(db)
+    sync.reset_remote()
+    if progress:
+        progress(1.0)
+
+def _sqlite_restore(db, path):
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=BACKUP_DIR)
+    os.close(fd)
+    try:
+        with gzip.open(path, "rb") as f, open(tmp, "wb") as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        src = sqlite3.connect(tmp)
+        try:
+            ok = src.execute("PRAGMA quick_check").fetchone()[0]
+            if ok != "ok":
+                raise RuntimeError(f"Snapshot corupt: {ok}")
+            dst = sqlite_connect(db["path"])
+            try:
+                # un singur pas: conexiunile deschise văd fie baza veche, fie cea restaurată
+                src.backup(dst)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+    finally:
+        os.remove(tmp)
+
+def _pg_dump_restore(db, path):
+    # pg_restore --clean nu poate șterge indexurile partițiilor (depind de indexul părintelui):
+    # tabelele aplicației se șterg explicit (cu partițiile), apoi dump-ul le recreează;
+    # la fel funcțiile change_log / obiectele modului hibrid (altfel CREATE FUNCTION / SEQUENCE din dump eșuează)
+    conn = db_connect(db)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {', '.join(_pg_tables())} CASCADE")
+            for obj in PG_OBJECTS + sync.PG_OBJECTS:
+                kind, name = obj.split(" ", 1)
+                cur.execute(f"DROP {kind} IF EXISTS {name} CASCADE")
+        conn.commit()
+    finally:
+        conn.close()
+    subprocess.run([shutil.which(PG_RESTORE) or PG_RESTORE, "--no-owner", "--single-transaction",
+                    "--dbname", db["url"], path], check=True, capture_output=True)
+
+def _pg_csv_restore(db, path):
+    with tarfile.open(path, "r:gz") as tar:
+        members = {m.name[:-4]: m for m in tar.getmembers() if m.name.endswith(".csv")}
+        version = list(csv.reader(io.TextIOWrapper(tar.extractfile(members["schema_version"]), "utf-8")))[1:]
+        if max((int(v[0]) for v in version), default=0) != schema_version(db):
+            raise ValueError("Snapshot-ul e de la altă versiune de schemă; folosește pg_dump / pg_restore.")
+        tables = [t for t in PG_TABLES if t in members]
+        conn = db_connect(db)
+        try:
+            with conn.cursor() as cur:
+                # rândurile copiate nu intră din nou în change_log / client_balances (ambele vin din snapshot)
+                cur.execute("SET LOCAL app.change_log = 'off'")
+                cur.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+                for table in tables:
+                    f = io.TextIOWrapper(tar.extractfile(members[table]), "utf-8", newline="")
+                    cols = next(csv.reader([f.readline()]))
+                    cur.copy_expert(f"COPY {table} ({', '.join(cols)}) FROM STDIN WITH CSV", f)
+                    if "id" in cols:
+                        cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1), "
+                                    f"MAX(id) IS NOT NULL) FROM {table}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+# -------------------- BACKGROUND JOBS --------------------
+_job = {"state": "idle", "kind": None, "progress": 0.0, "message": "", "file": None, "started": None, "finished": None}
+_job_lock = threading.Lock()
+
+def job_status():
+    with _job_lock:
+        return dict(_job)
+
+def start_job(db, kind, name=None, label="manual", after=None):
+    """Pornește pe un thread de fundal un "snapshot" sau "restore"; False dacă rulează deja un job."""
+    with _job_lock:
+        if _job["state"] == "running":
+            return False
+        _job.update(state="running", kind=kind, progress=0.0, message="", file=name, started=now_ts(), finished=None)
+    threading.Thread(target=_run_job, args=(db, kind, name, label, after), daemon=True, name=f"backup-{kind}").start()
+    return True
+
+def _set_progress(p):
+    with _job_lock:
+        _job["progress"] = p
+
+def _run_job(db, kind, name, label, after):
+    try:
+        if kind == "snapshot":
+            name = snapshot(db, label=label, progress=_set_progress)
+            prune()
+        else:
+            restore(db, name, progress=_set_progress)
+        if after:
+            after()
+        state, message = "done", ""
+    except Exception as e:
+        state, message = "error", str(e)
+    with _job_lock:
+        _job.update(state=state, message=message, file=name, finished=now_ts())
+
+def start_scheduler(db, interval_hours=None):
+    """Thread care face un snapshot "auto" când cel mai nou e mai vechi de `interval_hours` (0 = oprit)."""
+    hours = BACKUP_INTERVAL_HOURS if interval_hours is None else interval_hours
+    if hours <= 0:
+        return None
+
+    def loop():
+        while True:
+            try:
+                last = latest_snapshot_time()
+                if last is None or now_ts() - last >= timedelta(hours=hours):
+                    start_job(db, "snapshot", label="auto")
+            except Exception:
+                pass
+            time.sleep(BACKUP_CHECK_SECONDS)
+
+    th = threading.Thread(target=loop, daemon=True, name="backup-scheduler")
+    th.start()
+    return th
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Backup-uri: snapshot, listare, retenție, restaurare.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    snap = sub.add_parser("snapshot")
+    snap.add_argument("--label", default="manual")
+    sub.add_parser("list")
+    sub.add_parser("prune")
+    rst = sub.add_parser("restore")
+    rst.add_argument("file", help="numele fișierului din BACKUP_DIR")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "snapshot":
+        print(snapshot(db, label=args.label))
+        for f in prune():
+            print(f"{f} șters (retenție)", file=sys.stderr)
+    elif args.cmd == "list":
+        print(list_snapshots().to_csv(index=False), end="")
+    elif args.cmd == "prune":
+        for f in prune():
+            print(f"{f} șters", file=sys.stderr)
+    else:
+        restore(db, args.file)
+        print(f"restaurat din {args.file}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""Load test: N utilizatori concurenți (ca mai multe sesiuni Streamlit într-un proces).
+
+    python -m bench.load --sqlite /tmp/load.db --users 8 --duration 30 --out load.json
+
+Fiecare utilizator virtual rulează în buclă fluxuri realiste pe logica de business:
+login, căutare produs, FACTURA, consum piese pe fișă, rapoarte. Ca în UI, stocul
+e citit la randarea paginii (snapshot) și folosit la scriere după un "think time".
+Raportul conține throughput, latențe p50/p95/p99 pe flux, erorile (inclusiv numere
+de factură duplicate) și update-urile de stoc pierdute pe produsele "hot".
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+import reports
+import auth
+from business import search_products, list_products, create_invoice, consume_part, create_service_order, apply_stock_move
+from database import db_query, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASS
+from bench.run import percentile, volumes, _git_rev
+from bench.seed import seed, add_db_args, add_volume_args, db_from_args, DEFAULT_VOLUMES
+
+
+DEFAULT_MIX = "login=1,search=4,invoice=2,consume=2,reports=1"
+HOT_STOCK = 1_000_000.0   # stoc mare pe produsele hot ca să nu apară "stoc insuficient"
+
+
+def classify_error(e):
+    msg = str(e).lower()
+    if "unique" in msg or "duplicate key" in msg:
+        return "duplicate_number"
+    if "locked" in msg or "busy" in msg:
+        return "db_locked"
+    if "deadlock" in msg or "could not serialize" in msg:
+        return "serialization"
+    return type(e).__name__
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.consumed = {}   # product_id -> cantitate scăzută cu succes (SALE + SERVICE_USE)
+
+    def ok(self, flow, seconds):
+        with self.lock:
+            self.latencies.setdefault(flow, []).append(seconds)
+
+    def err(self, flow, kind):
+        with self.lock:
+            key = f"{flow}:{kind}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def took(self, pid, qty):
+        with self.lock:
+            self.consumed[pid] = self.consumed.get(pid, 0.0) + qty
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, uid, db, stats, mix, hot, deadline, think, rnd_seed, so_code):
+        super().__init__(name=f"vu-{uid}", daemon=True)
+        self.db, self.stats, self.hot, self.deadline, self.think = db, stats, hot, deadline, think
+        self.flows = [f for f, w in mix for _ in range(w)]
+        self.rnd = random.Random(rnd_seed)
+        self.so_code = so_code
+        self.ip = f"10.0.0.{uid % 250 + 1}"
+
+    def pause(self):
+        if self.think:
+            time.sleep(self.rnd.uniform(0, self.think))
+
+    # -------------------- FLOWS --------------------
+    def flow_login(self):
+        res = auth.login(self.db, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASS, ip=self.ip)
+        if not res.ok:
+            raise RuntimeError(res.reason)
+
+    def flow_search(self):
+        search_products(self.db, self.rnd.choice(["display", "bater", "B-00", "cablu", "iphone"]))
+
+    def flow_invoice(self):
+        dfp = list_products(self.db)                      # randarea paginii Facturi
+        pids = self.rnd.sample(self.hot, k=min(len(self.hot), self.rnd.randint(1, 3)))
+        lines = []
+        for pid in pids:
+            r = dfp[dfp.id == pid].iloc[0]
+            lines.append({"item_type": "PRODUCT", "product_id": pid, "description": r["name"], "qty": 1.0,
+                          "unit_price": float(r["sale_price"]), "cost_price": float(r["purchase_price"])})
+        self.pause()                                       # utilizatorul completează coșul
+        create_invoice(self.db, "FACTURA", "LOAD", date.today(), None, 19.0, 0.0, "", pd.DataFrame(lines), stock_df=dfp)
+        for pid in pids:
+            self.stats.took(pid, 1.0)
+
+    def flow_consume(self):
+        dfp = list_products(self.db)                      # randarea paginii Service
+        pid = self.rnd.choice(self.hot)
+        cur = float(dfp[dfp.id == pid]["stock"].values[0])
+        self.pause()
+        consume_part(self.db, self.so_code, pid, 1.0, "load test", cur_stock=cur)
+        self.stats.took(pid, 1.0)
+
+    def flow_reports(self):
+        end = date.today()
+        inv, items = reports.load_report(self.db, end.replace(day=1), end)
+        reports.summarize_report(inv, items)
+        reports.moves_summary(self.db)
+        reports.low_stock_report(self.db, 100)
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            flow = self.rnd.choice(self.flows)
+            t0 = time.perf_counter()
+            try:
+                getattr(self, "flow_" + flow)()
+            except Exception as e:
+                self.stats.err(flow, classify_error(e))
+            else:
+                self.stats.ok(flow, time.perf_counter() - t0)
+
+
+def prepare(db, hot_n):
+    """Alege produsele hot, le setează stoc mare și creează fișa de service folosită la consum."""
+    hot = [int(x) for x in db_query(db, f"SELECT id FROM products ORDER BY id LIMIT {int(hot_n)}")["id"].tolist()]
+    for pid in hot:
+        apply_stock_move(db, pid, "ADJ", HOT_STOCK, "load test")
+    so_code = create_service_order(db, None, "Load test", "", "load test", 0, "")
+    return hot, so_code
+
+def stock_integrity(db, hot, consumed):
+    ids = ",".join(str(p) for p in hot)
+    cur = db_query(db, f"SELECT id, stock FROM products WHERE id IN ({ids})")
+    lost, affected = 0.0, 0
+    for _, r in cur.iterrows():
+        expected = HOT_STOCK - consumed.get(int(r["id"]), 0.0)
+        diff = float(r["stock"]) - expected     # > 0: scăderi pierdute (last-write-wins)
+        if abs(diff) > 1e-9:
+            affected += 1
+            lost += diff
+    return {"hot_products": len(hot), "products_with_drift": affected, "lost_stock_updates": lost,
+            "successful_decrements": sum(consumed.values())}
+
+def summarize(stats, elapsed):
+    flows = {}
+    total = 0
+    for flow, samples in sorted(stats.latencies.items()):
+        samples.sort()
+        total += len(samples)
+        flows[flow] = {
+            "ok": len(samples),
+            "throughput_per_s": len(samples) / elapsed,
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+            "max": samples[-1],
+        }
+    errors = dict(sorted(stats.errors.items()))
+    return {
+        "elapsed_s": elapsed,
+        "ops_ok": total,
+        "ops_failed": sum(errors.values()),
+        "throughput_per_s": total / elapsed if elapsed else 0.0,
+        "flows": flows,
+        "errors": errors,
+        "duplicate_number_errors": sum(v for k, v in errors.items() if k.endswith(":duplicate_number")),
+    }
+
+def parse_mix(text):
+    out = []
+    for part in text.split(","):
+        name, _, w = part.partition("=")
+        if not hasattr(VirtualUser, "flow_" + name.strip()):
+            raise SystemExit(f"flux necunoscut: {name}")
+        out.append((name.strip(), int(w or 1)))
+    return out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Load test multi-sesiune pe logica de business.")
+    add_db_args(p)
+    add_volume_args(p)
+    p.add_argument("--users", type=int, default=8)
+    p.add_argument("--duration", type=float, default=30.0, help="secunde")
+    p.add_argument("--think", type=float, default=0.05, help="think time maxim între citire și scriere (secunde)")
+    p.add_argument("--hot-products", type=int, default=20)
+    p.add_argument("--mix", default=DEFAULT_MIX)
+    p.add_argument("--out", default=None)
+    args = p.parse_args(argv)
+
+    db = db_from_args(args)
+    try:
+        empty = volumes(db)["products"] == 0
+    except Exception:
+        empty = True
+    if empty:
+        print(f"seeded: {seed(db, **{k: getattr(args, k) for k in DEFAULT_VOLUMES}, days=args.days, seed=args.seed)}", file=sys.stderr)
+
+    mix = parse_mix(args.mix)
+    hot, so_code = prepare(db, args.hot_products)
+    stats = Stats()
+    t0 = time.monotonic()
+    deadline = t0 + args.duration
+    users = [VirtualUser(i, db, stats, mix, hot, deadline, args.think, args.seed + i, so_code) for i in range(args.users)]
+    for u in users:
+        u.start()
+    for u in users:
+        u.join()
+    elapsed = time.monotonic() - t0
+
+    out = {
+        "meta": {"git_rev": _git_rev(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "engine": db["type"],
+                 "users": args.users, "duration_s": args.duration, "think_s": args.think, "mix": args.mix},
+        "summary": summarize(stats, elapsed),
+        "stock": stock_integrity(db, hot, stats.consumed),
+    }
+    s = out["summary"]
+    print(f"ops={s['ops_ok']} ({s['throughput_per_s']:.1f}/s) failed={s['ops_failed']} "
+          f"dup_numbers={s['duplicate_number_errors']} lost_stock={out['stock']['lost_stock_updates']}", file=sys.stderr)
+    text = json.dumps(out, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Măsoară hot path-urile aplicației și scrie rezultatele ca JSON.
+
+Cazuri: dashboard, product_picker, invoice_create, report_1y, csv_export, pdf_render,
+fetch_rows / fetch_columnar (același export prin db_query vs db_frame; memoria
+DataFrame-urilor apare în "memory"), replenish (sugestiile de reaprovizionare, fără cache),
+scan_lookup (1000 de coduri scanate, 10% necunoscute), stock_moves (100 mișcări IN / OUT;
+pe Postgres prin statement-uri pregătite, PG_PREPARE=0 pentru comparație), efactura (XML-urile
+FACTURA din ultimele 30 de zile, validate pe schemă, într-un singur proces).
+Cu --baseline compară cu un rezultat anterior și iese cu cod 1 dacă mediana
+unui caz a crescut peste --threshold (ex: 1.25 = +25%).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+import efactura
+import reports
+import replenish
+from business import list_products, product_label, create_invoice, compute_invoice_totals, lookup_code, apply_stock_move
+from database import init_db, db_query, db_frame
+from pdf_invoice import build_invoice_pdf
+from bench.seed import seed, add_db_args, add_volume_args, db_from_args, DEFAULT_VOLUMES
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))]
+
+def measure(fn, repeat=5, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "n": len(samples),
+        "min": samples[0],
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 0.95),
+        "mean": statistics.fmean(samples),
+        "max": samples[-1],
+    }
+
+
+# -------------------- CASES --------------------
+def case_dashboard(db):
+    def run():
+        reports.dashboard_counts(db)
+        reports.low_stock(db, 50)
+        reports.recent_service_orders(db, 10)
+        reports.recent_invoices(db, 10)
+    return run
+
+def case_product_picker(db, labels=200):
+    # interogarea + format_func pentru opțiunile randate (selectbox-ul formatează toate opțiunile)
+    def run():
+        dfp = list_products(db)
+        fmt = product_label(dfp)
+        for pid in dfp["id"].tolist()[:labels]:
+            fmt(pid)
+    return run
+
+def case_invoice_create(db):
+    top = db_query(db, "SELECT id, name, sale_price, purchase_price FROM products ORDER BY stock DESC LIMIT 3")
+    items = pd.DataFrame([
+        {"item_type": "PRODUCT", "product_id": int(r["id"]), "description": r["name"], "qty": 1.0,
+         "unit_price": float(r["sale_price"]), "cost_price": float(r["purchase_price"])}
+        for _, r in top.iterrows()
+    ] + [{"item_type": "LABOR", "product_id": None, "description": "Manoperă", "qty": 1.0, "unit_price": 150.0, "cost_price": 0.0}])
+
+    def run():
+        create_invoice(db, "FACTURA", "BENCH", date.today(), None, 19.0, 0.0, "", items)
+    return run
+
+def case_stock_moves(db, n=100):
+    pids = db_query(db, f"SELECT id FROM products ORDER BY stock DESC LIMIT {int(n)}")["id"].astype(int).tolist()
+
+    def run():
+        # perechi IN / OUT: stocul rămâne același după fiecare rulare
+        for i in range(n):
+            apply_stock_move(db, pids[i // 2 % len(pids)], "IN" if i % 2 == 0 else "OUT", 1.0, "bench")
+    return run
+
+def case_report_1y(db):
+    def run():
+        end = date.today()
+        inv, items = reports.load_report(db, end - timedelta(days=365), end)
+        reports.summarize_report(inv, items)
+        reports.moves_summary(db)
+        reports.low_stock_report(db, 100)
+    return run
+
+def case_csv_export(db):
+    def run():
+        reports.export_csv(db, "stoc_moves")
+    return run
+
+def case_fetch_rows(db):
+    def run():
+        db_query(db, reports.export_sql(db, "stoc_moves"))
+    return run
+
+def case_fetch_columnar(db):
+    def run():
+        db_frame(db, reports.export_sql(db, "stoc_moves"))
+    return run
+
+def case_replenish(db):
+    # recalcul complet (cache golit) pe tot catalogul
+    def run():
+        replenish._cache.clear()
+        replenish.forecast(db)
+    return run
+
+def case_scan_lookup(db, n=1000):
+    # n scanări (SKU existente + coduri necunoscute) prin dict-ul din proces
+    skus = db_query(db, f"SELECT sku FROM products ORDER BY id DESC LIMIT {int(n)}")["sku"].tolist()
+    codes = skus[: n - n // 10] + [f"NOPE-{i}" for i in range(n // 10)]
+    lookup_code(db, codes[0])
+
+    def run():
+        for c in codes:
+            lookup_code(db, c)
+    return run
+
+def case_pdf_render(db):
+    items = [{"item_type": "PRODUCT", "product_id": i, "description": f"Piesă test {i}", "qty": 1.0 + i % 3,
+              "unit_price": 10.0 * i, "cost_price": 5.0 * i} for i in range(1, 13)]
+    invoice = {"type": "FACTURA", "series": "BENCH", "number": 1, "invoice_date": str(date.today()),
+               "vat_percent": 19.0, "discount_percent": 0.0, "notes": "benchmark"}
+    client = {"name": "Client Bench", "address": "Str. Test 1", "phone": "0700000000", "email": "b@example.ro"}
+    totals = compute_invoice_totals(pd.DataFrame(items), 19.0, 0.0)
+
+    def run():
+        build_invoice_pdf(invoice, client, items, totals)
+    return run
+
+def case_efactura(db, days=30):
+    # firma din bench nu are județ configurat: RO-CJ dacă lipsește COMPANY_COUNTY
+    efactura.COMPANY_COUNTY = efactura.COMPANY_COUNTY or "RO-CJ"
+    end = date.today()
+    start = end - timedelta(days=days)
+    out_dir = tempfile.mkdtemp(prefix="bench-efactura-")
+
+    def run():
+        out = efactura.export_period(db, start, end, out_dir, workers=1)
+        if out["invalid"]:
+            name, errors = out["invalid"][0]
+            raise RuntimeError(f"e-Factura: {len(out['invalid'])} facturi invalide, ex. {name}: {'; '.join(errors)}")
+    return run
+
+CASES = {
+    "dashboard": case_dashboard,
+    "product_picker": case_product_picker,
+    "invoice_create": case_invoice_create,
+    "stock_moves": case_stock_moves,
+    "report_1y": case_report_1y,
+    "csv_export": case_csv_export,
+    "pdf_render": case_pdf_render,
+    "fetch_rows": case_fetch_rows,
+    "fetch_columnar": case_fetch_columnar,
+    "replenish": case_replenish,
+    "scan_lookup": case_scan_lookup,
+    "efactura": case_efactura,
+}
+
+
+# -------------------- RUN / COMPARE --------------------
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).decode().strip()
+    except Exception:
+        return None
+
+def volumes(db):
+    out = {}
+    for t in ["products", "clients", "service_orders", "invoices", "invoice_items", "stock_moves"]:
+        out[t] = int(db_query(db, f"SELECT COUNT(*) AS n FROM {t}").iloc[0]["n"])
+    return out
+
+def frame_memory(db):
+    sql = reports.export_sql(db, "stoc_moves")
+    return {
+        "fetch_rows": int(db_query(db, sql).memory_usage(deep=True).sum()),
+        "fetch_columnar": int(db_frame(db, sql).memory_usage(deep=True).sum()),
+    }
+
+def run_all(db, cases=None, repeat=5):
+    results = {}
+    for name in cases or CASES:
+        results[name] = measure(CASES[name](db), repeat=repeat)
+        print(f"{name:16s} median={results[name]['median']*1000:9.2f} ms  p95={results[name]['p95']*1000:9.2f} ms", file=sys.stderr)
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, r in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("median"):
+            continue
+        ratio = r["median"] / old["median"]
+        if ratio > threshold:
+            regressions[name] = round(ratio, 3)
+    return regressions
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark hot paths (rezultate JSON).")
+    add_db_args(p)
+    add_volume_args(p)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--cases", default=",".join(CASES), help="listă separată prin virgulă")
+    p.add_argument("--out", default=None, help="fișier JSON (implicit stdout)")
+    p.add_argument("--baseline", default=None, help="JSON anterior pentru comparație")
+    p.add_argument("--threshold", type=float, default=1.25)
+    args = p.parse_args(argv)
+
+    db = db_from_args(args)
+    init_db(db)   # bază existentă, creată cu o schemă mai veche: migrările
+    seeded = None
+    try:
+        empty = volumes(db)["products"] == 0
+    except Exception:
+        empty = True
+    if empty:
+        seeded = seed(db, **{k: getattr(args, k) for k in DEFAULT_VOLUMES}, days=args.days, seed=args.seed)
+        print(f"seeded: {seeded}", file=sys.stderr)
+
+    out = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "engine": db["type"],
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+        },
+        "volumes": volumes(db),
+        "seed": seeded,
+        "results": run_all(db, [c for c in args.cases.split(",") if c], args.repeat),
+        "memory": frame_memory(db),
+    }
+
+    rc = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            out["regressions"] = compare(out["results"], json.load(f), args.threshold)
+        rc = 1 if out["regressions"] else 0
+
+    text = json.dumps(out, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Generator de date sintetice: produse, clienți, fișe service, facturi cu linii, mișcări stoc."""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from database import make_db, init_db, ensure_partitions, db_connect, db_query, adapt_params, placeholder, now_ts
+import costing
+from statements import render
+
+
+DEFAULT_VOLUMES = {
+    "products": 5000,
+    "clients": 2000,
+    "service_orders": 3000,
+    "invoices": 20000,
+    "stock_moves": 60000,   # total țintă (SALE din facturi + IN/OUT/SERVICE_USE)
+}
+
+CATEGORIES = ["Piese", "Display", "Baterii", "Consumabile", "Accesorii", "Cabluri", "Carcase"]
+DEVICES = ["Laptop ASUS", "Laptop Lenovo", "Telefon Samsung", "iPhone 11", "iPhone 13", "Tabletă", "Imprimantă", "PC"]
+STATUSES = ["NOU", "IN_LUCRU", "GATA", "LIVRAT"]
+TECHNICIANS = ["andrei", "mihai", "ioana", "radu"]
+# localitate, județ (ISO 3166-2:RO) pentru cumpărătorii din e-Factura
+CITIES = [("Cluj-Napoca", "RO-CJ"), ("Iași", "RO-IS"), ("Timișoara", "RO-TM"), ("Brașov", "RO-BV"),
+          ("Constanța", "RO-CT"), ("SECTOR1", "RO-B"), ("SECTOR3", "RO-B"), ("SECTOR6", "RO-B")]
+INV_TYPES = ["FACTURA", "FACTURA", "BON", "DEVIZ"]
+
+
+def add_volume_args(p):
+    for k, v in DEFAULT_VOLUMES.items():
+        p.add_argument("--" + k.replace("_", "-"), type=int, default=v, dest=k)
+    p.add_argument("--days", type=int, default=365, help="istoricul generat (zile în urmă)")
+    p.add_argument("--seed", type=int, default=42)
+
+def add_db_args(p):
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite")
+    p.add_argument("--pg", default=None, help="URL Postgres (local)")
+
+def db_from_args(args):
+    if args.pg:
+        return make_db(url=args.pg)
+    return make_db(url="", path=args.sqlite or "bench.db")
+
+
+def _bulk(conn, db, table, cols, rows, batch=5000):
+    ph = ",".join([placeholder(db)] * len(cols))
+    sql = f"INSERT INTO {table} ({','.join(cols)}) VALUES ({ph})"
+    cur = conn.cursor()
+    for i in range(0, len(rows), batch):
+        cur.executemany(sql, [adapt_params(db, r) for r in rows[i:i + batch]])
+    conn.commit()
+
+def _ids(db, table):
+    return [int(x) for x in db_query(db, f"SELECT id FROM {table} ORDER BY id")["id"].tolist()]
+
+
+def seed(db, products=5000, clients=2000, service_orders=3000, invoices=20000, stock_moves=60000, days=365, seed=42):
+    """Populează `db` (schema creată cu init_db). Return dict cu volumele inserate și durata."""
+    rnd = random.Random(seed)
+    t0 = time.perf_counter()
+    init_db(db)
+    now = now_ts()
+    start = now - timedelta(days=days)
+    ensure_partitions(db, since=start.date())
+
+    def rand_dt():
+        return start + timedelta(seconds=rnd.randrange(days * 86400))
+
+    conn = db_connect(db)
+    try:
+        # products (stocul final se calculează după mișcări)
+        prod_rows = []
+        for i in range(products):
+            cost = round(rnd.uniform(2, 800), 2)
+            prod_rows.append([f"B-{i:06d}", f"{rnd.choice(CATEGORIES)} {rnd.choice(DEVICES)} #{i}", rnd.choice(CATEGORIES), "buc",
+                              cost, round(cost * rnd.uniform(1.2, 2.0), 2), 0.0, float(rnd.choice([0, 0, 2, 5, 10])),
+                              f"R{rnd.randint(1, 20)}-{rnd.choice('ABCDE')}{rnd.randint(1, 9)}", start])
+        _bulk(conn, db, "products", ["sku", "name", "category", "unit", "purchase_price", "sale_price", "stock", "min_stock", "location", "created_at"], prod_rows)
+        pids = _ids(db, "products")
+        pinfo = {pid: row for pid, row in zip(pids, prod_rows)}
+
+        # rafturile R1..R10 în depozitul D1, restul în D2; fiecare produs stă în raftul lui
+        codes = sorted({row[8] for row in prod_rows})
+        _bulk(conn, db, "stock_locations", ["code", "name", "warehouse", "active", "created_at"],
+              [[c, f"Raft {c}", "D1" if int(c[1:].split("-")[0]) <= 10 else "D2", 1, start] for c in codes])
+        loc_ids = dict(zip(db_query(db, "SELECT code FROM stock_locations ORDER BY id")["code"],
+                           _ids(db, "stock_locations")))
+        home = {pid: loc_ids[pinfo[pid][8]] for pid in pids}
+
+        # o treime firme (CUI, cu RO dacă plătesc TVA), restul persoane fizice (CNP)
+        client_rows = []
+        for i in range(clients):
+            city, county = rnd.choice(CITIES)
+            tax_id = (rnd.choice(["RO", ""]) + str(rnd.randint(10**6, 10**8)) if i % 3 == 0
+                      else f"{rnd.choice('12')}{rnd.randint(10**11, 10**12 - 1)}")
+            client_rows.append([f"Client {i}", f"07{rnd.randint(10000000, 99999999)}", f"client{i}@example.ro",
+                                f"Str. {i}, {city}", "", rand_dt(), tax_id, city, county])
+        _bulk(conn, db, "clients", ["name", "phone", "email", "address", "notes", "created_at", "tax_id", "city", "county"], client_rows)
+        cids = _ids(db, "clients")
+
+        moves = []   # (product_id, move_type, qty, note, ref_doc, created_at_dt)
+
+        so_rows, so_events = [], []
+        for i in range(service_orders):
+            dt = rand_dt()
+            # istoricul fișei: NOU la creare, apoi pașii până la statusul curent (pentru aging / turnaround)
+            status, tech = rnd.choice(STATUSES), rnd.choice(TECHNICIANS)
+            events, at = [(None, "NOU", None, dt)], dt
+            for prev, nxt in zip(STATUSES, STATUSES[1:STATUSES.index(status) + 1]):
+                at = min(at + timedelta(hours=rnd.randint(1, 96)), now)
+                events.append((prev, nxt, tech, at))
+            so_rows.append([f"SO-{dt.year}-B{i:06d}", rnd.choice(cids) if cids and rnd.random() < 0.8 else None,
+                            rnd.choice(DEVICES), f"SN{rnd.randint(10**6, 10**7)}", "nu pornește", status,
+                            float(rnd.choice([50, 100, 150, 200, 300])), "", dt, at, at, tech if status != "NOU" else None])
+            so_events.append(events)
+            for _ in range(rnd.choice([0, 1, 1, 2])):
+                moves.append((rnd.choice(pids), "SERVICE_USE", 1.0, "Consum service", so_rows[-1][0], dt))
+        _bulk(conn, db, "service_orders", ["code", "client_id", "device", "serial", "issue", "status", "labor_price", "notes",
+                                           "created_at", "updated_at", "status_at", "technician"], so_rows)
+        so_ids = _ids(db, "service_orders")[-service_orders:] if service_orders else []
+        _bulk(conn, db, "service_order_events", ["service_order_id", "from_status", "to_status", "technician", "changed_by", "changed_at"],
+              [[so_id, prev, nxt, tech, "seed", at] for so_id, events in zip(so_ids, so_events) for prev, nxt, tech, at in events])
+
+        inv_rows, inv_items = [], []
+        for n in range(1, invoices + 1):
+            dt = rand_dt()
+            typ = rnd.choice(INV_TYPES)
+            # FACTURA are mereu cumpărător (e-Factura); BON / DEVIZ pot fi anonime
+            client = rnd.choice(cids) if cids and (typ == "FACTURA" or rnd.random() < 0.5) else None
+            vat, disc = 19.0, float(rnd.choice([0, 0, 0, 5, 10]))
+            lines = []
+            for _ in range(rnd.randint(1, 8)):
+                if rnd.random() < 0.25:
+                    lines.append(["LABOR", None, "Manoperă service", float(rnd.choice([0.5, 1, 2])), 150.0, 0.0])
+                else:
+                    pid = rnd.choice(pids)
+                    p = pinfo[pid]
+                    q = float(rnd.randint(1, 3))
+                    lines.append(["PRODUCT", pid, p[1], q, p[5], p[4]])
+                    if typ in ("FACTURA", "BON"):
+                        moves.append((pid, "SALE", q, f"Vânzare {typ}", f"BN-{n}", dt))
+            # totalul ca la create_invoice (compute_invoice_totals): din el pornesc soldurile clienților
+            after = sum(l[3] * l[4] for l in lines) * (1 - disc / 100.0)
+            inv_rows.append(["BN", n, dt.date(), client, typ, vat, disc, "", dt, round(after * (1 + vat / 100.0), 2)])
+            inv_items.append(lines)
+        _bulk(conn, db, "invoices", ["series", "number", "invoice_date", "client_id", "type", "vat_percent", "discount_percent", "notes", "created_at", "total"], inv_rows)
+        inv_ids = _ids(db, "invoices")[-invoices:] if invoices else []
+        item_rows = [[iid] + line + [inv[2]] for iid, inv, lines in zip(inv_ids, inv_rows, inv_items) for line in lines]
+        _bulk(conn, db, "invoice_items", ["invoice_id", "item_type", "product_id", "description", "qty", "unit_price", "cost_price", "invoice_date"], item_rows)
+
+        # completează până la volumul țintă cu recepții (IN) și ieșiri (OUT)
+        while len(moves) < stock_moves:
+            kind = "IN" if rnd.random() < 0.7 else "OUT"
+            moves.append((rnd.choice(pids), kind, float(rnd.randint(1, 20) if kind == "IN" else rnd.randint(1, 3)),
+                          "Recepție" if kind == "IN" else "Ieșire", None, rand_dt()))
+        moves.sort(key=lambda m: m[5])
+
+        # sold inițial = cât să nu scadă niciodată sub 0; intră în registru ca ADJ la început
+        running, low = {}, {}
+        for pid, kind, q, *_ in moves:
+            running[pid] = running.get(pid, 0.0) + (q if kind == "IN" else -q)
+            low[pid] = min(low.get(pid, 0.0), running[pid])
+        opening = {pid: float(-low.get(pid, 0.0) + rnd.randint(0, 10)) for pid in pids}
+        moves = [(pid, "ADJ", opening[pid], "Stoc inițial", None, start) for pid in pids if opening[pid] > 0] + moves
+        cur = conn.cursor()
+        cur.executemany(render(db, "product_stock_set"), [(opening[pid] + running.get(pid, 0.0), pid) for pid in pids])
+        conn.commit()
+        _bulk(conn, db, "stock_balances", ["product_id", "location_id", "qty", "min_qty"],
+              [[pid, home[pid], opening[pid] + running.get(pid, 0.0), pinfo[pid][7]] for pid in pids])
+
+        _bulk(conn, db, "stock_moves", ["product_id", "move_type", "qty", "delta", "note", "ref_doc", "created_at", "location_id"],
+              [[pid, kind, q, q if kind in ("IN", "ADJ") else -q, note, ref, dt, home[pid]] for pid, kind, q, note, ref, dt in moves])
+    finally:
+        conn.close()
+    # mișcările sunt inserate fără cost: straturile FIFO și costul vânzărilor se reconstruiesc din istoric
+    layers = costing.recompute(db)["layers"]
+
+    return {
+        "products": products, "clients": clients, "service_orders": service_orders,
+        "service_order_events": sum(len(e) for e in so_events),
+        "invoices": invoices, "invoice_items": len(item_rows), "stock_moves": len(moves), "cost_layers": layers,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Populează o bază SQLite/Postgres cu date sintetice.")
+    add_db_args(p)
+    add_volume_args(p)
+    args = p.parse_args(argv)
+    db = db_from_args(args)
+    out = seed(db, **{k: getattr(args, k) for k in DEFAULT_VOLUMES}, days=args.days, seed=args.seed)
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import metrics
+from database import db_query, db_exec, pooled_connection, placeholder, now_ts, DEFAULT_LOCATION
+from statements import execute, execute_many, inserted_id, query_rows, render
+from costing import cost_move
+from periods import closed_period
+
+
+class StockError(ValueError):
+    """Mutație de stoc respinsă (stoc insuficient / produs inexistent)."""
+
+
+class ClosedPeriodError(ValueError):
+    """Document datat într-o lună închisă (periods.py)."""
+
+
+# codurile scanate (SKU + product_barcodes) -> product_id, ținute în proces; reîncărcate după TTL
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", "300"))
+
+
+# -------------------- BUSINESS HELPERS --------------------
+def next_service_code(db):
+    year = datetime.now().year
+    prefix = f"SO-{year}-"
+    df = db_query(db, render(db, "service_code_last"), (prefix + "%",))
+    if df.empty:
+        return f"{prefix}0001"
+    last = df.iloc[0]["code"]
+    m = re.search(r"(\d+)$", last)
+    n = int(m.group(1)) + 1 if m else 1
+    return f"{prefix}{n:04d}"
+
+def money(x):
+    return f"{float(x):,.2f} lei".replace(",", " ")
+
+def compute_invoice_totals(items_df, vat_percent, discount_percent):
+    subtotal = float((items_df["qty"] * items_df["unit_price"]).sum()) if not items_df.empty else 0.0
+    discount = subtotal * (float(discount_percent) / 100.0)
+    after_discount = subtotal - discount
+    vat = after_discount * (float(vat_percent) / 100.0)
+    total = after_discount + vat
+
+    # profit estimat (doar pentru PRODUCT dacă avem cost_price)
+    profit = 0.0
+    if not items_df.empty:
+        for _, r in items_df.iterrows():
+            line_rev = float(r["qty"]) * float(r["unit_price"])
+            line_cost = float(r.get("cost_price", 0.0)) * float(r["qty"])
+            if r["item_type"] == "PRODUCT":
+                profit += (line_rev - line_cost)
+            else:
+                profit += line_rev  # manopera ~ profit brut
+
+    return {
+        "subtotal": subtotal,
+        "discount": discount,
+        "after_discount": after_discount,
+        "vat": vat,
+        "total": total,
+        "profit_est": profit - (profit * (float(discount_percent)/100.0)),  # aproximare simplă
+    }
+
+
+# -------------------- PRODUCTS / CLIENTS --------------------
+def list_products(db):
+    return db_query(db, "SELECT id, sku, name, stock, unit, sale_price, purchase_price FROM products ORDER BY name ASC")
+
+def product_label(dfp):
+    # format_func pentru selectbox-urile de produse
+    return lambda x: f"{dfp[dfp.id==x]['name'].values[0]} ({dfp[dfp.id==x]['sku'].values[0] or 'no-sku'})"
+
+def location_label(dfl):
+    # format_func pentru selectbox-urile de locații (None = automat); cu sold dacă dfl vine din stock_by_location
+    key = "location_id" if "location_id" in dfl.columns else "id"
+    def fmt(x):
+        if x is None:
+            return "Automat"
+        r = dfl[dfl[key]==x].iloc[0]
+        return f"{r['code']} — {r['name']}" + (f" ({r['qty']:g})" if "qty" in dfl.columns else "")
+    return fmt
+
+def search_products(db, search="", cat="", only_low=False, limit=500):
+    sql = "SELECT * FROM products WHERE 1=1"
+    params = []
+    if search.strip():
+        if db["type"]=="postgres":
+            sql += " AND (COALESCE(sku,'') ILIKE %s OR name ILIKE %s)"
+            params += [f"%{search.strip()}%", f"%{search.strip()}%"]
+        else:
+            sql += " AND (COALESCE(sku,'') LIKE ? OR name LIKE ?)"
+            params += [f"%{search.strip()}%", f"%{search.strip()}%"]
+    if cat.strip():
+        if db["type"]=="postgres":
+            sql += " AND category ILIKE %s"
+            params += [f"%{cat.strip()}%"]
+        else:
+            sql += " AND category LIKE ?"
+            params += [f"%{cat.strip()}%"]
+    if only_low:
+        sql += " AND min_stock>0 AND stock<=min_stock"
+
+    sql += f" ORDER BY id DESC LIMIT {int(limit)}"
+    return db_query(db, sql, tuple(params))
+
+def add_product(db, sku, name, category, unit, purchase_price, sale_price, stock, min_stock, location):
+    if sku and lookup_code(db, sku) is not None:
+        raise ValueError("SKU-ul e deja folosit (ca SKU sau cod de bare).")
+    t0 = time.perf_counter()
+    try:
+        with pooled_connection(db) as conn:
+            cur = conn.cursor()
+            execute(cur, db, "product_insert", (sku or None, name, category, unit or "buc",
+                                                float(purchase_price), float(sale_price), 0.0, float(min_stock), location, now_ts()))
+            pid = inserted_id(cur, db)
+            # locația de bază (products.location) cu stocul minim al produsului
+            loc = _location_id(cur, db, location)
+            execute(cur, db, "balance_init", (pid, loc, float(min_stock)))
+            # stocul inițial intră în registru ca ADJ, în aceeași tranzacție: products.stock nu există fără mișcarea lui
+            if float(stock) > 0:
+                post_moves(cur, db, [(pid, loc, "ADJ", float(stock), float(stock), "Stoc inițial", None)])
+            conn.commit()
+    finally:
+        metrics.DB_SECONDS.labels("tx", db["type"]).observe(time.perf_counter() - t0)
+    invalidate_codes()
+    return pid
+
+def get_product(db, pid):
+    df = db_query(db, f"SELECT * FROM products WHERE id={placeholder(db)}", (int(pid),))
+    return df.iloc[0].to_dict() if not df.empty else None
+
+
+# -------------------- SCAN (SKU / barcode) --------------------
+_codes = {"key": None, "map": {}, "loaded_at": None}
+_codes_lock = threading.Lock()
+
+def code_map(db):
+    """Dict cod -> product_id (SKU-uri + coduri de bare), reconstruit după SCAN_CACHE_TTL sau invalidate_codes()."""
+    key = db.get("url") or db.get("path")
+    with _codes_lock:
+        # loaded_at None = invalidat (un 0.0 ar trece drept proaspăt cât time.monotonic() < SCAN_CACHE_TTL)
+        if _codes["key"] == key and _codes["loaded_at"] is not None and time.monotonic() - _codes["loaded_at"] < SCAN_CACHE_TTL:
+            return _codes["map"]
+    df = db_query(db, """
+        SELECT sku AS code, id AS product_id FROM products WHERE sku IS NOT NULL
+        UNION ALL
+        SELECT barcode AS code, product_id FROM product_barcodes
+    """)
+    m = dict(zip(df["code"].astype(str), df["product_id"].astype(int)))
+    with _codes_lock:
+        _codes.update(key=key, map=m, loaded_at=time.monotonic())
+    return m
+
+def invalidate_codes():
+    with _codes_lock:
+        _codes["loaded_at"] = None
+
+def lookup_code(db, code):
+    """product_id pentru un SKU / cod de bare scanat sau None. Din dict; la ratare, căutare exactă pe index."""
+    code = (code or "").strip()
+    if not code:
+        return None
+    m = code_map(db)
+    pid = m.get(code)
+    if pid is not None:
+        return pid
+    # scris din alt proces după ultima reîncărcare
+    rows = query_rows(db, "product_lookup", (code, code))
+    if not rows:
+        return None
+    pid = int(rows[0][0])
+    with _codes_lock:
+        _codes["map"][code] = pid
+    return pid
+
+def product_barcodes(db, pid):
+    return db_query(db, f"SELECT barcode, created_at FROM product_barcodes WHERE product_id={placeholder(db)} ORDER BY barcode", (int(pid),))
+
+def add_barcode(db, pid, barcode):
+    barcode = (barcode or "").strip()
+    if not barcode:
+        raise ValueError("Codul de bare e gol.")
+    other = lookup_code(db, barcode)
+    if other is not None:
+        raise ValueError("Codul e deja folosit" + (" de acest produs." if other == int(pid) else " de alt produs."))
+    ph = placeholder(db)
+    db_exec(db, f"INSERT INTO product_barcodes (barcode, product_id, created_at) VALUES ({ph},{ph},{ph})",
+            (barcode, int(pid), now_ts()))
+    invalidate_codes()
+
+def remove_barcode(db, barcode):
+    db_exec(db, f"DELETE FROM product_barcodes WHERE barcode={placeholder(db)}", (barcode,))
+    invalidate_codes()
+
+def list_clients(db):
+    return db_query(db, "SELECT id, name, phone, email, address, tax_id, city, county FROM clients ORDER BY name ASC")
+
+def add_client(db, name, phone="", email="", address="", notes="", tax_id="", city="", county=""):
+    db_exec(db, render(db, "client_insert"), (name, phone, email, address, notes, now_ts(), tax_id, city, county.upper()))
+
+
+# -------------------- LOCATIONS --------------------
+def list_locations(db, active_only=True):
+    return db_query(db, "SELECT id, code, name, warehouse, active FROM stock_locations"
+                        + (" WHERE active=1" if active_only else "") + " ORDER BY warehouse, code")
+
+def add_location(db, code, name="", warehouse=""):
+    if not code.strip():
+        raise ValueError("Codul locației e obligatoriu.")
+    ph = placeholder(db)
+    db_exec(db, f"INSERT INTO stock_locations (code, name, warehouse, active, created_at) VALUES ({ph},{ph},{ph},1,{ph})",
+            (code.strip(), name.strip() or code.strip(), warehouse.strip() or None, now_ts()))
+
+def stock_by_location(db, pid):
+    """Unde e produsul: soldurile pe locații (PK product_id, location_id)."""
+    ph = placeholder(db)
+    return db_query(db, f"""
+        SELECT l.id AS location_id, l.code, l.name, l.warehouse, b.qty, b.min_qty
+        FROM stock_balances b JOIN stock_locations l ON l.id = b.location_id
+        WHERE b.product_id = {ph}
+        ORDER BY b.qty DESC, l.code
+    """, (int(pid),))
+
+def set_location_min(db, pid, location_id, min_qty):
+    ph = placeholder(db)
+    db_exec(db, f"""
+        INSERT INTO stock_balances (product_id, location_id, qty, min_qty) VALUES ({ph},{ph},0,{ph})
+        ON CONFLICT (product_id, location_id) DO UPDATE SET min_qty = excluded.min_qty
+    """, (int(pid), int(location_id), float(min_qty)))
+
+
+# -------------------- STOCK --------------------
+def get_stock(db, pid):
+    df = db_query(db, render(db, "product_stock"), (int(pid),))
+    return float(df.iloc[0]["stock"])
+
+def _location_id(cur, db, code):
+    """Id-ul locației după cod (o creează dacă lipsește); cod gol = DEFAULT_LOCATION."""
+    code = (code or "").strip() or DEFAULT_LOCATION
+    row = execute(cur, db, "location_by_code", (code,)).fetchone()
+    if row is not None:
+        return int(row[0])
+    execute(cur, db, "location_insert", (code, code, now_ts()))
+    return int(execute(cur, db, "location_by_code", (code,)).fetchone()[0])
+
+def _balance(cur, db, pid, location_id):
+    row = execute(cur, db, "balance_get", (pid, location_id)).fetchone()
+    return float(row[0] or 0.0) if row else 0.0
+
+def _split(cur, db, pid, delta, location_id):
+    """[(location_id, delta)]: fără locație, intrările merg în locația de bază a produsului (products.location),
+    ieșirile se iau din locațiile cu stoc, cele mai pline întâi (restul, dacă nu ajunge, din prima)."""
+    if location_id is not None:
+        return [(int(location_id), delta)]
+    if delta >= 0:
+        home = execute(cur, db, "product_location", (pid,)).fetchone()[0]
+        return [(_location_id(cur, db, home), delta)]
+    rows = [(int(loc), float(q or 0.0)) for loc, q in execute(cur, db, "product_balances", (pid,)).fetchall()]
+    if not rows:
+        return [(_location_id(cur, db, None), delta)]
+    return allocate_out(delta, rows)
+
+def allocate_out(delta, balances):
+    """Împarte o ieșire (delta < 0) pe soldurile [(location_id, qty)]: cele mai pline întâi."""
+    rows = sorted(balances, key=lambda r: (-r[1], r[0]))
+    parts, need = {}, -delta
+    for loc, have in rows:
+        take = min(need, max(have, 0.0))
+        if take > 0:
+            parts[loc] = -take
+            need -= take
+        if need <= 0:
+            break
+    if need > 0:
+        parts[rows[0][0]] = parts.get(rows[0][0], 0.0) - need
+    return list(parts.items())
+
+def post_moves(cur, db, moves, unit_cost=None):
+    """Scrie mișcările [(product_id, location_id, move_type, qty, delta, note, ref_doc)] în tranzacția
+    apelantului: sold pe locație + products.stock (relativ, cu delta) + costul FIFO + rândurile din stock_moves.
+
+    `unit_cost` = costul intrărilor (recepție); fără el intrările iau costul ultimului strat.
+    Return costul unitar al fiecărei mișcări (None la TRANSFER).
+    """
+    ts = now_ts()
+    costs, stock = [], {}
+    for pid, _, kind, _, delta, _, _ in moves:
+        if pid not in stock:
+            stock[pid] = float(execute(cur, db, "product_lock", (pid,)).fetchone()[0] or 0.0)
+        costs.append(cost_move(cur, db, pid, kind, delta, ts, stock[pid], unit_cost))
+        stock[pid] += float(delta)
+    execute_many(cur, db, "balance_add", [(pid, loc, delta) for pid, loc, _, _, delta, _, _ in moves])
+    execute_many(cur, db, "stock_update", [(delta, pid) for pid, _, _, _, delta, _, _ in moves])
+    execute_many(cur, db, "move_insert", [(pid, kind, float(qty), delta, note, ref, ts, loc, cost)
+                                          for (pid, loc, kind, qty, delta, note, ref), cost in zip(moves, costs)])
+    return costs
+
+def _lock_product(cur, db, pid):
+    return _lock_products(cur, db, [pid])[pid]
+
+def _lock_products(cur, db, pids):
+    """Blochează produsele până la commit și return {product_id: stoc}; deschide tranzacția (SQLite: BEGIN IMMEDIATE).
+
+    Rândurile produselor rămân blocate până la commit (fără lost updates între sesiuni); toate soldurile
+    pe locații ale produselor se scriu sub același lock. Ordinea după id evită deadlock-urile pe Postgres.
+    """
+    if db["type"] == "sqlite":
+        cur.execute("BEGIN IMMEDIATE")
+    stock = {}
+    for pid in sorted(set(pids)):
+        row = execute(cur, db, "product_lock", (pid,)).fetchone()
+        if row is None:
+            raise StockError(f"Produs inexistent (#{pid}): a fost șters între timp.")
+        stock[pid] = float(row[0] or 0.0)
+    return stock
+
+def _lock_series(cur, db, series):
+    """Următorul număr din serie, citit în tranzacția deschisă de _lock_products și rezervat până la commit.
+
+    SQLite: BEGIN IMMEDIATE ține deja lock-ul de scriere; Postgres: advisory lock pe serie (după
+    produse, ca în ordinea celorlalte tranzacții de stoc), deci și un DEVIZ fără produse așteaptă.
+    """
+    if db["type"] == "postgres":
+        execute(cur, db, "invoice_series_lock", (series,))
+    return int(execute(cur, db, "invoice_next_number", (series,)).fetchone()[0])
+
+def _location_code(cur, db, location_id):
+    row = execute(cur, db, "location_code", (location_id,)).fetchone()
+    return row[0] if row else str(location_id)
+
+def _write_stock_move(db, pid, move_type, qty, note, ref_doc, delta=None, check=True, location_id=None, unit_cost=None):
+    """Stoc (total + sold pe locație) + rând(uri) în stock_moves într-o singură tranzacție.
+
+    delta=None -> ADJ: stocul locației devine `qty` (fără locație: stocul total devine `qty`).
+    Fără locație, ieșirile se împart pe locațiile cu stoc (un rând per locație). Cu check=True
+    o ieșire care ar duce stocul (total sau al locației) sub 0 e respinsă cu StockError.
+    Return stocul total nou.
+    """
+    return _stock_move(db, pid, move_type, qty, note, ref_doc, delta, check, location_id, unit_cost)[0]
+
+def _stock_move(db, pid, move_type, qty, note, ref_doc, delta=None, check=True, location_id=None, unit_cost=None):
+    """Ca `_write_stock_move`; return (stocul total nou, costul FIFO al ieșirii - 0 la intrări)."""
+    pid = int(pid)
+    cogs = 0.0
+    t0 = time.perf_counter()
+    try:
+        with pooled_connection(db) as conn:
+            cur = conn.cursor()
+            before = _lock_product(cur, db, pid)
+            if delta is None:
+                delta = float(qty) - (before if location_id is None else _balance(cur, db, pid, int(location_id)))
+            delta = float(delta)
+            if check and delta < 0 and before + delta < 0:
+                raise StockError("Stoc insuficient.")
+            for loc, d in _split(cur, db, pid, delta, location_id):
+                have = _balance(cur, db, pid, loc)
+                if check and d < 0 and have + d < 0:
+                    raise StockError(f"Stoc insuficient în locația {_location_code(cur, db, loc)} (ai {have}).")
+                cost = post_moves(cur, db, [(pid, loc, move_type, have + d if move_type == "ADJ" else abs(d), d, note, ref_doc)],
+                                  unit_cost=unit_cost)[0]
+                if d < 0 and cost is not None:
+                    cogs += -d * cost
+            conn.commit()
+    finally:
+        metrics.DB_SECONDS.labels("tx", db["type"]).observe(time.perf_counter() - t0)
+    return before + delta, cogs
+
+def transfer_stock(db, pid, from_location, to_location, qty, note=""):
+    """Mută `qty` între două locații (două rânduri TRANSFER: -qty la sursă, +qty la destinație).
+    Stocul total nu se schimbă. Return (soldul sursei, soldul destinației)."""
+    if qty <= 0:
+        raise ValueError("Cantitatea > 0.")
+    if int(from_location) == int(to_location):
+        raise ValueError("Alege locații diferite.")
+    pid, src, dst, qty = int(pid), int(from_location), int(to_location), float(qty)
+    t0 = time.perf_counter()
+    try:
+        with pooled_connection(db) as conn:
+            cur = conn.cursor()
+            _lock_product(cur, db, pid)
+            have = _balance(cur, db, pid, src)
+            if have < qty:
+                metrics.STOCK_CONFLICTS.labels("transfer").inc()
+                raise StockError(f"Stoc insuficient în locația {_location_code(cur, db, src)} (ai {have}).")
+            ref = f"{_location_code(cur, db, src)}->{_location_code(cur, db, dst)}"
+            post_moves(cur, db, [(pid, src, "TRANSFER", qty, -qty, note, ref), (pid, dst, "TRANSFER", qty, qty, note, ref)])
+            out = (have - qty, _balance(cur, db, pid, dst))
+            conn.commit()
+    finally:
+        metrics.DB_SECONDS.labels("tx", db["type"]).observe(time.perf_counter() - t0)
+    return out
+
+def apply_stock_move(db, pid, kind, qty, note="", cur_stock=None, location_id=None, unit_cost=None):
+    """Mișcare manuală IN / OUT / ADJ (ADJ = stoc nou absolut, al locației dacă e dată). Return stocul total nou.
+
+    `unit_cost` = costul unitar al recepției (doar IN); fără el intrarea ia costul ultimului strat FIFO.
+    """
+    if qty <= 0:
+        raise ValueError("Cantitatea > 0.")
+    cur = get_stock(db, pid) if cur_stock is None else float(cur_stock)
+    if kind == "OUT" and qty > cur:
+        metrics.STOCK_CONFLICTS.labels("stock").inc()
+        raise StockError("Stoc insuficient.")
+    delta = {"IN": float(qty), "OUT": -float(qty)}.get(kind)
+    try:
+        return _write_stock_move(db, pid, kind, qty, note, None, delta=delta, location_id=location_id,
+                                 unit_cost=unit_cost if kind == "IN" else None)
+    except StockError:
+        metrics.STOCK_CONFLICTS.labels("stock").inc()
+        raise
+
+def consume_part(db, so_code, pid, qty, note, cur_stock=None, location_id=None):
+    """Consum piesă pe fișa de service (SERVICE_USE), din locația dată sau din cele cu stoc. Return stocul total nou."""
+    cur = get_stock(db, pid) if cur_stock is None else float(cur_stock)
+    if qty <= 0:
+        raise ValueError("Cantitatea trebuie > 0.")
+    if qty > cur:
+        metrics.STOCK_CONFLICTS.labels("service").inc()
+        raise StockError("Stoc insuficient.")
+    try:
+        return _write_stock_move(db, pid, "SERVICE_USE", qty, note, so_code, delta=-float(qty), location_id=location_id)
+    except StockError:
+        metrics.STOCK_CONFLICTS.labels("service").inc()
+        raise
+
+
+# -------------------- SERVICE ORDERS --------------------
+SERVICE_STATUSES = ["NOU", "IN_LUCRU", "GATA", "LIVRAT"]
+
+def create_service_order(db, client_id, device, serial, issue, labor_price, notes, technician=None, user=None):
+    code = next_service_code(db)
+    ts = now_ts()
+    with pooled_connection(db) as conn:
+        cur = conn.cursor()
+        execute(cur, db, "service_order_insert", (code, client_id, device, serial, issue, "NOU", float(labor_price), notes,
+                                                  technician or None, ts, ts, ts))
+        so_id = inserted_id(cur, db)
+        execute(cur, db, "service_event_insert", (so_id, None, "NOU", technician or None, user, ts))
+        conn.commit()
+    return code
+
+def get_service_order(db, so_id):
+    return db_query(db, f"SELECT * FROM service_orders WHERE id={placeholder(db)}", (so_id,)).iloc[0].to_dict()
+
+def update_service_order(db, so_id, status, labor_price, notes, technician=None, user=None):
+    """Salvează fișa; la schimbarea statusului scrie și evenimentul (în aceeași tranzacție)."""
+    ts = now_ts()
+    with pooled_connection(db) as conn:
+        cur = conn.cursor()
+        old_status, old_tech = execute(cur, db, "service_order_lock", (int(so_id),)).fetchone()
+        technician = old_tech if technician is None else (technician or None)
+        execute(cur, db, "service_order_update", (status, float(labor_price), notes, technician, ts, status, ts, int(so_id)))
+        if status != old_status:
+            execute(cur, db, "service_event_insert", (int(so_id), old_status, status, technician, user, ts))
+        conn.commit()
+
+
+# -------------------- INVOICES --------------------
+ITEM_COLUMNS = ["item_type", "product_id", "description", "qty", "unit_price", "cost_price"]
+
+def create_invoice(db, inv_type, series, inv_date, client_id, vat_percent, discount_percent, notes, items_df, stock_df=None):
+    """Creează documentul + liniile; la FACTURA/BON scade stocul (SALE) și pune costul FIFO pe linii (cost_price).
+
+    Totul într-o singură tranzacție, cu produsele blocate: stocul se verifică sub lock (două case nu pot
+    vinde amândouă ultima bucată), iar o eroare pe parcurs anulează tot documentul. Numărul din serie
+    se alocă în aceeași tranzacție (_lock_series), pentru orice tip de document.
+    `stock_df` (id, stock, name) e snapshot-ul de produse din pagină: respingere rapidă, fără tranzacție,
+    pentru produsele din el; verificarea care contează e cea de sub lock. Return dict-ul documentului (cu id și number).
+    """
+    if items_df.empty:
+        raise ValueError("Adaugă cel puțin o linie.")
+    period = closed_period(db, inv_date)
+    if period is not None:
+        raise ClosedPeriodError(f"Luna {period[:4]}-{period[4:]} e închisă: documentele nu mai pot fi datate în ea.")
+
+    t_inv = time.perf_counter()
+    total = round(compute_invoice_totals(items_df, vat_percent, discount_percent)["total"], 2)
+    sale = inv_type in ["FACTURA", "BON"]
+    lines = [(r, None if pd.isna(r["product_id"]) else int(r["product_id"])) for _, r in items_df.iterrows()]
+    sold = {}
+    for r, pid in lines:
+        if sale and r["item_type"] == "PRODUCT":
+            sold[pid] = sold.get(pid, 0.0) + float(r["qty"])
+    names = {}
+    if stock_df is not None:
+        snap = stock_df.set_index("id")
+        names = snap["name"].to_dict()
+        # produsele lipsă din snapshot (adăugate / șterse între timp) se verifică doar sub lock
+        for pid, need in sold.items():
+            if pid in snap.index and need > float(snap.at[pid, "stock"]):
+                metrics.STOCK_CONFLICTS.labels("invoice").inc()
+                raise StockError(f"Stoc insuficient pentru {names[pid]} (ai {float(snap.at[pid, 'stock'])}, ceri {need}).")
+    # antetul + liniile + mișcările SALE + costul FIFO într-o singură tranzacție
+    # (la FACTURA cu client, triggerul actualizează și soldul clientului)
+    t0 = time.perf_counter()
+    try:
+        with pooled_connection(db) as conn:
+            cur = conn.cursor()
+            stock = _lock_products(cur, db, sold)
+            for pid, need in sold.items():
+                if need > stock[pid]:
+                    metrics.STOCK_CONFLICTS.labels("invoice").inc()
+                    name = names.get(pid) or execute(cur, db, "product_name", (pid,)).fetchone()[0]
+                    raise StockError(f"Stoc insuficient pentru {name} (ai {stock[pid]}, ceri {need}).")
+            number = _lock_series(cur, db, series)
+            execute(cur, db, "invoice_insert", (series, int(number), inv_date, client_id, inv_type, float(vat_percent),
+                                                float(discount_percent), notes, now_ts(), total))
+            inv_id = inserted_id(cur, db)
+            execute_many(cur, db, "item_insert", [
+                (inv_id, r["item_type"], pid, r["description"], float(r["qty"]), float(r["unit_price"]),
+                 float(r.get("cost_price", 0.0)), inv_date)
+                for r, pid in lines
+            ])
+            item_ids = [row[0] for row in execute(cur, db, "item_ids", (inv_id, inv_date)).fetchall()]
+
+            costs = []
+            for item_id, (r, pid) in zip(item_ids, lines):
+                if not (sale and r["item_type"] == "PRODUCT"):
+                    continue
+                qty, where = float(r["qty"]), r.get("location_id")
+                where = None if where is None or pd.isna(where) else int(where)
+                cogs = 0.0
+                for loc, d in _split(cur, db, pid, -qty, where):
+                    have = _balance(cur, db, pid, loc)
+                    # fără locație aleasă, ieșirea se împarte pe locațiile cu stoc: ajunge verificarea totalului de mai sus
+                    if where is not None and have + d < 0:
+                        metrics.STOCK_CONFLICTS.labels("invoice").inc()
+                        raise StockError(f"Stoc insuficient în locația {_location_code(cur, db, loc)} (ai {have}, ceri {-d}).")
+                    cost = post_moves(cur, db, [(pid, loc, "SALE", -d, d, f"Vânzare {inv_type}", f"{series}-{number}")])[0]
+                    cogs += -d * (cost or 0.0)
+                if qty > 0:
+                    costs.append((round(cogs / qty, 6), item_id, inv_date))
+            # costul real (FIFO) în locul prețului de achiziție copiat în coș
+            execute_many(cur, db, "item_cost_update", costs)
+            conn.commit()
+    finally:
+        metrics.DB_SECONDS.labels("tx", db["type"]).observe(time.perf_counter() - t0)
+
+    metrics.INVOICE_SECONDS.observe(time.perf_counter() - t_inv)
+    metrics.INVOICES_CREATED.labels(inv_type).inc()
+
+    return {
+        "id": inv_id,
+        "type": inv_type,
+        "series": series,
+        "number": int(number),
+        "invoice_date": str(inv_date),
+        "vat_percent": float(vat_percent),
+        "discount_percent": float(discount_percent),
+        "notes": notes,
+        "total": total,
+    }
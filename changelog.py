@@ -0,0 +1,191 @@
+"""Feed de modificări (CDC) pentru joburile de contabilitate / BI: doar ce s-a schimbat de la ultimul offset.
+
+    python -m changelog read --after 0 [--limit 1000] [--table products]   # JSON lines, offset-ul următor pe stderr
+    python -m changelog read --consumer bi                                # de la offset-ul salvat al consumatorului, apoi îl avansează
+    python -m changelog consumers                                         # offset + întârziere per consumator
+    python -m changelog forget bi                                         # consumator abandonat (nu mai ține jurnalul)
+    python -m changelog compact
+
+change_log e scris de triggere în aceeași tranzacție cu modificarea (vezi CHANGE_LOG_TABLES în
+database.py); fiecare intrare are rândul complet (JSON), deci consumatorii aplică intrările ca
+upsert / delete după (table, row_id). Compactarea: după CHANGELOG_COMPACT_DAYS rămâne doar ultima
+intrare per rând; după CHANGELOG_RETENTION_DAYS intrările citite de toți consumatorii se șterg.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from database import make_db, init_db, db_connect, db_query, db_exec, placeholder, now_ts, APP_TZ, EPOCH_DAY0
+from statements import execute, render
+
+
+# -------------------- CONFIG --------------------
+CHANGELOG_BATCH = int(os.getenv("CHANGELOG_BATCH", "1000"))
+CHANGELOG_COMPACT_DAYS = int(os.getenv("CHANGELOG_COMPACT_DAYS", "7"))        # mai vechi: doar ultima intrare per rând
+CHANGELOG_RETENTION_DAYS = int(os.getenv("CHANGELOG_RETENTION_DAYS", "90"))   # mai vechi + citite de toți: șterse
+CHANGELOG_HORIZON_WAIT = float(os.getenv("CHANGELOG_HORIZON_WAIT", "2"))      # secunde: cât încearcă o citire orizontul (Postgres)
+
+
+def _iso(v):
+    return v.isoformat() if hasattr(v, "isoformat") else v
+
+def _row(db, data):
+    if db["type"] == "postgres":
+        return data      # JSONB -> dict, timestamp-urile deja ISO
+    # SQLite: *_at = epoch, *_date = zile de la 1970-01-01 -> ISO, ca pe Postgres
+    row = json.loads(data) if data else {}
+    for k, v in row.items():
+        if isinstance(v, (int, float)) and k.endswith("_at"):
+            row[k] = datetime.fromtimestamp(v, APP_TZ).isoformat()
+        elif isinstance(v, int) and k.endswith("_date"):
+            row[k] = (EPOCH_DAY0 + timedelta(days=v)).isoformat()
+    return row
+
+
+# -------------------- READ --------------------
+def _horizon(conn):
+    """Postgres: id-ul până la care toate tranzacțiile care au scris în change_log s-au încheiat; None dacă
+    n-a putut fi stabilit în CHANGELOG_HORIZON_WAIT.
+
+    id-urile BIGSERIAL se comit în altă ordine: un id mai mic comis după citire ar rămâne în urma
+    offset-ului. Triggerul ține un advisory lock partajat până la commit; cititorul doar încearcă lock-ul
+    exclusiv (pg_try_*, fără să intre în coadă), deci scrierile nu așteaptă niciodată după un consumator.
+    """
+    deadline = time.monotonic() + CHANGELOG_HORIZON_WAIT
+    cur = conn.cursor()
+    while True:
+        cur.execute("SELECT pg_try_advisory_xact_lock(hashtext('change_log'))")
+        if cur.fetchone()[0]:
+            cur.execute("SELECT last_value, is_called FROM change_log_id_seq")
+            last, called = cur.fetchone()
+            conn.commit()
+            return int(last) if called else 0
+        conn.rollback()
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.02)
+
+def read_changes(db, after=0, limit=None, tables=None):
+    """Intrările cu id > `after`, în ordine, cel mult `limit`. Return (intrări, offset-ul următor).
+
+    Fiecare intrare: {"id", "table", "row_id", "op" (I/U/D), "changed_at", "row"}. Pe Postgres doar până la
+    orizontul sigur (_horizon): o tranzacție lungă în curs amână intrările de după ea la citirea următoare.
+    """
+    ph = placeholder(db)
+    limit = CHANGELOG_BATCH if limit is None else int(limit)
+    where, params = f"id > {ph}", [int(after)]
+    if tables:
+        where += f" AND table_name IN ({', '.join([ph] * len(tables))})"
+        params += list(tables)
+    conn = db_connect(db)
+    try:
+        if db["type"] == "postgres":
+            horizon = _horizon(conn)
+            if horizon is None:
+                return [], int(after)
+            where += f" AND id <= {ph}"
+            params.append(horizon)
+        cur = conn.cursor()
+        cur.execute(f"SELECT id, table_name, row_id, op, changed_at, row_data FROM change_log WHERE {where} "
+                    f"ORDER BY id LIMIT {limit}", tuple(params))
+        rows = cur.fetchall()
+        conn.rollback()
+    finally:
+        conn.close()
+    out = []
+    for id_, table, row_id, op, changed_at, data in rows:
+        if changed_at is not None:
+            changed_at = datetime.fromtimestamp(changed_at, APP_TZ) if db["type"] == "sqlite" else changed_at.astimezone(APP_TZ)
+        out.append({"id": int(id_), "table": table, "row_id": int(row_id), "op": op,
+                    "changed_at": _iso(changed_at), "row": _row(db, data)})
+    return out, (out[-1]["id"] if out else int(after))
+
+
+# -------------------- CONSUMERS --------------------
+def consumer_offset(db, name):
+    df = db_query(db, render(db, "consumer_offset"), (name,))
+    return int(df.iloc[0]["last_id"]) if not df.empty else 0
+
+def commit_offset(db, name, last_id):
+    """Salvează offset-ul consumatorului (după ce a procesat intrările până la `last_id` inclusiv)."""
+    db_exec(db, render(db, "consumer_save"), (name, int(last_id), now_ts()))
+
+def consumers(db):
+    """Consumatorii, cu offset-ul și câte intrări au de citit (name, last_id, updated_at, pending)."""
+    return db_query(db, render(db, "consumer_pending"))
+
+def forget(db, name):
+    db_exec(db, render(db, "consumer_forget"), (name,))
+
+
+# -------------------- COMPACTION --------------------
+def compact(db, compact_days=None, retention_days=None):
+    """Ține jurnalul mărginit. Return (intrări înlocuite de una mai nouă, intrări expirate) șterse."""
+    now = now_ts()
+    compact_before = now - timedelta(days=CHANGELOG_COMPACT_DAYS if compact_days is None else compact_days)
+    expire_before = now - timedelta(days=CHANGELOG_RETENTION_DAYS if retention_days is None else retention_days)
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        # rândul complet e în ultima intrare: cele mai vechi pentru același rând nu mai aduc nimic
+        compacted = execute(cur, db, "log_compact", (compact_before,)).rowcount
+        # expirate: doar ce au citit toți consumatorii înregistrați
+        cur.execute("SELECT MIN(last_id) FROM change_log_consumers")
+        min_read = cur.fetchone()[0]
+        if min_read is None:
+            expired = execute(cur, db, "log_expire", (expire_before,)).rowcount
+        else:
+            expired = execute(cur, db, "log_expire_read", (expire_before, int(min_read))).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return compacted, expired
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Feed de modificări (change_log): citire după offset, consumatori, compactare.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    rd = sub.add_parser("read")
+    rd.add_argument("--after", type=int, default=None, help="ultimul id deja citit")
+    rd.add_argument("--consumer", default=None, help="citește de la offset-ul salvat și îl avansează")
+    rd.add_argument("--limit", type=int, default=None)
+    rd.add_argument("--table", action="append", default=None, help="doar tabelele date (repetabil)")
+    rd.add_argument("--no-commit", action="store_true", help="cu --consumer: nu avansa offset-ul")
+    sub.add_parser("consumers")
+    fg = sub.add_parser("forget")
+    fg.add_argument("name")
+    sub.add_parser("compact")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "read":
+        after = args.after if args.after is not None else consumer_offset(db, args.consumer) if args.consumer else 0
+        changes, offset = read_changes(db, after, args.limit, args.table)
+        for c in changes:
+            sys.stdout.write(json.dumps(c, ensure_ascii=False, default=str) + "\n")
+        sys.stdout.flush()
+        if args.consumer and not args.no_commit and changes:
+            commit_offset(db, args.consumer, offset)
+        print(f"{len(changes)} modificări, offset {offset}", file=sys.stderr)
+    elif args.cmd == "consumers":
+        print(consumers(db).to_csv(index=False), end="")
+    elif args.cmd == "forget":
+        forget(db, args.name)
+    else:
+        compacted, expired = compact(db)
+        print(f"compactate {compacted}, expirate {expired}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
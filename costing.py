@@ -0,0 +1,249 @@
+"""Costul stocului (FIFO): un strat de cost per intrare, consumat de ieșiri în ordinea intrării.
+
+    python -m costing recompute          # straturi + costuri reconstruite din tot istoricul stock_moves (backfill)
+    python -m costing valuation          # valoarea stocului per produs (CSV)
+
+Intrările (IN, ADJ / inventar în plus) deschid un strat cu costul recepției (altfel costul ultimului
+strat, apoi purchase_price). Ieșirile (SALE, SERVICE_USE, OUT, ADJ în minus) consumă straturile cele mai
+vechi; costul unitar rezultat rămâne pe mișcare (stock_moves.unit_cost) și, la vânzare, în
+invoice_items.cost_price. TRANSFER nu schimbă costul. Fiecare strat se epuizează o singură dată,
+deci costarea e O(1) amortizat per mișcare.
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from database import make_db, init_db, db_connect, db_query, adapt_params, now_ts
+from archive import history_source, archived_periods, archive_table
+from statements import execute, execute_many
+
+
+EPS = 1e-9
+
+
+# -------------------- INCREMENTAL --------------------
+def _fallback(cur, db, pid):
+    # costul ultimului strat (și epuizat), altfel prețul de achiziție din fișa produsului
+    row = execute(cur, db, "layer_last", (pid,)).fetchone()
+    if row is not None:
+        return float(row[0])
+    row = execute(cur, db, "product_cost", (pid,)).fetchone()
+    return float(row[0] or 0.0) if row else 0.0
+
+def cost_move(cur, db, pid, kind, delta, ts, stock, unit_cost=None):
+    """Costul unitar al mișcării, în tranzacția apelantului (cu produsul blocat). None la TRANSFER.
+
+    Intrare: strat nou cu `unit_cost` (sau costul de rezervă); dacă `stock` (stocul total de dinainte)
+    e negativ, stratul acoperă întâi lipsa. Ieșire: consumă straturile deschise, cele mai vechi întâi;
+    ce depășește straturile (vânzare fără stoc) se costă la costul de rezervă.
+    """
+    delta = float(delta)
+    if kind == "TRANSFER" or abs(delta) < EPS:
+        return None
+    if delta > 0:
+        cost = _fallback(cur, db, pid) if unit_cost is None else float(unit_cost)
+        # unitățile vândute fără stoc au fost deja costate: ies din stratul nou fără cost
+        left = delta - min(delta, max(0.0, -float(stock)))
+        execute(cur, db, "layer_insert", (pid, delta, left, cost, ts))
+        return cost
+    need, total = -delta, 0.0
+    while need > EPS:
+        layers = execute(cur, db, "layer_open", (pid,)).fetchall()
+        if not layers:
+            break
+        for layer_id, left, cost in layers:
+            take = min(need, float(left))
+            total += take * float(cost)
+            need -= take
+            left = float(left) - take
+            execute(cur, db, "layer_consume", (left if left > EPS else 0.0, layer_id))
+            if need <= EPS:
+                break
+    if need > EPS:
+        total += need * _fallback(cur, db, pid)
+    return total / -delta
+
+
+# -------------------- RECOMPUTE --------------------
+def fifo_frame(moves, products):
+    """FIFO vectorizat pe tot istoricul. Același rezultat ca `cost_move` aplicat mișcare cu mișcare.
+
+    moves: id, product_id, move_type, delta, unit_cost (stocat), created_at; products: id, stock, purchase_price.
+    Return (mișcările fără TRANSFER cu unit_cost / cogs calculate, straturile cu qty_left).
+    Stocul de dinaintea primei mișcări păstrate (luni șterse, date vechi) intră ca strat de deschidere
+    la purchase_price (id = 0, created_at = None).
+    """
+    prods = products.set_index("id")
+    m = moves[moves["move_type"] != "TRANSFER"].copy()
+    m["delta"] = m["delta"].astype(float).fillna(0.0)
+    net = m.groupby("product_id")["delta"].sum().reindex(prods.index, fill_value=0.0)
+    opening = (prods["stock"].astype(float).fillna(0.0) - net).clip(lower=0.0)
+    opening = opening[opening > EPS]
+    m = pd.concat([pd.DataFrame({
+        "id": 0, "product_id": opening.index, "move_type": "OPEN", "delta": opening.values,
+        "unit_cost": prods.loc[opening.index, "purchase_price"].astype(float).fillna(0.0).values, "created_at": None,
+    }), m], ignore_index=True)
+    m = m.sort_values(["product_id", "id"], kind="stable").reset_index(drop=True)
+    g = m["product_id"]
+
+    inb = m["delta"] > EPS
+    q_in = m["delta"].where(inb, 0.0)
+    q_out = (-m["delta"]).where(~inb, 0.0).clip(lower=0.0)
+    # costul ultimei intrări până la rândul curent (inclusiv), altfel purchase_price
+    pp = g.map(prods["purchase_price"].astype(float).fillna(0.0))
+    last = m["unit_cost"].astype(float).where(inb).groupby(g).ffill().fillna(pp)
+    cost_in = last.where(inb, 0.0)
+
+    # p = cât s-a consumat din straturi; ieșirile fără stoc se acoperă din intrările următoare
+    I = q_in.groupby(g).cumsum()
+    U = q_out.groupby(g).cumsum()
+    p = np.minimum(U, I)
+    p_prev = p.groupby(g).shift(fill_value=0.0)
+    V = (q_in * cost_in).groupby(g).cumsum()
+
+    # costul primelor p unități = interpolare liniară pe (intrări cumulate, cost cumulat)
+    C = np.zeros(len(m))
+    C_prev = np.zeros(len(m))
+    inb_arr, I_arr, V_arr, p_arr, pp_arr = inb.to_numpy(), I.to_numpy(), V.to_numpy(), p.to_numpy(), p_prev.to_numpy()
+    for idx in g.groupby(g).indices.values():
+        ii = idx[inb_arr[idx]]
+        xs, ys = np.r_[0.0, I_arr[ii]], np.r_[0.0, V_arr[ii]]
+        C[idx] = np.interp(p_arr[idx], xs, ys)
+        C_prev[idx] = np.interp(pp_arr[idx], xs, ys)
+
+    short = q_out - (p - p_prev)
+    m["cogs"] = (C - C_prev) + short.clip(lower=0.0) * last
+    m["unit_cost"] = np.where(inb, cost_in, np.where(q_out > EPS, m["cogs"] / q_out.where(q_out > EPS, 1.0), np.nan))
+    m.loc[inb, "cogs"] = 0.0
+
+    p_final = p.groupby(g).transform("last")
+    layers = m.loc[inb, ["product_id", "delta", "unit_cost", "created_at"]].rename(columns={"delta": "qty"})
+    start = (I - q_in)[inb]
+    layers["qty_left"] = (I[inb] - np.maximum(p_final[inb], start)).clip(lower=0.0).clip(upper=layers["qty"])
+    layers.loc[layers["qty_left"] <= EPS, "qty_left"] = 0.0
+    return m[m["move_type"] != "OPEN"], layers
+
+def _changed(new, old):
+    new = pd.to_numeric(pd.Series(new), errors="coerce").to_numpy(float)
+    old = pd.to_numeric(pd.Series(old), errors="coerce").to_numpy(float)
+    return ~(np.isclose(new, old, rtol=0, atol=1e-6) | (np.isnan(new) & np.isnan(old)))
+
+def _ts(db, v):
+    # created_at citit din DB (epoch int pe SQLite); stratul de deschidere n-are mișcare -> acum
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return adapt_params(db, (now_ts(),))[0]
+    return int(v) if db["type"] == "sqlite" else v
+
+def recompute(db):
+    """Reconstruiește straturile + costul fiecărei mișcări + cost_price pe liniile vândute din tot istoricul.
+
+    Pentru backfill (date vechi fără costuri), după importuri / sincronizare sau corecturi de cost la recepții.
+    Return dict cu numărul de mișcări, straturi și linii de document actualizate.
+    """
+    # lunile arhivate se citesc înainte de tranzacție: pe SQLite, după primele scrieri
+    # lock-ul ei blochează orice altă conexiune, inclusiv citirea din archive_log
+    moves_src, items_src = history_source(db, "stock_moves"), history_source(db, "invoice_items")
+    archived = {t: archived_periods(db, t) if db["type"] == "sqlite" else [] for t in ("stock_moves", "invoice_items")}
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        if db["type"] == "sqlite":
+            cur.execute("BEGIN IMMEDIATE")
+        else:
+            # așteaptă mișcările în curs (scriu straturi) și le oprește pe cele noi până la commit
+            cur.execute("LOCK TABLE cost_layers IN EXCLUSIVE MODE")
+        cur.execute(f"SELECT id, product_id, move_type, delta, unit_cost, created_at, ref_doc "
+                    f"FROM {moves_src} sm")
+        moves = pd.DataFrame(cur.fetchall(), columns=["id", "product_id", "move_type", "delta", "unit_cost", "created_at", "ref_doc"])
+        cur.execute("SELECT id, stock, purchase_price FROM products")
+        products = pd.DataFrame(cur.fetchall(), columns=["id", "stock", "purchase_price"])
+        stored = moves.set_index("id")["unit_cost"]
+        costed, layers = fifo_frame(moves.drop(columns="ref_doc"), products)
+
+        cur.execute("DELETE FROM cost_layers")
+        execute_many(cur, db, "layer_insert", [(int(r.product_id), float(r.qty), float(r.qty_left), float(r.unit_cost),
+                                                _ts(db, r.created_at)) for r in layers.itertuples()])
+
+        upd = costed[_changed(costed["unit_cost"].to_numpy(), stored.reindex(costed["id"]).to_numpy())]
+        rows = [(None if pd.isna(r.unit_cost) else float(r.unit_cost), int(r.id), r.created_at) for r in upd.itertuples()]
+        _update_history(cur, db, "stock_moves", "unit_cost", rows, archived["stock_moves"])
+
+        # vânzările: costul FIFO ajunge pe liniile documentului (ref_doc = SERIE-NUMĂR)
+        sales = costed[costed["move_type"] == "SALE"].merge(moves[["id", "ref_doc"]], on="id")
+        sales["qty"] = -sales["delta"]
+        sold = sales.groupby(["ref_doc", "product_id"])[["qty", "cogs"]].sum().reset_index()
+        cur.execute("SELECT id, series, number FROM invoices")
+        inv = pd.DataFrame(cur.fetchall(), columns=["invoice_id", "series", "number"])
+        inv["ref_doc"] = inv["series"].astype(str) + "-" + inv["number"].astype(str)
+        cur.execute(f"SELECT id, invoice_id, product_id, invoice_date, cost_price "
+                    f"FROM {items_src} it WHERE item_type = 'PRODUCT'")
+        items = pd.DataFrame(cur.fetchall(), columns=["id", "invoice_id", "product_id", "invoice_date", "cost_price"]).dropna(subset=["product_id"])
+        items["product_id"] = items["product_id"].astype(int)
+        items = items.merge(inv[["invoice_id", "ref_doc"]], on="invoice_id").merge(sold, on=["ref_doc", "product_id"])
+        items["new_cost"] = (items["cogs"] / items["qty"].where(items["qty"] > EPS)).round(6)
+        items = items[items["new_cost"].notna().to_numpy() & _changed(items["new_cost"], items["cost_price"])]
+        _update_history(cur, db, "invoice_items", "cost_price",
+                        [(float(r.new_cost), int(r.id), r.invoice_date) for r in items.itertuples()], archived["invoice_items"])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return {"moves": len(rows), "layers": len(layers), "items": len(items)}
+
+def _update_history(cur, db, table, column, rows, archived=()):
+    """rows = [(valoare, id, cheia de partiție)]; pe SQLite și în lunile `archived` (id-urile sunt unice)."""
+    if not rows:
+        return
+    if db["type"] == "postgres":
+        key = "created_at" if table == "stock_moves" else "invoice_date"
+        cur.executemany(f"UPDATE {table} SET {column} = %s WHERE id = %s AND {key} = %s", rows)
+        return
+    rows = [(v, i) for v, i, _ in rows]
+    for t in [table] + [archive_table(table, m) for m in archived]:
+        cur.executemany(f"UPDATE {t} SET {column} = ? WHERE id = ?", rows)
+
+
+# -------------------- VALUATION --------------------
+def valuation(db):
+    """Valoarea stocului din straturile deschise: product_id, sku, name, stock, layer_qty, value, avg_cost."""
+    df = db_query(db, """
+        SELECT p.id AS product_id, p.sku, p.name, p.stock,
+               COALESCE(SUM(l.qty_left), 0) AS layer_qty, COALESCE(SUM(l.qty_left * l.unit_cost), 0) AS value
+        FROM products p
+        LEFT JOIN cost_layers l ON l.product_id = p.id AND l.qty_left > 0
+        GROUP BY p.id, p.sku, p.name, p.stock
+        ORDER BY value DESC
+    """)
+    df["value"] = df["value"].astype(float).round(2)
+    df["avg_cost"] = (df["value"] / df["layer_qty"].astype(float).where(df["layer_qty"] > 0)).round(4)
+    return df
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Cost FIFO: recalculare din istoric, valoarea stocului.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("recompute")
+    sub.add_parser("valuation")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "recompute":
+        out = recompute(db)
+        print(f"mișcări {out['moves']}, straturi {out['layers']}, linii documente {out['items']}", file=sys.stderr)
+    else:
+        df = valuation(db)
+        print(df.to_csv(index=False), end="")
+        print(f"valoare totală {df['value'].sum():.2f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
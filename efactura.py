@@ -0,0 +1,476 @@
+"""e-Factura: FACTURA ca XML UBL 2.1 (CIUS-RO), generat offline, pe loturi.
+
+    python -m efactura export --start 2024-06-01 --end 2024-06-30 --out efactura/ [--workers 4]
+    python -m efactura one WC-123 > WC-123.xml
+    python -m efactura validate efactura/*.xml        # pe schema XSD (EFACTURA_XSD)
+
+Perioada se încarcă set-wise (antetele + toate liniile, două interogări), documentele se împart în
+loturi de EFACTURA_CHUNK procesate în paralel (procese). Fiecare XML se scrie incremental
+(XMLGenerator, element cu element, direct în fișier) - fără arbore DOM per factură. Înainte de
+scriere, documentul trece prin regulile locale (check), apoi XML-ul scris e validat pe schemă:
+implicit schemas/efactura/invoice.xsd (subsetul UBL 2.1 generat aici, cu ordinea și cardinalitatea
+din UBL); EFACTURA_XSD poate indica UBL-Invoice-2.1.xsd din pachetul OASIS.
+Nu e nevoie de conexiune la ANAF pentru generare / testare.
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from xml.sax.saxutils import XMLGenerator
+
+import pandas as pd
+from lxml import etree
+
+from database import make_db, init_db, db_query, db_frame, placeholder
+from archive import history_source
+from pdf_invoice import COMPANY_NAME, COMPANY_CUI, COMPANY_ADDR, COMPANY_EMAIL, COMPANY_PHONE
+
+
+# -------------------- CONFIG --------------------
+EFACTURA_WORKERS = int(os.getenv("EFACTURA_WORKERS", str(min(os.cpu_count() or 1, 4))))
+EFACTURA_CHUNK = int(os.getenv("EFACTURA_CHUNK", "250"))          # facturi per lot trimis unui proces
+EFACTURA_XSD = (os.getenv("EFACTURA_XSD", "").strip()            # ex: UBL-2.1/xsd/maindoc/UBL-Invoice-2.1.xsd
+                or os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas", "efactura", "invoice.xsd"))
+COMPANY_CITY = os.getenv("COMPANY_CITY", COMPANY_ADDR.rsplit(",", 1)[-1].strip())
+COMPANY_COUNTY = os.getenv("COMPANY_COUNTY", "").strip()          # ISO 3166-2:RO, obligatoriu (fără implicit)
+COMPANY_REG = os.getenv("COMPANY_REG", "")                         # nr. Registrul Comerțului
+
+CUSTOMIZATION_ID = "urn:cen.eu:en16931:2017#compliant#urn:efactura.mfinante.ro:CIUS-RO:1.0.1"
+CURRENCY = "RON"
+NS = {
+    "xmlns": "urn:oasis:names:specification:ubl:schema:xsd:Invoice-2",
+    "xmlns:cac": "urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2",
+    "xmlns:cbc": "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2",
+}
+# unitatea din fișa produsului -> UN/ECE Rec 20; manopera = bucată de serviciu
+UNIT_CODES = {"buc": "H87", "ora": "HUR", "h": "HUR", "kg": "KGM", "g": "GRM", "m": "MTR", "l": "LTR", "set": "SET"}
+LABOR_UNIT = "C62"
+RO_COUNTY = re.compile(r"^RO-[A-Z]{1,2}$")
+# persoană fizică fără CNP comunicat
+ANONYMOUS_ID = "0000000000000"
+CENT = Decimal("0.01")
+
+
+# -------------------- DOCUMENT --------------------
+def _text(v):
+    return "" if v is None or (isinstance(v, float) and pd.isna(v)) else str(v).strip()
+
+def _split_address(address, city=None):
+    # adresa e liberă: ultimul segment după virgulă = localitatea, dacă nu e dată separat
+    address, city = _text(address), _text(city)
+    if city:
+        street, _, last = address.rpartition(",")
+        return (street.strip(), city) if street and last.strip().lower() == city.lower() else (address, city)
+    if "," in address:
+        street, town = address.rsplit(",", 1)
+        return street.strip(), town.strip()
+    return address, ""
+
+def money(v):
+    """Sumă pe 2 zecimale, rotunjire comercială (0.005 -> 0.01), din valoarea zecimală a float-ului."""
+    return Decimal(str(v)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+def _party(name, tax_id, address, city, county, email=None, phone=None, reg=None):
+    street, city = _split_address(address, city)
+    tax_id = _text(tax_id).upper().replace(" ", "")
+    return {"name": _text(name), "street": street, "city": city, "county": _text(county).upper(),
+            "vat_id": tax_id if tax_id.startswith("RO") else "", "legal_id": _text(reg) or tax_id.removeprefix("RO"),
+            "email": _text(email), "phone": _text(phone)}
+
+def seller():
+    """Vânzătorul din configurare. ValueError dacă datele firmei nu trec regulile (altfel ar cădea fiecare factură)."""
+    if not COMPANY_COUNTY:
+        raise ValueError("e-Factura: setați COMPANY_COUNTY (cod ISO 3166-2:RO, ex: RO-CJ; București: RO-B + COMPANY_CITY=SECTOR1..6)")
+    sell = _party(COMPANY_NAME, COMPANY_CUI, COMPANY_ADDR, COMPANY_CITY, COMPANY_COUNTY, COMPANY_EMAIL, COMPANY_PHONE, COMPANY_REG)
+    errors = []
+    _check_party("vânzător", sell, errors)
+    if errors:
+        raise ValueError("e-Factura: datele firmei (COMPANY_*) sunt invalide: " + "; ".join(errors))
+    return sell
+
+def document(head, lines, sell=None):
+    """Factura ca dict simplu (picklable): antet + linii + totaluri în Decimal, pe 2 zecimale.
+
+    Liniile se rotunjesc fiecare (EN 16931: totalul net = suma liniilor), invoices.total o singură
+    dată, la final; diferența de rotunjire (câțiva bani) merge în PayableRoundingAmount (BT-114),
+    astfel încât suma de plată din XML e exact cea din aplicație, PDF și soldul clientului.
+    """
+    sell = sell or seller()
+    vat = float(head.get("vat_percent") or 0.0)
+    disc = float(head.get("discount_percent") or 0.0)
+    category = "S" if vat > 0 else "Z" if sell["vat_id"] else "O"
+    out_lines, line_total = [], Decimal(0)
+    for n, ln in enumerate(lines, start=1):
+        qty, price = float(ln["qty"]), float(ln["unit_price"])
+        amount = money(Decimal(str(qty)) * Decimal(str(price)))
+        line_total += amount
+        unit = LABOR_UNIT if ln["item_type"] == "LABOR" else UNIT_CODES.get(_text(ln.get("unit")).lower(), "H87")
+        out_lines.append({"id": n, "name": _text(ln["description"]), "sku": _text(ln.get("sku")), "qty": qty, "unit": unit,
+                          "price": price, "amount": amount})
+    discount = money(line_total * Decimal(str(disc)) / 100)
+    taxable = line_total - discount
+    tax = money(taxable * Decimal(str(vat)) / 100) if category == "S" else Decimal(0)
+    total = taxable + tax
+    stored = head.get("total")
+    payable = total if stored is None or pd.isna(stored) else money(stored)
+    issue = head["invoice_date"]
+    return {
+        "name": f"{head['series']}-{int(head['number'])}",
+        "issue_date": issue.strftime("%Y-%m-%d") if hasattr(issue, "strftime") else str(issue)[:10],
+        "note": _text(head.get("notes")),
+        "seller": sell,
+        "buyer": _party(head.get("client_name"), _text(head.get("tax_id")) or ANONYMOUS_ID, head.get("address"),
+                        head.get("city"), head.get("county"), head.get("email"), head.get("phone")),
+        "category": category, "vat_percent": vat,
+        "lines": out_lines, "line_total": line_total, "discount": discount,
+        "taxable": taxable, "tax": tax, "total": total,
+        "stored_total": None if stored is None or pd.isna(stored) else payable,
+        "rounding": payable - total, "payable": payable,
+    }
+
+
+# -------------------- VALIDATION --------------------
+def _check_party(role, p, errors):
+    if not p["name"]:
+        errors.append(f"{role}: lipsește denumirea")
+    if not p["city"]:
+        errors.append(f"BR-RO-100 {role}: lipsește localitatea")
+    if not RO_COUNTY.match(p["county"]):
+        errors.append(f"BR-RO-110 {role}: județul trebuie să fie cod ISO 3166-2:RO (ex: RO-CJ), nu '{p['county']}'")
+    elif p["county"] == "RO-B" and not re.fullmatch(r"SECTOR[1-6]", p["city"].upper().replace(" ", "")):
+        errors.append(f"BR-RO-120 {role}: în București localitatea e SECTOR1..SECTOR6")
+
+def check(doc):
+    """Regulile EN 16931 / CIUS-RO verificabile local. Return lista de erori (goală = valid)."""
+    errors = []
+    if not doc["lines"]:
+        errors.append("BR-16: factura trebuie să aibă cel puțin o linie")
+    if not doc["seller"]["vat_id"] and not doc["seller"]["legal_id"]:
+        errors.append("BR-CO-26: lipsește CUI-ul vânzătorului (COMPANY_CUI)")
+    _check_party("vânzător", doc["seller"], errors)
+    _check_party("cumpărător", doc["buyer"], errors)
+    for ln in doc["lines"]:
+        if ln["price"] < 0:
+            errors.append(f"BR-27 linia {ln['id']}: prețul unitar nu poate fi negativ")
+        if not ln["name"]:
+            errors.append(f"BR-25 linia {ln['id']}: lipsește denumirea")
+    if doc["category"] == "S" and doc["vat_percent"] <= 0:
+        errors.append("BR-S-05: cota TVA standard trebuie să fie > 0")
+    if doc["category"] == "O" and doc["seller"]["vat_id"]:
+        errors.append("BR-O-02: la neplătitor de TVA vânzătorul nu are cod de TVA")
+    if sum(ln["amount"] for ln in doc["lines"]) != doc["line_total"]:
+        errors.append("BR-CO-10: suma liniilor diferă de totalul net")
+    if doc["taxable"] + doc["tax"] != doc["total"]:
+        errors.append("BR-CO-15: total cu TVA diferit de bază + TVA")
+    if doc["stored_total"] is None:
+        errors.append("lipsește invoices.total")
+    elif abs(doc["rounding"]) > _rounding_limit(doc):
+        errors.append(f"totalul documentului ({doc['total']}) diferă de invoices.total ({doc['stored_total']})")
+    return errors
+
+def _rounding_limit(doc):
+    # cel mult o jumătate de ban per linie, purtată prin TVA, + rotunjirea TVA-ului și a totalului
+    n = len(doc["lines"]) + 2
+    return money(Decimal("0.005") * n * (1 + Decimal(str(doc["vat_percent"])) / 100))
+
+def xsd_errors(source):
+    """Validarea pe schema UBL (EFACTURA_XSD) a unui XML (cale sau bytes). Return lista de erori."""
+    schema = _schema()
+    try:
+        tree = etree.parse(io.BytesIO(source) if isinstance(source, bytes) else source)
+    except etree.XMLSyntaxError as e:
+        return [f"XML invalid: {e}"]
+    return [] if schema.validate(tree) else [f"linia {e.line}: {e.message}" for e in schema.error_log]
+
+def validate(doc):
+    """check() + schema, pe XML-ul generat în memorie. Return (xml bytes sau None, erori)."""
+    errors = check(doc)
+    if errors:
+        return None, errors
+    data = to_bytes(doc)
+    errors = xsd_errors(data)
+    return (None, errors) if errors else (data, [])
+
+_xsd = {}
+
+def _schema():
+    # o dată per proces (și în procesele din pool)
+    if EFACTURA_XSD not in _xsd:
+        _xsd[EFACTURA_XSD] = etree.XMLSchema(etree.parse(EFACTURA_XSD))
+    return _xsd[EFACTURA_XSD]
+
+
+# -------------------- XML (streaming) --------------------
+def _amount(v):
+    return f"{money(v):.2f}"
+
+def _qty(v):
+    return f"{v:.3f}".rstrip("0").rstrip(".")
+
+def _price(v):
+    # prețul unitar poate avea mai mult de 2 zecimale (BT-146)
+    return _amount(v) if round(v, 2) == v else f"{v:.4f}".rstrip("0")
+
+class _Writer:
+    def __init__(self, out):
+        self.g = XMLGenerator(out, "UTF-8", short_empty_elements=True)
+
+    @contextmanager
+    def el(self, tag, **attrs):
+        self.g.startElement(tag, attrs)
+        yield
+        self.g.endElement(tag)
+
+    def leaf(self, tag, text, **attrs):
+        if text is None or text == "":
+            return
+        self.g.startElement(tag, attrs)
+        self.g.characters(str(text))
+        self.g.endElement(tag)
+
+def _write_party(w, wrapper, p):
+    with w.el(wrapper), w.el("cac:Party"):
+        with w.el("cac:PostalAddress"):
+            w.leaf("cbc:StreetName", p["street"])
+            w.leaf("cbc:CityName", p["city"])
+            w.leaf("cbc:CountrySubentity", p["county"])
+            with w.el("cac:Country"):
+                w.leaf("cbc:IdentificationCode", "RO")
+        if p["vat_id"]:
+            with w.el("cac:PartyTaxScheme"):
+                w.leaf("cbc:CompanyID", p["vat_id"])
+                with w.el("cac:TaxScheme"):
+                    w.leaf("cbc:ID", "VAT")
+        with w.el("cac:PartyLegalEntity"):
+            w.leaf("cbc:RegistrationName", p["name"])
+            w.leaf("cbc:CompanyID", p["legal_id"])
+        if p["email"] or p["phone"]:
+            with w.el("cac:Contact"):
+                w.leaf("cbc:Telephone", p["phone"])
+                w.leaf("cbc:ElectronicMail", p["email"])
+
+def _write_category(w, tag, doc, exemption=False):
+    with w.el(tag):
+        w.leaf("cbc:ID", doc["category"])
+        if doc["category"] != "O":
+            w.leaf("cbc:Percent", _qty(doc["vat_percent"]))
+        if exemption and doc["category"] == "O":
+            w.leaf("cbc:TaxExemptionReasonCode", "VATEX-EU-O")
+        with w.el("cac:TaxScheme"):
+            w.leaf("cbc:ID", "VAT")
+
+def write_xml(doc, out):
+    """Scrie factura UBL 2.1 în `out` (stream binar), element cu element."""
+    cur = {"currencyID": CURRENCY}
+    w = _Writer(out)
+    w.g.startDocument()
+    with w.el("Invoice", **NS):
+        w.leaf("cbc:CustomizationID", CUSTOMIZATION_ID)
+        w.leaf("cbc:ID", doc["name"])
+        w.leaf("cbc:IssueDate", doc["issue_date"])
+        w.leaf("cbc:InvoiceTypeCode", "380")
+        w.leaf("cbc:Note", doc["note"])
+        w.leaf("cbc:DocumentCurrencyCode", CURRENCY)
+        _write_party(w, "cac:AccountingSupplierParty", doc["seller"])
+        _write_party(w, "cac:AccountingCustomerParty", doc["buyer"])
+        if doc["discount"]:
+            with w.el("cac:AllowanceCharge"):
+                w.leaf("cbc:ChargeIndicator", "false")
+                w.leaf("cbc:AllowanceChargeReason", "Discount")
+                w.leaf("cbc:Amount", _amount(doc["discount"]), **cur)
+                _write_category(w, "cac:TaxCategory", doc)
+        with w.el("cac:TaxTotal"):
+            w.leaf("cbc:TaxAmount", _amount(doc["tax"]), **cur)
+            with w.el("cac:TaxSubtotal"):
+                w.leaf("cbc:TaxableAmount", _amount(doc["taxable"]), **cur)
+                w.leaf("cbc:TaxAmount", _amount(doc["tax"]), **cur)
+                _write_category(w, "cac:TaxCategory", doc, exemption=True)
+        with w.el("cac:LegalMonetaryTotal"):
+            w.leaf("cbc:LineExtensionAmount", _amount(doc["line_total"]), **cur)
+            w.leaf("cbc:TaxExclusiveAmount", _amount(doc["taxable"]), **cur)
+            w.leaf("cbc:TaxInclusiveAmount", _amount(doc["total"]), **cur)
+            if doc["discount"]:
+                w.leaf("cbc:AllowanceTotalAmount", _amount(doc["discount"]), **cur)
+            if doc["rounding"]:
+                w.leaf("cbc:PayableRoundingAmount", _amount(doc["rounding"]), **cur)
+            w.leaf("cbc:PayableAmount", _amount(doc["payable"]), **cur)
+        for ln in doc["lines"]:
+            with w.el("cac:InvoiceLine"):
+                w.leaf("cbc:ID", ln["id"])
+                w.leaf("cbc:InvoicedQuantity", _qty(ln["qty"]), unitCode=ln["unit"])
+                w.leaf("cbc:LineExtensionAmount", _amount(ln["amount"]), **cur)
+                with w.el("cac:Item"):
+                    w.leaf("cbc:Name", ln["name"])
+                    if ln["sku"]:
+                        with w.el("cac:SellersItemIdentification"):
+                            w.leaf("cbc:ID", ln["sku"])
+                    _write_category(w, "cac:ClassifiedTaxCategory", doc)
+                with w.el("cac:Price"):
+                    w.leaf("cbc:PriceAmount", _price(ln["price"]), **cur)
+    w.g.endDocument()
+
+def to_bytes(doc):
+    buf = io.BytesIO()
+    write_xml(doc, buf)
+    return buf.getvalue()
+
+
+# -------------------- LOAD (set-wise) --------------------
+_HEAD_SQL = """
+    SELECT i.id, i.series, i.number, i.invoice_date, i.vat_percent, i.discount_percent, i.notes, i.total,
+           c.name AS client_name, c.address, c.city, c.county, c.tax_id, c.email, c.phone
+    FROM invoices i LEFT JOIN clients c ON c.id = i.client_id
+    WHERE i.type = 'FACTURA' AND {where}
+    ORDER BY i.id
+"""
+
+def _lines_sql(source, where):
+    return f"""
+        SELECT it.invoice_id, it.item_type, it.description, it.qty, it.unit_price, p.sku, p.unit
+        FROM {source} it
+        JOIN invoices i ON i.id = it.invoice_id
+        LEFT JOIN products p ON p.id = it.product_id
+        WHERE i.type = 'FACTURA' AND {where}
+        ORDER BY it.invoice_id, it.id
+    """
+
+def _documents(heads, items):
+    by_invoice = {}
+    for row in items.to_dict("records"):
+        by_invoice.setdefault(int(row["invoice_id"]), []).append(row)
+    sell = seller()
+    return [document(h, by_invoice.get(int(h["id"]), []), sell) for h in heads.to_dict("records")]
+
+def load_period(db, start, end):
+    """Facturile din [start, end] ca documente: antetele + liniile (inclusiv arhivate) în două interogări."""
+    ph = placeholder(db)
+    heads = db_query(db, _HEAD_SQL.format(where=f"i.invoice_date BETWEEN {ph} AND {ph}"), (start, end))
+    # it.invoice_date: pruning pe partițiile lunilor din interval
+    items = db_frame(db, _lines_sql(history_source(db, "invoice_items", start, end), f"it.invoice_date BETWEEN {ph} AND {ph}"),
+                     (start, end))
+    return _documents(heads, items)
+
+def load_invoice(db, ref):
+    """O factură după SERIE-NUMĂR (sau id). None dacă nu există / nu e FACTURA."""
+    ph = placeholder(db)
+    if isinstance(ref, int) or str(ref).isdigit():
+        where, params = f"i.id = {ph}", (int(ref),)
+    else:
+        series, number = str(ref).rsplit("-", 1)
+        where, params = f"i.series = {ph} AND i.number = {ph}", (series, int(number))
+    heads = db_query(db, _HEAD_SQL.format(where=where), params)
+    if heads.empty:
+        return None
+    day = heads.iloc[0]["invoice_date"].date()
+    items = db_frame(db, _lines_sql(history_source(db, "invoice_items", day, day), f"it.invoice_id = {ph} AND it.invoice_date = {ph}"),
+                     (int(heads.iloc[0]["id"]), day))
+    return _documents(heads, items)[0]
+
+
+# -------------------- BATCH --------------------
+def _render_chunk(out_dir, docs):
+    # rulează în procesele din pool: fiecare XML e scris direct în fișier
+    written, invalid = 0, []
+    for doc in docs:
+        errors = check(doc)
+        if errors:
+            invalid.append((doc["name"], errors))
+            continue
+        path = os.path.join(out_dir, f"{doc['name']}.xml")
+        with open(path, "wb") as f:
+            write_xml(doc, f)
+        errors = xsd_errors(path)
+        if errors:
+            invalid.append((doc["name"], errors))
+            os.remove(path)
+            continue
+        written += 1
+    return written, invalid
+
+def export_period(db, start, end, out_dir, workers=None):
+    """XML-urile facturilor din [start, end] în `out_dir`. Return {written, invalid: [(factură, erori)]}."""
+    workers = EFACTURA_WORKERS if workers is None else workers
+    os.makedirs(out_dir, exist_ok=True)
+    docs = load_period(db, start, end)
+    chunks = [docs[i:i + EFACTURA_CHUNK] for i in range(0, len(docs), EFACTURA_CHUNK)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [_render_chunk(out_dir, c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_chunk, [out_dir] * len(chunks), chunks))
+    return {"written": sum(r[0] for r in results), "invalid": [x for r in results for x in r[1]]}
+
+def export_zip(db, start, end):
+    """Varianta pentru download din aplicație: arhivă ZIP în memorie, în procesul curent. Return (buffer, invalid)."""
+    buf, invalid = io.BytesIO(), []
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for doc in load_period(db, start, end):
+            data, errors = validate(doc)
+            if errors:
+                invalid.append((doc["name"], errors))
+                continue
+            zf.writestr(f"{doc['name']}.xml", data)
+    buf.seek(0)
+    return buf, invalid
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="e-Factura: XML UBL 2.1 (CIUS-RO) pentru facturi, pe loturi, offline.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--start", type=date.fromisoformat, required=True)
+    ex.add_argument("--end", type=date.fromisoformat, required=True)
+    ex.add_argument("--out", required=True, help="directorul pentru fișierele XML")
+    ex.add_argument("--workers", type=int, default=None)
+    one = sub.add_parser("one")
+    one.add_argument("ref", help="SERIE-NUMĂR sau id")
+    va = sub.add_parser("validate")
+    va.add_argument("files", nargs="+")
+    args = p.parse_args(argv)
+
+    if args.cmd == "validate":
+        bad = 0
+        for path in args.files:
+            errors = xsd_errors(path)
+            if errors:
+                bad += 1
+                print(f"{path}: " + "; ".join(errors[:5]), file=sys.stderr)
+        print(f"{len(args.files) - bad} valide, {bad} invalide", file=sys.stderr)
+        return 1 if bad else 0
+
+    try:
+        seller()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "export":
+        out = export_period(db, args.start, args.end, args.out, args.workers)
+        for name, errors in out["invalid"]:
+            print(f"{name}: " + "; ".join(errors), file=sys.stderr)
+        print(f"scrise {out['written']}, invalide {len(out['invalid'])}", file=sys.stderr)
+        return 1 if out["invalid"] else 0
+    doc = load_invoice(db, args.ref)
+    if doc is None:
+        print(f"factură inexistentă: {args.ref}", file=sys.stderr)
+        return 1
+    data, errors = validate(doc)
+    if errors:
+        print("; ".join(errors), file=sys.stderr)
+        return 1
+    sys.stdout.buffer.write(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
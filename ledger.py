@@ -0,0 +1,172 @@
+"""Registrul de stoc: checkpoint-uri periodice + delta semnată pe fiecare mișcare.
+
+    python -m ledger checkpoint          # checkpoint nou (no-op dacă nu au fost mișcări)
+    python -m ledger check               # products.stock vs checkpoint + mișcări / solduri pe locații; cod 1 la diferențe
+    python -m ledger at 2026-03-31       # stocul per produs la sfârșitul zilei
+    python -m ledger nightly             # check, apoi checkpoint dacă totul e consistent
+
+Stocul la o dată și reconcilierea citesc doar checkpoint-ul cel mai apropiat și
+mișcările de după el (nu tot istoricul).
+"""
+import argparse
+import sys
+from datetime import date, datetime, time as dtime
+
+import pandas as pd
+
+from database import make_db, init_db, db_connect, db_query, placeholder, now_ts
+from archive import history_source
+from statements import execute, render
+
+
+TOLERANCE = 1e-6
+
+
+def _end_of(when):
+    # o dată simplă = sfârșitul zilei respective
+    if isinstance(when, datetime):
+        return when
+    return datetime.combine(when, dtime.max).replace(microsecond=0)
+
+
+# -------------------- CHECKPOINTS --------------------
+def take_checkpoint(db):
+    """Salvează stocul tuturor produselor. Return last_move_id sau None dacă nimic nu s-a schimbat."""
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        if db["type"] == "sqlite":
+            cur.execute("BEGIN IMMEDIATE")
+        else:
+            # așteaptă scrierile de stoc în curs și blochează altele noi cât citim (id-uri SERIAL comise în altă ordine)
+            cur.execute("LOCK TABLE stock_moves IN SHARE MODE")
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM stock_moves")
+        last_move = int(cur.fetchone()[0])
+        cur.execute("SELECT MAX(last_move_id) FROM stock_checkpoints")
+        prev = cur.fetchone()[0]
+        if prev is not None and int(prev) == last_move:
+            conn.rollback()
+            return None
+        execute(cur, db, "checkpoint_take", (last_move, now_ts()))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return last_move
+
+def _checkpoint_stock(db, last_move_id):
+    return db_query(db, render(db, "checkpoint_stock"), (int(last_move_id),))
+
+def _combine(base, deltas, sign=1.0):
+    out = base.merge(deltas, on="product_id", how="outer")
+    out["stock"] = out["stock"].fillna(0.0).astype(float) + sign * out["delta"].fillna(0.0).astype(float)
+    return out[["product_id", "stock"]].sort_values("product_id").reset_index(drop=True)
+
+def _empty_base():
+    return pd.DataFrame({"product_id": pd.Series(dtype="int64"), "stock": pd.Series(dtype="float64")})
+
+
+# -------------------- RECONSTRUCTION --------------------
+def stock_at(db, when):
+    """Stocul per produs (product_id, stock) la momentul `when` (datetime sau dată = sfârșitul zilei)."""
+    ph = placeholder(db)
+    when = _end_of(when)
+    before = db_query(db, render(db, "checkpoint_before"), (when,)).iloc[0]["m"]
+    if pd.notna(before):
+        # înainte: checkpoint + mișcările de după el până la `when`
+        deltas = db_query(db, f"""
+            SELECT product_id, SUM(delta) AS delta FROM {history_source(db, "stock_moves", None, when)} sm
+            WHERE id > {ph} AND created_at <= {ph} GROUP BY product_id
+        """, (int(before), when))
+        return _combine(_checkpoint_stock(db, before), deltas)
+
+    after = db_query(db, render(db, "checkpoint_after"), (when,)).iloc[0]["m"]
+    if pd.notna(after):
+        # înapoi: checkpoint-ul următor minus mișcările dintre `when` și el
+        deltas = db_query(db, f"""
+            SELECT product_id, SUM(delta) AS delta FROM {history_source(db, "stock_moves", when)} sm
+            WHERE id <= {ph} AND created_at > {ph} GROUP BY product_id
+        """, (int(after), when))
+        return _combine(_checkpoint_stock(db, after), deltas, sign=-1.0)
+
+    # fără checkpoint-uri: tot registrul, de la 0
+    deltas = db_query(db, f"SELECT product_id, SUM(delta) AS delta FROM {history_source(db, 'stock_moves', None, when)} sm "
+                          f"WHERE created_at <= {ph} GROUP BY product_id", (when,))
+    return _combine(_empty_base(), deltas)
+
+def expected_stock(db):
+    """Stocul rezultat din ultimul checkpoint + mișcările de după el."""
+    last = db_query(db, "SELECT MAX(last_move_id) AS m FROM stock_checkpoints").iloc[0]["m"]
+    if pd.isna(last):
+        deltas = db_query(db, "SELECT product_id, SUM(delta) AS delta FROM stock_moves GROUP BY product_id")
+        return _combine(_empty_base(), deltas)
+    deltas = db_query(db, render(db, "moves_since"), (int(last),))
+    return _combine(_checkpoint_stock(db, last), deltas)
+
+def reconcile(db):
+    """Produsele la care products.stock diferă de registru (sku, name, stock, expected, diff)."""
+    cur = db_query(db, "SELECT id AS product_id, sku, name, stock FROM products")
+    exp = expected_stock(db).rename(columns={"stock": "expected"})
+    out = cur.merge(exp, on="product_id", how="left")
+    out["stock"] = out["stock"].fillna(0.0).astype(float)
+    out["expected"] = out["expected"].fillna(0.0).astype(float)
+    out["diff"] = out["stock"] - out["expected"]
+    return out[out["diff"].abs() > TOLERANCE].reset_index(drop=True)
+
+def reconcile_locations(db):
+    """Produsele la care suma soldurilor pe locații diferă de products.stock (sku, name, stock, expected, diff)."""
+    out = db_query(db, """
+        SELECT p.id AS product_id, p.sku, p.name, p.stock, COALESCE(b.total, 0) AS expected
+        FROM products p LEFT JOIN (SELECT product_id, SUM(qty) AS total FROM stock_balances GROUP BY product_id) b
+             ON b.product_id = p.id
+    """)
+    out["stock"] = out["stock"].fillna(0.0).astype(float)
+    out["expected"] = out["expected"].astype(float)
+    out["diff"] = out["stock"] - out["expected"]
+    return out[out["diff"].abs() > TOLERANCE].reset_index(drop=True)
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Registrul de stoc: checkpoint-uri, reconciliere, stoc la o dată.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("checkpoint")
+    sub.add_parser("check")
+    sub.add_parser("nightly")
+    at = sub.add_parser("at")
+    at.add_argument("when", help="YYYY-MM-DD sau YYYY-MM-DDTHH:MM")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "at":
+        when = datetime.fromisoformat(args.when) if "T" in args.when or " " in args.when else date.fromisoformat(args.when)
+        print(stock_at(db, when).to_csv(index=False), end="")
+        return 0
+
+    if args.cmd in ("check", "nightly"):
+        bad = reconcile(db)
+        if not bad.empty:
+            print(f"{len(bad)} produse cu stoc diferit de registru:", file=sys.stderr)
+            print(bad.to_csv(index=False), end="")
+            return 1
+        bad = reconcile_locations(db)
+        if not bad.empty:
+            print(f"{len(bad)} produse cu stoc diferit de suma pe locații:", file=sys.stderr)
+            print(bad.to_csv(index=False), end="")
+            return 1
+        print("ok: stocul corespunde registrului", file=sys.stderr)
+        if args.cmd == "check":
+            return 0
+
+    last = take_checkpoint(db)
+    print(f"checkpoint la mișcarea {last}" if last is not None else "fără mișcări noi de la ultimul checkpoint", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
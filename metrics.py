@@ -0,0 +1,320 @@
+"""Metrici în format Prometheus (text exposition) pentru Service + Depozit PRO.
+
+Contoarele și histogramele agregă pe thread (fără lock pe hot path); lock-ul
+e luat doar la înregistrarea unui thread nou și la colectare. Expunere prin
+endpoint HTTP local (METRICS_PORT) sau fișier pentru textfile collector
+(METRICS_TEXTFILE).
+"""
+import abc
+import os
+import time
+import threading
+import functools
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)          # 0 = dezactivat
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "").strip()     # ex: /var/lib/node_exporter/textfile/app.prom
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "15") or 15)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# -------------------- METRIC TYPES --------------------
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []      # [(thread, dict)] - un dict per thread
+        self._retired = {}     # valori din thread-uri terminate (Streamlit pornește thread nou la fiecare rerun)
+        self._children = {}
+        if self.labelnames == ():
+            self._children[()] = self._child_cls(self, ())
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: aștept labels {self.labelnames}, primit {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._child_cls(self, key))
+        return child
+
+    def _shard(self):
+        try:
+            return self._local.d
+        except AttributeError:
+            d = self._local.d = {}
+            with self._lock:
+                self._prune()
+                self._shards.append((threading.current_thread(), d))
+            return d
+
+    def _prune(self):
+        # sub lock; rulează și la fiecare thread nou, altfel lista crește când nu colectează nimeni
+        alive = []
+        for th, d in self._shards:
+            if th.is_alive():
+                alive.append((th, d))
+            else:
+                self._merge(self._retired, d)
+        self._shards = alive
+
+    @abc.abstractmethod
+    def _merge(self, dst, src):
+        """Adună valorile din shard-ul `src` în `dst` (pe cheia de labels)."""
+
+    @abc.abstractmethod
+    def _render_samples(self, total):
+        """Liniile de sample pentru valorile agregate de `_collect`."""
+
+    def _collect(self):
+        with self._lock:
+            self._prune()
+            total = {}
+            self._merge(total, self._retired)
+            for _, d in self._shards:
+                self._merge(total, dict(d))
+        return total
+
+    def _fmt_labels(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._render_samples(self._collect())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_m", "_key")
+
+    def __init__(self, m, key):
+        self._m = m
+        self._key = key
+
+    def inc(self, amount=1.0):
+        d = self._m._shard()
+        d[self._key] = d.get(self._key, 0.0) + amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _child_cls = _CounterChild
+
+    def inc(self, amount=1.0):
+        self._children[()].inc(amount)
+
+    def _merge(self, dst, src):
+        for k, v in src.items():
+            dst[k] = dst.get(k, 0.0) + v
+
+    def _render_samples(self, total):
+        return [f"{self.name}{self._fmt_labels(k)} {_num(v)}" for k, v in sorted(total.items())]
+
+    def value(self, *values):
+        return self._collect().get(tuple(str(v) for v in values), 0.0)
+
+
+class _HistogramChild:
+    __slots__ = ("_m", "_key", "_buckets")
+
+    def __init__(self, m, key):
+        self._m = m
+        self._key = key
+        self._buckets = m.buckets
+
+    def observe(self, value):
+        d = self._m._shard()
+        h = d.get(self._key)
+        if h is None:
+            h = d[self._key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+        h[0][bisect_left(self._buckets, value)] += 1
+        h[1] += value
+        h[2] += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    _child_cls = _HistogramChild
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def _merge(self, dst, src):
+        for k, (counts, s, n) in src.items():
+            cur = dst.get(k)
+            if cur is None:
+                dst[k] = [list(counts), s, n]
+            else:
+                cur[0] = [a + b for a, b in zip(cur[0], counts)]
+                cur[1] += s
+                cur[2] += n
+
+    def _render_samples(self, total):
+        out = []
+        for k, (counts, s, n) in sorted(total.items()):
+            acc = 0
+            for b, c in zip(self.buckets, counts):
+                acc += c
+                out.append(f"{self.name}_bucket{self._fmt_labels(k, ('le', _num(b)))} {acc}")
+            out.append(f"{self.name}_bucket{self._fmt_labels(k, ('le', '+Inf'))} {n}")
+            out.append(f"{self.name}_sum{self._fmt_labels(k)} {_num(s)}")
+            out.append(f"{self.name}_count{self._fmt_labels(k)} {n}")
+        return out
+
+
+class _Timer:
+    __slots__ = ("_h", "_t0")
+
+    def __init__(self, h):
+        self._h = h
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._h.observe(time.perf_counter() - self._t0)
+        return False
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _num(v):
+    return repr(float(v))
+
+
+# -------------------- REGISTRY --------------------
+REGISTRY = []
+
+def _register(m):
+    REGISTRY.append(m)
+    return m
+
+def counter(name, help_text, labelnames=()):
+    return _register(Counter(name, help_text, labelnames))
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+def render():
+    lines = []
+    for m in REGISTRY:
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+def timed(hist_child, errors=None):
+    """Decorator: măsoară durata apelului în histogramă; excepțiile incrementează `errors`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc()
+                raise
+            finally:
+                hist_child.observe(time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+# -------------------- APP METRICS --------------------
+DB_SECONDS = histogram("app_db_seconds", "Durata operațiilor DB (secunde).", ("op", "engine"))
+DB_ERRORS = counter("app_db_errors_total", "Erori la operațiile DB.", ("op", "engine"))
+READS_ROUTED = counter("app_db_reads_routed_total", "Citiri de raport după țintă (replica / primary).", ("target",))
+SYNC_ROWS = counter("app_sync_rows_total", "Rânduri sincronizate cu Postgres în modul hibrid.", ("direction",))
+PDF_SECONDS = histogram("app_pdf_render_seconds", "Durata generării PDF pentru documente.",
+                        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+PASSWORD_SECONDS = histogram("app_password_verify_seconds", "Durata verificării parolei (PBKDF2).",
+                             buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+LOGINS = counter("app_logins_total", "Încercări de autentificare după rezultat.", ("result",))
+INVOICES_CREATED = counter("app_invoices_created_total", "Documente create (FACTURA/BON/DEVIZ).", ("type",))
+INVOICE_SECONDS = histogram("app_invoice_create_seconds", "Durata creării unui document (fără PDF).")
+STOCK_CONFLICTS = counter("app_stock_conflicts_total", "Mutații de stoc respinse (stoc insuficient / conflict).", ("flow",))
+
+
+# -------------------- EXPORTERS --------------------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, addr="127.0.0.1"):
+    srv = ThreadingHTTPServer((addr, port), _Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
+
+def write_textfile(path):
+    # scriere atomică: collector-ul nu trebuie să vadă un fișier pe jumătate
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+def start_textfile_writer(path, interval=METRICS_INTERVAL):
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            try:
+                write_textfile(path)
+            except OSError:
+                pass
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+    return stop
+
+def start_exporter():
+    """Pornește exporterii configurați din env. Se apelează o singură dată per proces."""
+    started = {}
+    if METRICS_PORT:
+        try:
+            started["http"] = start_http_server(METRICS_PORT, METRICS_ADDR)
+        except OSError:
+            started["http"] = None  # port ocupat (alt proces deja exportă)
+    if METRICS_TEXTFILE:
+        started["textfile"] = start_textfile_writer(METRICS_TEXTFILE)
+    return started
@@ -0,0 +1,131 @@
+import io
+import os
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+
+import metrics
+from business import money
+
+
+# firmă (poți pune în Secrets)
+COMPANY_NAME = os.getenv("COMPANY_NAME", "Firma Ta SRL")
+COMPANY_CUI = os.getenv("COMPANY_CUI", "RO12345678")
+COMPANY_ADDR = os.getenv("COMPANY_ADDR", "Adresa firmei, Oraș")
+COMPANY_EMAIL = os.getenv("COMPANY_EMAIL", "contact@firma.ro")
+COMPANY_PHONE = os.getenv("COMPANY_PHONE", "07xx xxx xxx")
+
+
+# -------------------- PDF INVOICE --------------------
+@metrics.timed(metrics.PDF_SECONDS.labels())
+def build_invoice_pdf(invoice, client, items, totals):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    title = f"{invoice['type']} {invoice['series']}-{invoice['number']}"
+    elements.append(Paragraph(COMPANY_NAME, styles["Title"]))
+    elements.append(Paragraph(f"CUI: {COMPANY_CUI} | {COMPANY_ADDR}", styles["BodyText"]))
+    elements.append(Paragraph(f"Email: {COMPANY_EMAIL} | Tel: {COMPANY_PHONE}", styles["BodyText"]))
+    elements.append(Spacer(1, 10))
+
+    elements.append(Paragraph(f"<b>{title}</b>", styles["Heading1"]))
+    elements.append(Paragraph(f"Data: {invoice['invoice_date']}", styles["BodyText"]))
+    elements.append(Spacer(1, 8))
+
+    c_name = client.get("name") if client else "—"
+    c_addr = client.get("address") if client else ""
+    c_phone = client.get("phone") if client else ""
+    c_email = client.get("email") if client else ""
+    elements.append(Paragraph("<b>Client</b>", styles["Heading2"]))
+    elements.append(Paragraph(f"{c_name}", styles["BodyText"]))
+    if c_addr: elements.append(Paragraph(f"Adresă: {c_addr}", styles["BodyText"]))
+    if c_phone: elements.append(Paragraph(f"Telefon: {c_phone}", styles["BodyText"]))
+    if c_email: elements.append(Paragraph(f"Email: {c_email}", styles["BodyText"]))
+    elements.append(Spacer(1, 12))
+
+    # Items table
+    rows = [["#", "Descriere", "Cant.", "Preț", "Valoare"]]
+    for i, it in enumerate(items, start=1):
+        val = float(it["qty"]) * float(it["unit_price"])
+        rows.append([str(i), it["description"], str(it["qty"]), money(it["unit_price"]), money(val)])
+
+    tbl = Table(rows, colWidths=[22, 290, 60, 70, 80])
+    tbl.setStyle(TableStyle([
+        ("BACKGROUND", (0,0), (-1,0), colors.black),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+        ("GRID", (0,0), (-1,-1), 0.5, colors.lightgrey),
+        ("FONTSIZE", (0,0), (-1,-1), 9),
+        ("VALIGN", (0,0), (-1,-1), "TOP"),
+    ]))
+    elements.append(tbl)
+    elements.append(Spacer(1, 12))
+
+    # Totals
+    trows = [
+        ["Subtotal", money(totals["subtotal"])],
+        ["Discount", money(totals["discount"])],
+        ["Bază", money(totals["after_discount"])],
+        [f"TVA ({invoice['vat_percent']}%)", money(totals["vat"])],
+        ["TOTAL", money(totals["total"])],
+    ]
+    t = Table(trows, colWidths=[350, 120])
+    t.setStyle(TableStyle([
+        ("GRID", (0,0), (-1,-1), 0.5, colors.lightgrey),
+        ("FONTSIZE", (0,0), (-1,-1), 10),
+        ("BACKGROUND", (0, -1), (-1, -1), colors.whitesmoke),
+    ]))
+    elements.append(t)
+
+    if invoice.get("notes"):
+        elements.append(Spacer(1, 10))
+        elements.append(Paragraph("<b>Note</b>", styles["Heading2"]))
+        elements.append(Paragraph(invoice["notes"], styles["BodyText"]))
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+# -------------------- PDF FIȘĂ CLIENT --------------------
+@metrics.timed(metrics.PDF_SECONDS.labels())
+def build_statement_pdf(client, start, end, opening, lines, closing):
+    """Fișa de cont a clientului (receivables.statement): sold inițial, facturi / încasări, sold final."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    elements.append(Paragraph(COMPANY_NAME, styles["Title"]))
+    elements.append(Paragraph(f"CUI: {COMPANY_CUI} | {COMPANY_ADDR}", styles["BodyText"]))
+    elements.append(Paragraph(f"Email: {COMPANY_EMAIL} | Tel: {COMPANY_PHONE}", styles["BodyText"]))
+    elements.append(Spacer(1, 10))
+
+    elements.append(Paragraph(f"<b>Fișă client: {client.get('name') or '—'}</b>", styles["Heading1"]))
+    elements.append(Paragraph(f"Perioada: {start} — {end}", styles["BodyText"]))
+    if client.get("address"): elements.append(Paragraph(f"Adresă: {client['address']}", styles["BodyText"]))
+    elements.append(Spacer(1, 12))
+
+    rows = [["Data", "Document", "Debit", "Credit", "Sold"], ["", "Sold inițial", "", "", money(opening)]]
+    for r in lines.itertuples():
+        rows.append([f"{r.doc_date:%Y-%m-%d}", f"{r.kind} {r.doc}", money(r.debit) if r.debit else "",
+                     money(r.credit) if r.credit else "", money(r.balance)])
+    rows.append(["", "Sold final", money(lines["debit"].sum()), money(lines["credit"].sum()), money(closing)])
+
+    tbl = Table(rows, colWidths=[70, 220, 75, 75, 80], repeatRows=1)
+    tbl.setStyle(TableStyle([
+        ("BACKGROUND", (0,0), (-1,0), colors.black),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+        ("GRID", (0,0), (-1,-1), 0.5, colors.lightgrey),
+        ("FONTSIZE", (0,0), (-1,-1), 9),
+        ("ALIGN", (2,1), (-1,-1), "RIGHT"),
+        ("BACKGROUND", (0, -1), (-1, -1), colors.whitesmoke),
+    ]))
+    elements.append(tbl)
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
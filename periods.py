@@ -0,0 +1,215 @@
+"""Închiderea lunilor: agregatele din Rapoarte înghețate per lună, refolosite de rapoartele ulterioare.
+
+    python -m periods list
+    python -m periods close 2024-06 [--user admin]
+    python -m periods reopen 2024-06
+    python -m periods violations [--period 2024-06]
+    python -m periods report --start 2024-01-01 --end 2024-12-31
+
+Se închid doar lunile încheiate. La închidere se calculează o singură dată venitul, costul mărfii,
+manopera, venitul pe zile, valoarea per produs / client (toate, nu doar topul: lunile se adună
+între ele) și mișcările de stoc pe tipuri -> period_aggregates. Un raport pe [start, end] ia din
+cache lunile închise cuprinse integral în interval și calculează live doar restul (luna curentă,
+capetele parțiale). Documentele noi datate într-o lună închisă sunt respinse (create_invoice);
+orice altă scriere ajunsă acolo (sync, recalcularea costurilor, SQL direct) e notată de triggere
+în period_violations. Cifrele înghețate rămân cele de la închidere până la redeschidere.
+"""
+import argparse
+import sys
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+
+from database import make_db, init_db, db_query, db_exec, pooled_connection, placeholder, now_ts, month_start, add_months
+from reports import ReportTotals, iter_items, moves_summary, count_documents
+from statements import execute, execute_many, render
+
+
+def period_key(month):
+    return f"{month:%Y%m}"
+
+def parse_month(value):
+    """'2024-06' / '202406' / date -> prima zi a lunii."""
+    if isinstance(value, date):
+        return month_start(value)
+    s = str(value).strip().replace("-", "")
+    return date(int(s[:4]), int(s[4:6]), 1)
+
+def month_bounds(month):
+    """[prima zi, prima zi a lunii următoare) ca zile și ca momente (APP_TZ)."""
+    nxt = add_months(month, 1)
+    return month, nxt, datetime.combine(month, time.min), datetime.combine(nxt, time.min)
+
+
+# -------------------- QUERIES --------------------
+def closed_periods(db):
+    """Lunile închise (+ câte scrieri au ajuns în ele după închidere)."""
+    return db_query(db, """
+        SELECT p.period, p.start_date, p.closed_by, p.closed_at,
+               (SELECT COUNT(*) FROM period_violations v WHERE v.period = p.period) AS violations
+        FROM closed_periods p
+        WHERE p.closed_at IS NOT NULL
+        ORDER BY p.period DESC
+    """)
+
+def closed_period(db, day):
+    """Luna închisă (YYYYMM) care conține ziua `day`, altfel None."""
+    df = db_query(db, render(db, "period_of_day"), (day, day))
+    return None if df.empty else df.iloc[0]["period"]
+
+def violations(db, period=None, limit=500):
+    where, params = ("WHERE period = " + placeholder(db), (period_key(parse_month(period)),)) if period else ("", ())
+    return db_query(db, f"""
+        SELECT id, period, table_name, row_id, op, changed_at
+        FROM period_violations {where}
+        ORDER BY id DESC
+        LIMIT {int(limit)}
+    """, params)
+
+
+# -------------------- CLOSE / REOPEN --------------------
+def _compute(db, month):
+    """Agregatele lunii ca rânduri (kind, key, value)."""
+    lo, hi, t0, t1 = month_bounds(month)
+    last = hi - timedelta(days=1)
+    totals = ReportTotals()
+    for part in iter_items(db, lo, last):
+        totals.add(part)
+    rows = totals.frozen() + [("kpi", "docs", float(count_documents(db, lo, last)))]
+    mv = moves_summary(db, t0, t1)
+    rows += [("move", str(t), float(q)) for t, q in zip(mv["move_type"], mv["qty"])]
+    return rows
+
+def close_period(db, month, user=""):
+    """Închide luna: calculează și salvează agregatele. Return numărul de rânduri din cache.
+
+    Rândul din closed_periods se scrie întâi (triggerele notează de acum scrierile în lună, inclusiv
+    cele din timpul calculului), agregatele după; până la closed_at, rapoartele calculează luna live.
+    """
+    month = parse_month(month)
+    period = period_key(month)
+    lo, hi, t0, t1 = month_bounds(month)
+    if hi > now_ts().date():
+        raise ValueError("Se pot închide doar lunile încheiate.")
+    if not db_query(db, render(db, "period_get"), (period,)).empty:
+        raise ValueError(f"Luna {month:%Y-%m} e deja închisă.")
+    db_exec(db, render(db, "period_insert"), (period, lo, hi, t0, t1, user))
+    try:
+        rows = _compute(db, month)
+        with pooled_connection(db) as conn:
+            cur = conn.cursor()
+            execute_many(cur, db, "period_aggregate_insert", [(period, k, key, v) for k, key, v in rows])
+            execute(cur, db, "period_closed", (now_ts(), period))
+            conn.commit()
+    except Exception:
+        db_exec(db, render(db, "period_delete"), (period,))
+        raise
+    return len(rows)
+
+def reopen_period(db, month):
+    """Redeschide luna: șterge agregatele înghețate și scrierile notate. Return True dacă era închisă."""
+    period = period_key(parse_month(month))
+    if db_query(db, render(db, "period_get"), (period,)).empty:
+        return False
+    # period_aggregates / period_violations: ON DELETE CASCADE
+    db_exec(db, render(db, "period_delete"), (period,))
+    return True
+
+
+# -------------------- REPORT --------------------
+def split_range(db, start, end):
+    """[start, end] -> (lunile închise cuprinse integral, intervalele [a, b] de calculat live)."""
+    closed = set(db_query(db, render(db, "periods_closed_within"), (start, end + timedelta(days=1)))["period"])
+    frozen, live = [], []
+    day = start
+    while day <= end:
+        month = month_start(day)
+        nxt = add_months(month, 1)
+        if day == month and nxt - timedelta(days=1) <= end and period_key(month) in closed:
+            frozen.append(period_key(month))
+        elif live and live[-1][1] == day - timedelta(days=1):
+            live[-1] = (live[-1][0], min(nxt - timedelta(days=1), end))
+        else:
+            live.append((day, min(nxt - timedelta(days=1), end)))
+        day = nxt
+    return frozen, live
+
+def report(db, start, end, top_n=15):
+    """Ca summarize_report (+ docs, lines, moves pe [start, end]): lunile închise din cache, restul live.
+
+    În plus: "frozen" = lunile luate din cache, "flagged" = cele dintre ele cu scrieri după închidere.
+    """
+    frozen, live = split_range(db, start, end)
+    totals = ReportTotals()
+    docs = 0
+    moves = pd.Series(dtype=float)
+    flagged = []
+    if frozen:
+        marks = ", ".join([placeholder(db)] * len(frozen))
+        agg = db_query(db, f"""
+            SELECT kind, key, SUM(value) AS value FROM period_aggregates
+            WHERE period IN ({marks}) GROUP BY kind, key
+        """, frozen)
+        totals.add_frozen(agg[agg["kind"] != "move"])
+        docs += int(agg.loc[(agg["kind"] == "kpi") & (agg["key"] == "docs"), "value"].sum())
+        moves = moves.add(agg[agg["kind"] == "move"].set_index("key")["value"].astype(float), fill_value=0)
+        flagged = db_query(db, f"SELECT DISTINCT period FROM period_violations WHERE period IN ({marks}) ORDER BY period",
+                           frozen)["period"].tolist()
+    for a, b in live:
+        for part in iter_items(db, a, b):
+            totals.add(part)
+        docs += count_documents(db, a, b)
+        mv = moves_summary(db, datetime.combine(a, time.min), datetime.combine(b + timedelta(days=1), time.min))
+        moves = moves.add(mv.set_index("move_type")["qty"].astype(float), fill_value=0)
+    mv = moves.rename("qty").rename_axis("move_type").reset_index().sort_values("move_type").reset_index(drop=True)
+    return dict(totals.result(top_n), docs=docs, moves=mv, frozen=frozen, flagged=flagged)
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Închiderea lunilor (agregatele rapoartelor înghețate).")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    cls = sub.add_parser("close")
+    cls.add_argument("month", help="YYYY-MM")
+    cls.add_argument("--user", default="cli")
+    rop = sub.add_parser("reopen")
+    rop.add_argument("month", help="YYYY-MM")
+    vio = sub.add_parser("violations")
+    vio.add_argument("--period", default=None, help="YYYY-MM")
+    rep = sub.add_parser("report")
+    rep.add_argument("--start", required=True, type=date.fromisoformat)
+    rep.add_argument("--end", required=True, type=date.fromisoformat)
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "list":
+        print(closed_periods(db).to_csv(index=False), end="")
+    elif args.cmd == "close":
+        try:
+            n = close_period(db, args.month, args.user)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"{args.month} închisă ({n} agregate)", file=sys.stderr)
+    elif args.cmd == "reopen":
+        if not reopen_period(db, args.month):
+            print(f"{args.month} nu e închisă", file=sys.stderr)
+            return 1
+    elif args.cmd == "violations":
+        print(violations(db, args.period).to_csv(index=False), end="")
+    else:
+        r = report(db, args.start, args.end)
+        for k in ("docs", "lines", "total_rev", "total_cost", "labor_rev", "profit_est"):
+            print(f"{k},{r[k]:.2f}" if isinstance(r[k], float) else f"{k},{r[k]}")
+        print(f"frozen,{' '.join(r['frozen'])}")
+        if r["flagged"]:
+            print(f"flagged,{' '.join(r['flagged'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
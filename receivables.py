@@ -0,0 +1,218 @@
+"""Creanțe clienți: încasări, solduri per client, vechimea creanțelor și fișa de cont.
+
+    python -m receivables balances [--all]                      # soldurile (implicit doar cele pozitive), CSV
+    python -m receivables aging [--as-of 2024-06-30]            # neîncasat pe 0-30 / 31-60 / 60+ zile, CSV
+    python -m receivables statement 12 --start 2024-01-01 --end 2024-06-30 [--pdf fisa.pdf]
+    python -m receivables rebuild                                # soldurile recalculate din documente (verificare)
+
+Creanța vine doar din FACTURA cu client (BON = încasat pe loc, DEVIZ = ofertă). client_balances
+(facturat, încasat, sold) e ținut de triggere în aceeași tranzacție cu documentul / încasarea
+(vezi install_client_balances în database.py), pe fiecare nod în modul hibrid; soldul unui client
+e o citire pe cheie, iar fișa și documentele neîncasate folosesc doar documentele clientului
+(idx_invoices_client, idx_payments_client / idx_payments_invoice).
+"""
+import argparse
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from database import make_db, init_db, db_connect, db_query, placeholder, pooled_connection, now_ts
+from statements import execute, execute_many, render
+
+
+# -------------------- CONFIG --------------------
+PAYMENT_METHODS = ["NUMERAR", "CARD", "OP"]
+AGING_BUCKETS = ["0-30", "31-60", "60+"]    # zile de la data facturii
+EPS = 0.005                                  # sub un ban = achitat
+
+
+# -------------------- READ --------------------
+def client_balance(db, client_id):
+    """Soldul unui client: {invoiced, paid, balance} (zero dacă n-are facturi / încasări)."""
+    df = db_query(db, render(db, "client_balance"), (int(client_id),))
+    if df.empty:
+        return {"invoiced": 0.0, "paid": 0.0, "balance": 0.0}
+    return {k: round(float(df.iloc[0][k]), 2) for k in ("invoiced", "paid", "balance")}
+
+def balances(db, only_open=True):
+    """Soldurile clienților, cei mai mari datornici întâi (only_open: doar soldurile pozitive, indexul parțial)."""
+    df = db_query(db, f"""
+        SELECT b.client_id, c.name AS client_name, b.invoiced, b.paid, b.balance
+        FROM client_balances b JOIN clients c ON c.id = b.client_id
+        {f'WHERE b.balance > {EPS}' if only_open else ''}
+        ORDER BY b.balance DESC
+    """)
+    df[["invoiced", "paid", "balance"]] = df[["invoiced", "paid", "balance"]].astype(float).round(2)
+    return df
+
+def open_invoices(db, client_id=None):
+    """Facturile cu rest de plată (ale unui client sau ale tuturor clienților cu sold pozitiv), cele mai vechi întâi."""
+    if client_id is not None:
+        df = db_query(db, render(db, "open_invoices_client"), (int(client_id),))
+    else:
+        df = db_query(db, render(db, "open_invoices"), (EPS,))
+    df["open"] = (df["total"].astype(float) - df["paid"].astype(float)).round(2)
+    return df[df["open"] > EPS].reset_index(drop=True)
+
+def aging(db, as_of=None):
+    """Neîncasatul per client pe vechimi (AGING_BUCKETS). Încasările nealocate (avans) acoperă întâi facturile cele mai vechi."""
+    as_of = as_of or now_ts().date()
+    cols = ["client_id", "client_name"] + AGING_BUCKETS + ["total"]
+    inv = open_invoices(db)
+    bal = balances(db)
+    if inv.empty or bal.empty:
+        return pd.DataFrame(columns=cols)
+    inv = inv.merge(bal[["client_id", "client_name", "balance"]], on="client_id")
+    # avansul = ce n-a fost alocat pe facturi: suma resturilor - sold
+    credit = (inv.groupby("client_id")["open"].transform("sum") - inv["balance"]).clip(lower=0)
+    before = inv.groupby("client_id")["open"].cumsum() - inv["open"]
+    inv["open"] = inv["open"] - np.clip(credit - before, 0, inv["open"])
+    inv = inv[inv["open"] > EPS]
+    days = (pd.Timestamp(as_of) - inv["invoice_date"]).dt.days
+    inv = inv.assign(bucket=pd.cut(days, [-np.inf, 30, 60, np.inf], labels=AGING_BUCKETS))
+    out = inv.pivot_table(index=["client_id", "client_name"], columns="bucket", values="open",
+                          aggfunc="sum", fill_value=0.0, observed=False)
+    out = out.reindex(columns=AGING_BUCKETS, fill_value=0.0).round(2)
+    out["total"] = out[AGING_BUCKETS].sum(axis=1).round(2)
+    out.columns.name = None
+    return out.reset_index().sort_values("total", ascending=False)[cols].reset_index(drop=True)
+
+def statement(db, client_id, start, end):
+    """Fișa de cont a clientului în [start, end]: (sold inițial, rânduri, sold final).
+
+    Rânduri: doc_date, kind (FACTURA / INCASARE), doc, debit, credit, balance (sold după rând).
+    """
+    df = db_query(db, render(db, "client_statement"), (int(client_id), end, int(client_id), end))
+    df[["debit", "credit"]] = df[["debit", "credit"]].astype(float)
+    earlier = df["doc_date"] < pd.Timestamp(start)
+    opening = round(float((df.loc[earlier, "debit"] - df.loc[earlier, "credit"]).sum()), 2)
+    lines = df[~earlier].drop(columns="id").reset_index(drop=True)
+    lines["balance"] = (opening + (lines["debit"] - lines["credit"]).cumsum()).round(2)
+    closing = float(lines["balance"].iloc[-1]) if not lines.empty else opening
+    return opening, lines, closing
+
+
+# -------------------- WRITE --------------------
+def record_payment(db, client_id, amount, pay_date, method="NUMERAR", invoice_id=None, note="", user=None):
+    """Înregistrează o încasare. Fără `invoice_id`, suma se alocă facturilor neachitate ale clientului, cele
+    mai vechi întâi; ce rămâne e avans. O sumă negativă e o stornare (nu se alocă automat).
+
+    Return lista alocărilor [(invoice_id sau None, sumă)].
+    """
+    amount = round(float(amount), 2)
+    if abs(amount) < EPS:
+        raise ValueError("Suma trebuie să fie diferită de zero.")
+    client_id = int(client_id)
+    with pooled_connection(db) as conn:
+        cur = conn.cursor()
+        # alocările aceluiași client se serializează: altfel două încasări automate văd același rest
+        # de plată și achită amândouă aceeași factură
+        if db["type"] == "sqlite":
+            cur.execute("BEGIN IMMEDIATE")
+        if execute(cur, db, "client_lock", (client_id,)).fetchone() is None:
+            raise ValueError("Client inexistent.")
+        if invoice_id is not None or amount < 0:
+            parts = [(None if invoice_id is None else int(invoice_id), amount)]
+        else:
+            execute(cur, db, "open_invoices_client", (client_id,))
+            parts, left = [], amount
+            for inv_id, *_, total, paid in cur.fetchall():
+                due = round(float(total) - float(paid), 2)
+                if due > EPS and left > EPS:
+                    take = min(due, left)
+                    parts.append((int(inv_id), take))
+                    left = round(left - take, 2)
+            if left > EPS:
+                parts.append((None, left))
+        ts = now_ts()
+        execute_many(cur, db, "payment_insert", [(client_id, inv, amt, method, pay_date, note, user, ts) for inv, amt in parts])
+        conn.commit()
+    return parts
+
+
+# -------------------- MAINTENANCE --------------------
+def rebuild(db):
+    """Recalculează client_balances din facturi + încasări (set-wise). Return {clients, drift}: drift =
+    clienții al căror sold ținut de triggere diferea (restaurări parțiale, corecturi manuale în DB)."""
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        if db["type"] == "sqlite":
+            cur.execute("BEGIN IMMEDIATE")
+        else:
+            # documentele / încasările în curs așteaptă (triggerul lor scrie în client_balances)
+            cur.execute("LOCK TABLE client_balances IN EXCLUSIVE MODE")
+        cur.execute("SELECT client_id, balance FROM client_balances")
+        before = dict(cur.fetchall())
+        cur.execute("DELETE FROM client_balances")
+        cur.execute("""
+            INSERT INTO client_balances (client_id, invoiced, paid, balance)
+            SELECT client_id, SUM(inv), SUM(pay), SUM(inv) - SUM(pay)
+            FROM (
+                SELECT client_id, COALESCE(total, 0) AS inv, 0 AS pay FROM invoices WHERE type = 'FACTURA' AND client_id IS NOT NULL
+                UNION ALL
+                SELECT client_id, 0, amount FROM payments
+            ) x
+            GROUP BY client_id
+        """)
+        cur.execute("SELECT client_id, balance FROM client_balances")
+        after = dict(cur.fetchall())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    drift = sum(1 for c in set(before) | set(after) if abs(float(before.get(c, 0)) - float(after.get(c, 0))) > EPS)
+    return {"clients": len(after), "drift": drift}
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Creanțe clienți: solduri, vechime, fișă de cont, recalculare.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    bl = sub.add_parser("balances")
+    bl.add_argument("--all", action="store_true", help="și soldurile zero / negative (avansuri)")
+    ag = sub.add_parser("aging")
+    ag.add_argument("--as-of", type=date.fromisoformat, default=None)
+    stm = sub.add_parser("statement")
+    stm.add_argument("client_id", type=int)
+    stm.add_argument("--start", type=date.fromisoformat, required=True)
+    stm.add_argument("--end", type=date.fromisoformat, default=None)
+    stm.add_argument("--pdf", default=None, help="scrie fișa ca PDF în fișierul dat")
+    sub.add_parser("rebuild")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "balances":
+        print(balances(db, only_open=not args.all).to_csv(index=False), end="")
+    elif args.cmd == "aging":
+        print(aging(db, args.as_of).to_csv(index=False), end="")
+    elif args.cmd == "statement":
+        end = args.end or now_ts().date()
+        opening, lines, closing = statement(db, args.client_id, args.start, end)
+        if args.pdf:
+            # import târziu: reportlab doar pentru PDF
+            from pdf_invoice import build_statement_pdf
+            client = db_query(db, f"SELECT * FROM clients WHERE id = {placeholder(db)}", (args.client_id,))
+            if client.empty:
+                print(f"client inexistent: {args.client_id}", file=sys.stderr)
+                return 1
+            with open(args.pdf, "wb") as f:
+                f.write(build_statement_pdf(client.iloc[0].to_dict(), args.start, end, opening, lines, closing).getvalue())
+        else:
+            print(lines.to_csv(index=False), end="")
+        print(f"sold inițial {opening:.2f}, sold final {closing:.2f}", file=sys.stderr)
+    else:
+        out = rebuild(db)
+        print(f"clienți {out['clients']}, solduri corectate {out['drift']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
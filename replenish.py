@@ -0,0 +1,156 @@
+"""Reaprovizionare: consum per produs din stock_moves -> zile de acoperire, punct de comandă, cantitate sugerată.
+
+Consumul (SALE + SERVICE_USE + OUT) din fereastră (+ aceeași perioadă de anul trecut) se citește
+într-o singură interogare, apoi totul e calcul vectorizat (NumPy) pe tot catalogul. Rezultatul rămâne în cache până
+apar mișcări noi, se modifică un produs (stoc minim, preț, denumire...) sau se schimbă parametrii.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from database import db_query, now_ts, APP_TZ
+from archive import history_source
+
+
+# -------------------- CONFIG --------------------
+REORDER_WINDOW_DAYS = int(os.getenv("REORDER_WINDOW_DAYS", "90"))      # media lungă
+REORDER_SHORT_DAYS = int(os.getenv("REORDER_SHORT_DAYS", "14"))        # media scurtă (trend)
+REORDER_TREND_WEIGHT = float(os.getenv("REORDER_TREND_WEIGHT", "0.5"))  # ponderea mediei scurte
+REORDER_LEAD_DAYS = int(os.getenv("REORDER_LEAD_DAYS", "7"))           # termen de livrare furnizor
+REORDER_COVER_DAYS = int(os.getenv("REORDER_COVER_DAYS", "30"))        # acoperire țintă după recepție
+REORDER_SERVICE_Z = float(os.getenv("REORDER_SERVICE_Z", "1.65"))      # ~95% nivel de servire
+REORDER_SEASON_DAYS = int(os.getenv("REORDER_SEASON_DAYS", "365"))     # sezonalitate față de anul trecut (0 = off)
+
+CONSUMPTION_TYPES = ("SALE", "SERVICE_USE", "OUT")
+SEASON_CLIP = (0.5, 2.0)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _params(**overrides):
+    p = {
+        "window_days": REORDER_WINDOW_DAYS,
+        "short_days": REORDER_SHORT_DAYS,
+        "trend_weight": REORDER_TREND_WEIGHT,
+        "lead_days": REORDER_LEAD_DAYS,
+        "cover_days": REORDER_COVER_DAYS,
+        "service_z": REORDER_SERVICE_Z,
+        "season_days": REORDER_SEASON_DAYS,
+    }
+    p.update({k: v for k, v in overrides.items() if v is not None})
+    return p
+
+def _version(db):
+    # se schimbă la orice mișcare / produs nou; change_log: și la editarea unui produs (min_stock,
+    # purchase_price, name, unit nu ating stock_moves). MAX(id) pe cheia primară, nu o scanare
+    v = db_query(db, """
+        SELECT (SELECT MAX(id) FROM stock_moves) AS m, (SELECT MAX(id) FROM products) AS p,
+               (SELECT COUNT(*) FROM products) AS n, (SELECT MAX(id) FROM change_log) AS c
+    """).iloc[0]
+    return tuple(None if pd.isna(x) else int(x) for x in (v["m"], v["p"], v["n"], v["c"]))
+
+def _consumption(db, p, today):
+    """Mișcările de consum din fereastră + perioada corespunzătoare de anul trecut: (product_id, d, qty).
+
+    d = indexul zilei față de `ref` (cea mai veche zi citită); azi are indexul `back`.
+    """
+    W, h, season = p["window_days"], p["lead_days"] + p["cover_days"], p["season_days"]
+    back = W - 1 + (season if season else 0)
+    ref = datetime.combine(today - timedelta(days=back), datetime.min.time(), APP_TZ)
+    win0 = ref + timedelta(days=back - W + 1)
+    ly_end = ref + timedelta(days=W + h)
+
+    if db["type"] == "postgres":
+        ph, day = "%s", "FLOOR(EXTRACT(EPOCH FROM (created_at - %s)) / 86400)::int"
+    else:
+        ph, day = "?", "(created_at - ?) / 86400"
+    types = ",".join(f"'{t}'" for t in CONSUMPTION_TYPES)
+    where = f"created_at >= {ph}" if not season else f"(created_at >= {ph} AND created_at < {ph}) OR created_at >= {ph}"
+    params = (ref, win0) if not season else (ref, ref, ly_end, win0)
+    df = db_query(db, f"""
+        SELECT product_id, {day} AS d, qty
+        FROM {history_source(db, "stock_moves", ref)} sm
+        WHERE move_type IN ({types}) AND ({where})
+    """, params)
+    return df, back
+
+def _sum_by(idx, weights, mask, n):
+    return np.bincount(idx[mask], weights=weights[mask], minlength=n)
+
+def forecast(db, **overrides):
+    """Tot catalogul: consum/zi, zile de acoperire, punct de comandă, cantitate sugerată (DataFrame)."""
+    p = _params(**overrides)
+    today = now_ts().date()
+    key = (db.get("url") or db.get("path"), _version(db), today, tuple(sorted(p.items())))
+    with _cache_lock:
+        hit = _cache.get(key)
+    if hit is not None:
+        return hit.copy()
+
+    prods = db_query(db, "SELECT id, sku, name, unit, stock, min_stock, purchase_price FROM products ORDER BY id")
+    mv, today_idx = _consumption(db, p, today)
+    W, S, lead, season_days = p["window_days"], p["short_days"], p["lead_days"], p["season_days"]
+    h = lead + p["cover_days"]
+    n = len(prods)
+    num = lambda s: s.fillna(0.0).to_numpy(np.float64)
+    stock, min_stock = num(prods["stock"]), num(prods["min_stock"])
+
+    # mișcări -> poziția produsului în catalog
+    ids = prods["id"].to_numpy(np.int64)
+    pid = mv["product_id"].to_numpy(np.int64)
+    pos = np.searchsorted(ids, pid)
+    known = (pos < n) & (ids[np.minimum(pos, n - 1)] == pid)
+    pos, d, q = pos[known], mv["d"].to_numpy(np.int64)[known], num(mv["qty"])[known]
+
+    in_win = d > today_idx - W
+    win = _sum_by(pos, q, in_win, n)
+    short = _sum_by(pos, q, d > today_idx - S, n)
+    # abaterea consumului zilnic (zilele fără consum contează ca 0)
+    dw = np.clip(d[in_win] - (today_idx - W + 1), 0, W)
+    cell, inv = np.unique(pos[in_win] * (W + 1) + dw, return_inverse=True)
+    daily = np.bincount(inv, weights=q[in_win])
+    win_sq = np.bincount(cell // (W + 1), weights=daily * daily, minlength=n)
+
+    ma_long = win / W
+    ma_short = short / S
+    rate = p["trend_weight"] * ma_short + (1.0 - p["trend_weight"]) * ma_long
+    if season_days:
+        # anul trecut: perioada care urmează (h zile) față de fereastra dinaintea ei
+        ly0 = today_idx - season_days + 1
+        ly_h = _sum_by(pos, q, (d >= ly0) & (d < ly0 + h), n) / h
+        ly_b = _sum_by(pos, q, (d >= ly0 - W) & (d < ly0), n) / W
+        season = np.where(ly_b > 0, ly_h / np.where(ly_b > 0, ly_b, 1.0), 1.0)
+        season = np.clip(season, *SEASON_CLIP)
+    else:
+        season = np.ones(n)
+    rate = rate * season
+
+    sigma = np.sqrt(np.maximum(win_sq / W - ma_long ** 2, 0.0)) * season
+    safety = p["service_z"] * sigma * np.sqrt(lead)
+    reorder_point = np.maximum(rate * lead + safety, min_stock)
+    target = np.maximum(rate * h + safety, min_stock)
+    days_cover = np.where(rate > 0, stock / np.where(rate > 0, rate, 1.0), np.inf)
+    suggested = np.where(stock <= reorder_point, np.ceil(np.maximum(target - stock, 0.0)), 0.0)
+
+    out = pd.DataFrame({
+        "id": prods["id"], "sku": prods["sku"], "name": prods["name"], "unit": prods["unit"],
+        "stock": stock, "min_stock": min_stock,
+        "daily_rate": rate.round(3), "season_idx": season.round(2),
+        "days_cover": days_cover.round(1), "reorder_point": reorder_point.round(2),
+        "suggested_qty": suggested,
+        "est_cost": (suggested * num(prods["purchase_price"])).round(2),
+    })
+    with _cache_lock:
+        _cache.clear()          # o singură versiune (ultima) per proces
+        _cache[key] = out
+    return out.copy()
+
+def suggestions(db, **overrides):
+    """Doar produsele de comandat, cele mai urgente primele."""
+    df = forecast(db, **overrides)
+    df = df[df["suggested_qty"] > 0]
+    return df.sort_values(["days_cover", "suggested_qty"], ascending=[True, False]).reset_index(drop=True)
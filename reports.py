@@ -0,0 +1,370 @@
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+
+from database import db_query, db_frame, iter_frames, fan_out, placeholder, APP_TZ
+from archive import history_source
+from xlsx import Workbook
+
+
+# -------------------- DASHBOARD --------------------
+def dashboard_counts(db):
+    # un singur round trip pentru toate contoarele
+    row = db_query(db, """
+        SELECT (SELECT COUNT(*) FROM products) AS products,
+               (SELECT COUNT(*) FROM clients) AS clients,
+               (SELECT COUNT(*) FROM service_orders) AS service_orders,
+               (SELECT COUNT(*) FROM products WHERE min_stock>0 AND stock<=min_stock) AS low_stock
+    """).iloc[0]
+    return {k: int(row[k]) for k in ("products", "clients", "service_orders", "low_stock")}
+
+def low_stock(db, limit=50):
+    return db_query(db, f"""
+        SELECT id, sku, name, stock, min_stock, unit, location
+        FROM products
+        WHERE min_stock > 0 AND stock <= min_stock
+        ORDER BY (min_stock - stock) DESC
+        LIMIT {int(limit)}
+    """)
+
+def recent_service_orders(db, limit=10):
+    return db_query(db, f"""
+        SELECT id, code, status, device, created_at
+        FROM service_orders
+        ORDER BY id DESC
+        LIMIT {int(limit)}
+    """)
+
+def recent_invoices(db, limit=10):
+    return db_query(db, f"""
+        SELECT id, type, series, number, invoice_date, created_at
+        FROM invoices
+        ORDER BY id DESC
+        LIMIT {int(limit)}
+    """)
+
+
+# -------------------- REPORTS --------------------
+def load_invoices(db, start, end):
+    """Documentele din interval [start, end]."""
+    ph = placeholder(db)
+    return db_frame(db, f"""
+        SELECT i.*, c.name AS client_name
+        FROM invoices i
+        LEFT JOIN clients c ON c.id=i.client_id
+        WHERE invoice_date BETWEEN {ph} AND {ph}
+        ORDER BY i.id DESC
+    """, (start, end))
+
+def load_items(db, start, end):
+    """Liniile documentelor din interval [start, end] (inclusiv cele arhivate)."""
+    ph = placeholder(db)
+    return db_frame(db, f"""
+        SELECT it.*, i.series, i.number, i.type
+        FROM {history_source(db, "invoice_items", start, end)} it
+        JOIN invoices i ON i.id=it.invoice_id
+        WHERE it.invoice_date BETWEEN {ph} AND {ph}
+    """, (start, end))
+
+def load_report(db, start, end):
+    """Documentele + liniile din interval [start, end] (cele două interogări în paralel)."""
+    out = fan_out(inv=(load_invoices, db, start, end), items=(load_items, db, start, end))
+    return out["inv"], out["items"]
+
+def summarize_report(inv, items, top_n=15):
+    """KPI + venit pe zile + top produse/clienți din rezultatul `load_report`."""
+    # compute totals per invoice
+    if not items.empty:
+        items["line_total"] = items["qty"].astype(float) * items["unit_price"].astype(float)
+        items["line_cost"] = items["qty"].astype(float) * items["cost_price"].astype(float)
+
+    total_rev = float(items["line_total"].sum()) if not items.empty else 0.0
+    total_cost = float(items.loc[items["item_type"]=="PRODUCT", "line_cost"].sum()) if not items.empty else 0.0
+    labor_rev = float(items.loc[items["item_type"]=="LABOR", "line_total"].sum()) if not items.empty else 0.0
+    out = {
+        "total_rev": total_rev,
+        "total_cost": total_cost,
+        "labor_rev": labor_rev,
+        "profit_est": total_rev - total_cost,  # labor treated as revenue; cost 0
+        "daily": None,
+        "top_products": None,
+        "top_clients": None,
+    }
+    if not items.empty:
+        daily = items.groupby("invoice_date")["line_total"].sum().reset_index()
+        out["daily"] = daily.sort_values("invoice_date")
+        out["top_products"] = items[items["item_type"]=="PRODUCT"].groupby("description")["line_total"].sum().reset_index().sort_values("line_total", ascending=False).head(top_n)
+        if not inv.empty:
+            # join for client name
+            inv_small = inv[["id","client_name"]].rename(columns={"id":"invoice_id"})
+            itj = items.merge(inv_small, on="invoice_id", how="left")
+            out["top_clients"] = itj.groupby(itj["client_name"].fillna("—"))["line_total"].sum().reset_index().sort_values("line_total", ascending=False).head(top_n)
+    return out
+
+
+# -------------------- EXPORT EXCEL --------------------
+# foaia "Linii": (coloana din iter_items, antet)
+LINE_COLUMNS = [("invoice_date", "Data"), ("series", "Serie"), ("number", "Număr"), ("type", "Tip document"),
+                ("client_name", "Client"), ("item_type", "Tip linie"), ("description", "Descriere"),
+                ("qty", "Cantitate"), ("unit_price", "Preț unitar"), ("cost_price", "Cost unitar"), ("line_total", "Valoare")]
+
+def iter_items(db, start, end, chunk=None):
+    """Liniile din [start, end] (+ documentul și clientul), pe bucăți de DataFrame (vezi iter_frames)."""
+    ph = placeholder(db)
+    for part in iter_frames(db, f"""
+        SELECT it.invoice_date, i.series, i.number, i.type, c.name AS client_name,
+               it.item_type, it.description, it.qty, it.unit_price, it.cost_price
+        FROM {history_source(db, "invoice_items", start, end)} it
+        JOIN invoices i ON i.id = it.invoice_id
+        LEFT JOIN clients c ON c.id = i.client_id
+        WHERE it.invoice_date BETWEEN {ph} AND {ph}
+        ORDER BY it.invoice_date, it.invoice_id, it.id
+    """, (start, end), chunk):
+        part["qty"] = part["qty"].astype(float)
+        part["line_total"] = part["qty"] * part["unit_price"].astype(float)
+        part["line_cost"] = part["qty"] * part["cost_price"].astype(float)
+        yield part
+
+def count_documents(db, start, end):
+    ph = placeholder(db)
+    return int(db_query(db, f"SELECT COUNT(*) AS n FROM invoices WHERE invoice_date BETWEEN {ph} AND {ph}",
+                        (start, end)).iloc[0]["n"])
+
+class ReportTotals:
+    """Agregatele din summarize_report, acumulate bucată cu bucată: memoria ~ zile + produse + clienți, nu linii."""
+
+    def __init__(self):
+        self.total_rev = self.total_cost = self.labor_rev = 0.0
+        self.lines = 0
+        self.daily = self.products = self.clients = pd.Series(dtype=float)
+
+    def add(self, items):
+        products = items[items["item_type"] == "PRODUCT"]
+        self.lines += len(items)
+        self.total_rev += float(items["line_total"].sum())
+        self.total_cost += float(products["line_cost"].sum())
+        self.labor_rev += float(items.loc[items["item_type"] == "LABOR", "line_total"].sum())
+        self.daily = self.daily.add(items.groupby("invoice_date")["line_total"].sum(), fill_value=0)
+        self.products = self.products.add(products.groupby("description")["line_total"].sum(), fill_value=0)
+        self.clients = self.clients.add(items.groupby(items["client_name"].fillna("—"))["line_total"].sum(), fill_value=0)
+
+    def frozen(self):
+        """Agregatele ca rânduri (kind, key, value) pentru period_aggregates (periods.close_period)."""
+        rows = [("kpi", k, float(getattr(self, k))) for k in ("total_rev", "total_cost", "labor_rev", "lines")]
+        rows += [("daily", f"{d:%Y-%m-%d}", float(v)) for d, v in self.daily.items()]
+        rows += [("product", str(k), float(v)) for k, v in self.products.items()]
+        rows += [("client", str(k), float(v)) for k, v in self.clients.items()]
+        return rows
+
+    def add_frozen(self, agg):
+        """Adaugă agregatele înghețate (DataFrame kind, key, value) ale unor luni închise."""
+        kind = {k: g.set_index("key")["value"].astype(float) for k, g in agg.groupby("kind")}
+        kpi = kind.get("kpi", pd.Series(dtype=float))
+        self.total_rev += float(kpi.get("total_rev", 0.0))
+        self.total_cost += float(kpi.get("total_cost", 0.0))
+        self.labor_rev += float(kpi.get("labor_rev", 0.0))
+        self.lines += int(kpi.get("lines", 0))
+        if "daily" in kind:
+            self.daily = self.daily.add(kind["daily"].set_axis(pd.to_datetime(kind["daily"].index)), fill_value=0)
+        for name, attr in (("product", "products"), ("client", "clients")):
+            if name in kind:
+                setattr(self, attr, getattr(self, attr).add(kind[name], fill_value=0))
+
+    def result(self, top_n=15):
+        def top(s, name):
+            return s.rename("line_total").rename_axis(name).reset_index().sort_values("line_total", ascending=False).head(top_n)
+        has = self.lines > 0
+        return {
+            "total_rev": self.total_rev,
+            "total_cost": self.total_cost,
+            "labor_rev": self.labor_rev,
+            "profit_est": self.total_rev - self.total_cost,
+            "daily": self.daily.rename("line_total").rename_axis("invoice_date").reset_index().sort_values("invoice_date") if has else None,
+            "top_products": top(self.products, "description") if has else None,
+            "top_clients": top(self.clients, "client_name") if has else None,
+            "lines": self.lines,
+        }
+
+def export_workbook(db, start, end, target, top_n=15, lines=True, chunk=None):
+    """Rapoartele din [start, end] ca XLSX (câte o foaie per secțiune), scris în flux în `target` (cale / BytesIO).
+
+    Cu `lines`, liniile se citesc o singură dată, pe bucăți: fiecare bucată e adăugată la agregate și
+    scrisă imediat în foaia "Linii" - nici liniile, nici foile nu se țin în memorie. Fără linii,
+    agregatele vin din periods.report (lunile închise din cache).
+    """
+    with Workbook(target) as wb:
+        if lines:
+            totals = ReportTotals()
+
+            def line_rows():
+                for part in iter_items(db, start, end, chunk):
+                    totals.add(part)
+                    yield from part[[c for c, _ in LINE_COLUMNS]].itertuples(index=False, name=None)
+
+            wb.add_sheet("Linii", [h for _, h in LINE_COLUMNS], line_rows(),
+                         widths=[12, 8, 10, 12, 30, 10, 40, 10, 12, 12, 14])
+            rep = dict(totals.result(top_n), docs=count_documents(db, start, end),
+                       moves=moves_summary(db, datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)))
+        else:
+            # fără linii: lunile închise vin din cache, doar restul se calculează
+            from periods import report
+            rep = report(db, start, end, top_n)
+        kpi = [("De la", start), ("Până la", end), ("Documente", rep["docs"]), ("Linii", rep["lines"]),
+               ("Venit brut", rep["total_rev"]), ("Cost marfă (est.)", rep["total_cost"]),
+               ("Manoperă (venit)", rep["labor_rev"]), ("Profit estimat", rep["profit_est"])]
+        wb.add_sheet("Indicatori", ["Indicator", "Valoare"], kpi, widths=[22, 16], index=0)
+        empty = pd.DataFrame()
+        for i, (name, df, cols, widths) in enumerate([
+            ("Venit pe zile", rep["daily"], ["Data", "Venit"], [12, 16]),
+            ("Top produse", rep["top_products"], ["Produs", "Valoare"], [40, 16]),
+            ("Top clienți", rep["top_clients"], ["Client", "Valoare"], [30, 16]),
+            ("Mișcări stoc", rep["moves"], ["Tip mișcare", "Cantitate"], [14, 14]),
+        ], 1):
+            df = empty if df is None else df
+            wb.add_sheet(name, cols, df.itertuples(index=False, name=None), widths=widths, index=i)
+    return rep
+
+
+# -------------------- STOC --------------------
+def moves_summary(db, since=None, until=None):
+    """Cantitățile mutate per tip de mișcare în [since, until) (implicit ultimele 30 de zile), agregate în SQL."""
+    since = since or datetime.combine(date.today() - timedelta(days=30), time.min)
+    ph = placeholder(db)
+    where, params = f"created_at >= {ph}", [since]
+    if until is not None:
+        where, params = where + f" AND created_at < {ph}", params + [until]
+    mv = db_frame(db, f"""
+        SELECT move_type, SUM(qty) AS qty
+        FROM {history_source(db, "stock_moves", since, until)} sm
+        WHERE {where}
+        GROUP BY move_type
+        ORDER BY move_type
+    """, params)
+    mv["qty"] = mv["qty"].astype(float)
+    return mv
+
+def low_stock_by_location(db, location_id=None, limit=100):
+    """Alerte stoc minim pe locație (stock_balances.min_qty), opțional doar pentru o locație."""
+    ph = placeholder(db)
+    where, params = "", ()
+    if location_id is not None:
+        where, params = f" AND b.location_id = {ph}", (int(location_id),)
+    return db_query(db, f"""
+        SELECT l.code AS location, l.warehouse, p.sku, p.name, b.qty, b.min_qty, p.stock AS total_stock, p.unit
+        FROM stock_balances b
+        JOIN stock_locations l ON l.id = b.location_id
+        JOIN products p ON p.id = b.product_id
+        WHERE b.min_qty > 0 AND b.qty <= b.min_qty{where}
+        ORDER BY (b.min_qty - b.qty) DESC
+        LIMIT {int(limit)}
+    """, params)
+
+def low_stock_report(db, limit=100):
+    return db_query(db, f"SELECT sku,name,stock,min_stock,unit,location FROM products WHERE min_stock>0 AND stock<=min_stock ORDER BY (min_stock-stock) DESC LIMIT {int(limit)}")
+
+
+# -------------------- SERVICE (timpi per etapă) --------------------
+SERVICE_STAGES = ["NOU", "IN_LUCRU", "GATA", "TOTAL"]   # TOTAL = de la creare până la LIVRAT
+TURNAROUND_BY = {"technician": "Tehnician", "device_type": "Tip echipament", "period": "Lună"}
+
+def aging_board(db, limit=500):
+    """Fișele nelivrate, cele mai vechi în statusul curent întâi (indexul parțial idx_service_orders_open)."""
+    df = db_query(db, f"""
+        SELECT o.id, o.code, o.status, o.technician, o.device, c.name AS client_name, o.status_at, o.created_at
+        FROM service_orders o
+        LEFT JOIN clients c ON c.id = o.client_id
+        WHERE o.status <> 'LIVRAT'
+        ORDER BY o.status_at
+        LIMIT {int(limit)}
+    """)
+    now = pd.Timestamp(datetime.now(APP_TZ).replace(tzinfo=None))
+    df["in_status_h"] = ((now - df["status_at"]).dt.total_seconds() / 3600).round(1)
+    df["open_h"] = ((now - df["created_at"]).dt.total_seconds() / 3600).round(1)
+    return df
+
+def open_counts(db):
+    """Câte fișe sunt în fiecare status deschis + cea mai veche intrare în status."""
+    return db_query(db, """
+        SELECT status, COUNT(*) AS n, MIN(status_at) AS oldest_at
+        FROM service_orders WHERE status <> 'LIVRAT'
+        GROUP BY status ORDER BY status
+    """)
+
+def service_intervals(db, start, end):
+    """Intervalele de status încheiate în [start, end] (+ livrările din interval), din service_order_events.
+
+    Coloane: service_order_id, status, technician, device, entered_at, left_at, opened_at.
+    """
+    ph = placeholder(db)
+    t0 = datetime.combine(start, time.min)
+    t1 = datetime.combine(end + timedelta(days=1), time.min)
+    # LEAD pe toate evenimentele fișelor atinse în perioadă: intervalul se închide la evenimentul următor
+    return db_query(db, f"""
+        SELECT w.service_order_id, w.status, w.technician, o.device, w.entered_at, w.left_at, w.opened_at
+        FROM (
+            SELECT e.service_order_id, e.to_status AS status, e.technician, e.changed_at AS entered_at,
+                   LEAD(e.changed_at) OVER (PARTITION BY e.service_order_id ORDER BY e.changed_at, e.id) AS left_at,
+                   MIN(e.changed_at) OVER (PARTITION BY e.service_order_id) AS opened_at
+            FROM service_order_events e
+            WHERE e.service_order_id IN (
+                SELECT service_order_id FROM service_order_events WHERE changed_at >= {ph} AND changed_at < {ph}
+            )
+        ) w
+        JOIN service_orders o ON o.id = w.service_order_id
+        WHERE (w.left_at >= {ph} AND w.left_at < {ph}) OR (w.status = 'LIVRAT' AND w.entered_at >= {ph} AND w.entered_at < {ph})
+    """, (t0, t1, t0, t1, t0, t1))
+
+def turnaround(intervals, by="technician"):
+    """Percentilele timpului (ore) per etapă, grupate după `by` (vezi TURNAROUND_BY); vectorizat în pandas."""
+    cols = [by, "stage", "n", "p50_h", "p90_h", "max_h"]
+    if intervals.empty:
+        return pd.DataFrame(columns=cols)
+    df = intervals
+    stage = df[df["status"].isin(SERVICE_STAGES[:-1]) & df["left_at"].notna()]
+    total = df[df["status"] == "LIVRAT"]
+    df = pd.concat([
+        stage.assign(stage=stage["status"], hours=(stage["left_at"] - stage["entered_at"]).dt.total_seconds() / 3600,
+                     ended_at=stage["left_at"]),
+        total.assign(stage="TOTAL", hours=(total["entered_at"] - total["opened_at"]).dt.total_seconds() / 3600,
+                     ended_at=total["entered_at"]),
+    ], ignore_index=True)
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    df["technician"] = df["technician"].fillna("—")
+    df["device_type"] = df["device"].fillna("").str.split().str[0].str.upper().fillna("—")
+    df["period"] = df["ended_at"].dt.to_period("M").astype(str)
+    df["stage"] = pd.Categorical(df["stage"], SERVICE_STAGES, ordered=True)
+
+    g = df.groupby([by, "stage"], observed=True)["hours"]
+    q = g.quantile([0.5, 0.9]).unstack()
+    out = pd.DataFrame({"n": g.size(), "p50_h": q[0.5], "p90_h": q[0.9], "max_h": g.max()}).reset_index()
+    out[["p50_h", "p90_h", "max_h"]] = out[["p50_h", "p90_h", "max_h"]].round(1)
+    return out[cols]
+
+
+# -------------------- EXPORT --------------------
+EXPORTS = {
+    "produse": "SELECT * FROM products ORDER BY id DESC",
+    "clienti": "SELECT * FROM clients ORDER BY id DESC",
+    "stoc_moves": lambda db: f"""
+        SELECT sm.*, p.sku, p.name AS product
+        FROM {history_source(db, "stock_moves")} sm JOIN products p ON p.id=sm.product_id
+        ORDER BY sm.id DESC
+    """,
+    "service_orders": "SELECT * FROM service_orders ORDER BY id DESC",
+    "service_order_events": "SELECT * FROM service_order_events ORDER BY id DESC",
+    "payments": """
+        SELECT p.*, c.name AS client_name, i.series, i.number
+        FROM payments p JOIN clients c ON c.id=p.client_id LEFT JOIN invoices i ON i.id=p.invoice_id
+        ORDER BY p.id DESC
+    """,
+}
+
+def export_sql(db, name):
+    """SQL-ul exportului; intrările care depind de db (lunile arhivate pe SQLite) sunt funcții de db."""
+    sql = EXPORTS[name]
+    return sql(db) if callable(sql) else sql
+
+def export_csv(db, name) -> bytes:
+    df = db_frame(db, export_sql(db, name))
+    return df.to_csv(index=False).encode("utf-8")
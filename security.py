@@ -0,0 +1,58 @@
+import os
+import hmac
+import hashlib
+import secrets
+
+import metrics
+
+
+# -------------------- CONFIG --------------------
+# hash-urile noi: "<algo>$<iterații>$<hex>" în users.pass_hash (salt rămâne în users.salt)
+# hash-urile vechi (doar hex) = pbkdf2_sha256 cu 120k iterații; se re-hash-uiesc la login reușit
+PASSWORD_ALGO = os.getenv("PASSWORD_ALGO", "pbkdf2_sha256")          # pbkdf2_sha256 / pbkdf2_sha512
+PASSWORD_ITERATIONS = int(os.getenv("PASSWORD_ITERATIONS", "120000"))
+LEGACY_ALGO, LEGACY_ITERATIONS = "pbkdf2_sha256", 120_000
+
+_DIGESTS = {"pbkdf2_sha256": "sha256", "pbkdf2_sha512": "sha512"}
+
+
+# -------------------- SECURITY (PASSWORDS) --------------------
+def _derive(password: str, salt: str, algo: str, iterations: int) -> str:
+    dk = hashlib.pbkdf2_hmac(_DIGESTS[algo], password.encode("utf-8"), salt.encode("utf-8"), iterations)
+    return dk.hex()
+
+def hash_password(password: str, salt: str, algo: str = None, iterations: int = None) -> str:
+    algo = algo or PASSWORD_ALGO
+    iterations = int(iterations or PASSWORD_ITERATIONS)
+    return f"{algo}${iterations}${_derive(password, salt, algo, iterations)}"
+
+def parse_hash(stored_hash: str):
+    """Return (algo, iterations, hex) - acceptă și formatul vechi (doar hex). None dacă hash-ul e corupt."""
+    parts = (stored_hash or "").split("$")
+    if len(parts) == 3 and parts[0] in _DIGESTS:
+        try:
+            iterations = int(parts[1])
+        except ValueError:
+            return None
+        return (parts[0], iterations, parts[2]) if iterations > 0 else None
+    return LEGACY_ALGO, LEGACY_ITERATIONS, stored_hash or ""
+
+def make_salt():
+    return secrets.token_hex(16)
+
+@metrics.timed(metrics.PASSWORD_SECONDS.labels())
+def verify_password(password: str, salt: str, stored_hash: str) -> bool:
+    parsed = parse_hash(stored_hash)
+    if parsed is None:
+        # users.pass_hash corupt: nicio parolă nu se potrivește
+        return False
+    algo, iterations, expected = parsed
+    # comparație în timp constant
+    return hmac.compare_digest(_derive(password, salt, algo, iterations), expected)
+
+def needs_rehash(stored_hash: str) -> bool:
+    parsed = parse_hash(stored_hash)
+    if parsed is None:
+        return True
+    algo, iterations, _ = parsed
+    return "$" not in (stored_hash or "") or algo != PASSWORD_ALGO or iterations != PASSWORD_ITERATIONS
@@ -0,0 +1,296 @@
+"""Registrul de statement-uri: SQL-ul scris o dată (cu ?), randat per motor la import.
+
+Pe Postgres, statement-urile din PREPARED rulează ca prepared statements (PREPARE o dată per
+conexiune din pool, apoi EXECUTE): parse / plan nu se mai repetă la fiecare mișcare de stoc,
+linie de document sau scanare. PG_PREPARE=0 le dezactivează (pentru comparație în bench).
+"""
+import os
+import re
+
+from database import adapt_params, pooled_connection
+
+
+PG_PREPARE = os.getenv("PG_PREPARE", "1") != "0"
+
+# rest de plată per factură = total - încasările alocate ei
+_OPEN_INVOICES = """
+    SELECT i.id AS invoice_id, i.client_id, i.series, i.number, i.invoice_date, COALESCE(i.total, 0) AS total,
+           COALESCE((SELECT SUM(p.amount) FROM payments p WHERE p.invoice_id = i.id), 0) AS paid
+    FROM invoices i
+    WHERE i.type = 'FACTURA' AND {where}
+    ORDER BY i.client_id, i.invoice_date, i.id
+"""
+
+# valoare str = același SQL pe ambele motoare; dict = variantă per motor
+STATEMENTS = {
+    # stoc (post_moves / _write_stock_move / transfer_stock)
+    "product_lock": {
+        "sqlite": "SELECT stock FROM products WHERE id = ?",
+        # rândul produsului rămâne blocat până la commit
+        "postgres": "SELECT stock FROM products WHERE id = ? FOR UPDATE",
+    },
+    "stock_update": "UPDATE products SET stock = stock + ? WHERE id = ?",
+    "balance_get": "SELECT qty FROM stock_balances WHERE product_id = ? AND location_id = ?",
+    "balance_add": """
+        INSERT INTO stock_balances (product_id, location_id, qty) VALUES (?, ?, ?)
+        ON CONFLICT (product_id, location_id) DO UPDATE SET qty = stock_balances.qty + excluded.qty
+    """,
+    "move_insert": """
+        INSERT INTO stock_moves (product_id, move_type, qty, delta, note, ref_doc, created_at, location_id, unit_cost)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    # cost FIFO (costing.cost_move)
+    "layer_open": {
+        "sqlite": "SELECT id, qty_left, unit_cost FROM cost_layers WHERE product_id = ? AND qty_left > 0 ORDER BY id LIMIT 8",
+        "postgres": "SELECT id, qty_left, unit_cost FROM cost_layers WHERE product_id = ? AND qty_left > 0 ORDER BY id LIMIT 8 FOR UPDATE",
+    },
+    "layer_consume": "UPDATE cost_layers SET qty_left = ? WHERE id = ?",
+    "layer_last": "SELECT unit_cost FROM cost_layers WHERE product_id = ? ORDER BY id DESC LIMIT 1",
+    "layer_insert": "INSERT INTO cost_layers (product_id, qty, qty_left, unit_cost, created_at) VALUES (?, ?, ?, ?, ?)",
+    "product_cost": "SELECT purchase_price FROM products WHERE id = ?",
+    "product_name": "SELECT name FROM products WHERE id = ?",
+    # checkpoint-uri de stoc (ledger)
+    "checkpoint_take": """
+        INSERT INTO stock_checkpoints (last_move_id, product_id, stock, taken_at)
+        SELECT ?, id, COALESCE(stock, 0), ? FROM products
+    """,
+    "checkpoint_stock": "SELECT product_id, stock FROM stock_checkpoints WHERE last_move_id = ?",
+    "checkpoint_before": "SELECT MAX(last_move_id) AS m FROM stock_checkpoints WHERE taken_at <= ?",
+    "checkpoint_after": "SELECT MIN(last_move_id) AS m FROM stock_checkpoints WHERE taken_at > ?",
+    "moves_since": "SELECT product_id, SUM(delta) AS delta FROM stock_moves WHERE id > ? GROUP BY product_id",
+    # inventar (stocktake)
+    "session_insert": {
+        "sqlite": "INSERT INTO stocktake_sessions (name, location_id, status, created_by, created_at) VALUES (?, ?, 'OPEN', ?, ?)",
+        "postgres": """
+            INSERT INTO stocktake_sessions (name, location_id, status, created_by, created_at) VALUES (?, ?, 'OPEN', ?, ?)
+            RETURNING id
+        """,
+    },
+    "session_lock": {
+        "sqlite": "SELECT status, location_id, name FROM stocktake_sessions WHERE id = ?",
+        "postgres": "SELECT status, location_id, name FROM stocktake_sessions WHERE id = ? FOR UPDATE",
+    },
+    "session_location": "SELECT location_id FROM stocktake_sessions WHERE id = ?",
+    "session_cancel": "UPDATE stocktake_sessions SET status = 'CANCELLED' WHERE id = ?",
+    "session_applied": "UPDATE stocktake_sessions SET status = 'APPLIED', applied_at = ? WHERE id = ?",
+    "count_set": """
+        INSERT INTO stocktake_counts (session_id, product_id, counted, counted_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (session_id, product_id) DO UPDATE SET counted = excluded.counted, counted_at = excluded.counted_at
+    """,
+    "count_add": """
+        INSERT INTO stocktake_counts (session_id, product_id, counted, counted_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (session_id, product_id) DO UPDATE SET counted = stocktake_counts.counted + excluded.counted,
+                                                          counted_at = excluded.counted_at
+    """,
+    "count_result": """
+        INSERT INTO stocktake_counts (session_id, product_id, counted, expected, delta, counted_at) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (session_id, product_id) DO UPDATE SET expected = excluded.expected, delta = excluded.delta
+    """,
+    # locații
+    "location_by_code": "SELECT id FROM stock_locations WHERE code = ?",
+    "location_code": "SELECT code FROM stock_locations WHERE id = ?",
+    "location_insert": "INSERT INTO stock_locations (code, name, active, created_at) VALUES (?, ?, 1, ?)",
+    "product_location": "SELECT location FROM products WHERE id = ?",
+    "product_balances": "SELECT location_id, qty FROM stock_balances WHERE product_id = ?",
+    "product_home_locations": """
+        SELECT p.id, l.id FROM products p
+        LEFT JOIN stock_locations l ON l.code = COALESCE(NULLIF(TRIM(p.location), ''), ?)
+    """,
+    # feed de modificări (changelog)
+    "consumer_offset": "SELECT last_id FROM change_log_consumers WHERE name = ?",
+    "consumer_save": """
+        INSERT INTO change_log_consumers (name, last_id, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at
+    """,
+    "consumer_forget": "DELETE FROM change_log_consumers WHERE name = ?",
+    "consumer_pending": """
+        SELECT c.name, c.last_id, c.updated_at,
+               (SELECT COUNT(*) FROM change_log l WHERE l.id > c.last_id) AS pending
+        FROM change_log_consumers c ORDER BY c.name
+    """,
+    "log_compact": """
+        DELETE FROM change_log WHERE changed_at < ? AND EXISTS (
+            SELECT 1 FROM change_log n
+            WHERE n.table_name = change_log.table_name AND n.row_id = change_log.row_id AND n.id > change_log.id
+        )
+    """,
+    "log_expire": "DELETE FROM change_log WHERE changed_at < ?",
+    "log_expire_read": "DELETE FROM change_log WHERE changed_at < ? AND id <= ?",
+    # luni închise (periods)
+    "period_of_day": "SELECT period FROM closed_periods WHERE start_date <= ? AND end_date > ?",
+    "period_get": "SELECT period FROM closed_periods WHERE period = ?",
+    "period_insert": """
+        INSERT INTO closed_periods (period, start_date, end_date, start_at, end_at, closed_by) VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "period_aggregate_insert": "INSERT INTO period_aggregates (period, kind, key, value) VALUES (?, ?, ?, ?)",
+    "period_closed": "UPDATE closed_periods SET closed_at = ? WHERE period = ?",
+    "period_delete": "DELETE FROM closed_periods WHERE period = ?",
+    "periods_closed_within": """
+        SELECT period FROM closed_periods WHERE closed_at IS NOT NULL AND start_date >= ? AND end_date <= ?
+    """,
+    # documente
+    # numerotare: lock pe serie (doar Postgres; pe SQLite ajunge BEGIN IMMEDIATE) + MAX(number) + 1 sub el
+    "invoice_series_lock": "SELECT pg_advisory_xact_lock(hashtext('invoices'), hashtext(?))",
+    "invoice_next_number": "SELECT COALESCE(MAX(number), 0) + 1 FROM invoices WHERE series = ?",
+    "invoice_insert": {
+        "sqlite": """
+            INSERT INTO invoices (series, number, invoice_date, client_id, type, vat_percent, discount_percent, notes, created_at, total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        "postgres": """
+            INSERT INTO invoices (series, number, invoice_date, client_id, type, vat_percent, discount_percent, notes, created_at, total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING id
+        """,
+    },
+    "item_insert": """
+        INSERT INTO invoice_items (invoice_id, item_type, product_id, description, qty, unit_price, cost_price, invoice_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    # invoice_date: pruning pe partiția documentului (Postgres)
+    "item_ids": "SELECT id FROM invoice_items WHERE invoice_id = ? AND invoice_date = ? ORDER BY id",
+    "item_cost_update": "UPDATE invoice_items SET cost_price = ? WHERE id = ? AND invoice_date = ?",
+    # încasări (receivables.record_payment): clientul blocat cât se alocă plata (pe SQLite ține BEGIN IMMEDIATE).
+    # Rândul din clients există mereu, cel din client_balances abia după primul document
+    "client_lock": {
+        "sqlite": "SELECT id FROM clients WHERE id = ?",
+        "postgres": "SELECT id FROM clients WHERE id = ? FOR NO KEY UPDATE",
+    },
+    "client_balance": "SELECT invoiced, paid, balance FROM client_balances WHERE client_id = ?",
+    "open_invoices_client": _OPEN_INVOICES.format(where="i.client_id = ?"),
+    # clienții cu sold peste pragul dat
+    "open_invoices": _OPEN_INVOICES.format(where="i.client_id IN (SELECT client_id FROM client_balances WHERE balance > ?)"),
+    "client_statement": """
+        SELECT i.invoice_date AS doc_date, 'FACTURA' AS kind, i.series || '-' || i.number AS doc,
+               COALESCE(i.total, 0) AS debit, 0 AS credit, i.id
+        FROM invoices i
+        WHERE i.client_id = ? AND i.type = 'FACTURA' AND i.invoice_date <= ?
+        UNION ALL
+        SELECT p.pay_date, 'INCASARE', COALESCE(p.method, '') || ' ' || COALESCE(f.series || '-' || f.number, 'avans'),
+               0, p.amount, p.id
+        FROM payments p
+        LEFT JOIN invoices f ON f.id = p.invoice_id
+        WHERE p.client_id = ? AND p.pay_date <= ?
+        ORDER BY doc_date, kind, id
+    """,
+    "payment_insert": """
+        INSERT INTO payments (client_id, invoice_id, amount, method, pay_date, note, created_by, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    # scanare: cod necunoscut în dict-ul din proces
+    "product_lookup": """
+        SELECT id AS product_id FROM products WHERE sku = ?
+        UNION ALL
+        SELECT product_id FROM product_barcodes WHERE barcode = ?
+    """,
+    # produse / service
+    "product_insert": {
+        "sqlite": """
+            INSERT INTO products (sku, name, category, unit, purchase_price, sale_price, stock, min_stock, location, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        "postgres": """
+            INSERT INTO products (sku, name, category, unit, purchase_price, sale_price, stock, min_stock, location, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING id
+        """,
+    },
+    "balance_init": "INSERT INTO stock_balances (product_id, location_id, qty, min_qty) VALUES (?, ?, 0, ?)",
+    "product_stock": "SELECT stock FROM products WHERE id = ?",
+    "product_stock_set": "UPDATE products SET stock = ? WHERE id = ?",
+    "client_insert": """
+        INSERT INTO clients (name, phone, email, address, notes, created_at, tax_id, city, county)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "service_code_last": "SELECT code FROM service_orders WHERE code LIKE ? ORDER BY id DESC LIMIT 1",
+    "service_order_insert": {
+        "sqlite": """
+            INSERT INTO service_orders (code, client_id, device, serial, issue, status, labor_price, notes, technician,
+                                        created_at, updated_at, status_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        "postgres": """
+            INSERT INTO service_orders (code, client_id, device, serial, issue, status, labor_price, notes, technician,
+                                        created_at, updated_at, status_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING id
+        """,
+    },
+    "service_order_lock": {
+        "sqlite": "SELECT status, technician FROM service_orders WHERE id = ?",
+        "postgres": "SELECT status, technician FROM service_orders WHERE id = ? FOR UPDATE",
+    },
+    "service_order_update": """
+        UPDATE service_orders SET status = ?, labor_price = ?, notes = ?, technician = ?, updated_at = ?,
+               status_at = CASE WHEN status = ? THEN status_at ELSE ? END
+        WHERE id = ?
+    """,
+    "service_event_insert": """
+        INSERT INTO service_order_events (service_order_id, from_status, to_status, technician, changed_by, changed_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    # utilizatori (login / admin)
+    "user_by_username": "SELECT * FROM users WHERE username = ? AND active = 1",
+    "user_insert": """
+        INSERT INTO users (username, full_name, role, salt, pass_hash, active, created_at)
+        VALUES (?, ?, ?, ?, ?, 1, ?)
+    """,
+    "user_role_update": "UPDATE users SET role = ?, active = ? WHERE id = ?",
+    "user_password_update": "UPDATE users SET salt = ?, pass_hash = ? WHERE id = ?",
+}
+
+# cele mai dese (per rând de stoc / linie de document / scanare)
+PREPARED = {"product_lock", "stock_update", "balance_get", "balance_add", "move_insert", "item_insert", "product_lookup",
+            "layer_open", "layer_consume", "layer_last", "layer_insert"}
+
+
+def _render(name, dialect):
+    sql = STATEMENTS[name]
+    sql = sql[dialect] if isinstance(sql, dict) else sql
+    sql = " ".join(sql.split())
+    if dialect == "sqlite":
+        return {"sql": sql}
+    out = {"sql": sql.replace("?", "%s")}
+    if name in PREPARED:
+        n = sql.count("?")
+        numbered = iter(range(1, n + 1))
+        out["prepare"] = f"PREPARE {name} AS " + re.sub(r"\?", lambda _: f"${next(numbered)}", sql)
+        out["execute"] = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * n)})" if n else "")
+    return out
+
+RENDERED = {dialect: {name: _render(name, dialect) for name in STATEMENTS} for dialect in ("sqlite", "postgres")}
+
+
+def render(db, name):
+    """SQL-ul randat pentru motorul db (pentru db_query / db_exec)."""
+    return RENDERED[db["type"]][name]["sql"]
+
+def sql_for(cur, db, name):
+    """SQL-ul de rulat pe cursorul dat: EXECUTE pe o conexiune din pool (prepared o dată), altfel SQL-ul randat."""
+    st = RENDERED[db["type"]][name]
+    prepared = getattr(cur.connection, "prepared", None) if "execute" in st and PG_PREPARE else None
+    if prepared is None:
+        return st["sql"]
+    if name not in prepared:
+        cur.execute(st["prepare"])
+        prepared.add(name)
+    return st["execute"]
+
+def execute(cur, db, name, params=()):
+    cur.execute(sql_for(cur, db, name), adapt_params(db, params))
+    return cur
+
+def inserted_id(cur, db):
+    # Postgres: RETURNING id; SQLite: lastrowid
+    return int(cur.fetchone()[0]) if db["type"] == "postgres" else int(cur.lastrowid)
+
+def execute_many(cur, db, name, rows):
+    rows = [adapt_params(db, r) for r in rows]
+    if rows:
+        cur.executemany(sql_for(cur, db, name), rows)
+
+def query_rows(db, name, params=()):
+    """Rândurile (tupluri) unui statement de citire, pe o conexiune din pool."""
+    with pooled_connection(db) as conn:
+        cur = conn.cursor()
+        try:
+            return execute(cur, db, name, params).fetchall()
+        finally:
+            cur.close()
@@ -0,0 +1,298 @@
+"""Inventar (stock-take): sesiune -> numărători (CSV / scanner) -> diferențe -> aplicare.
+
+    python -m stocktake open "Inventar 2026" [--location R1-A2]
+    python -m stocktake load 3 numarare.csv [--add]       # coloane: sku, counted
+    python -m stocktake diff 3 [--zero-missing]
+    python -m stocktake apply 3 [--zero-missing]
+
+Numărătorile stau în stocktake_counts; diferențele față de stoc (products.stock sau soldul
+locației sesiunii) se calculează într-o singură interogare, iar ajustările (ADJ) se scriu
+toate într-o tranzacție, cu scrieri în lot.
+"""
+import argparse
+import io
+import sys
+import time
+
+import pandas as pd
+
+import metrics
+from database import make_db, init_db, db_connect, db_query, placeholder, now_ts, DEFAULT_LOCATION
+from statements import execute, execute_many, inserted_id, render
+from business import allocate_out, post_moves, code_map
+
+
+TOLERANCE = 1e-6
+
+
+# -------------------- SESSIONS --------------------
+def open_session(db, name, location_id=None, user=None):
+    """Sesiune nouă (location_id=None = stocul total al produselor). Return id-ul."""
+    if not name.strip():
+        raise ValueError("Denumirea sesiunii e obligatorie.")
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        execute(cur, db, "session_insert", (name.strip(), None if location_id is None else int(location_id), user, now_ts()))
+        sid = inserted_id(cur, db)
+        conn.commit()
+    finally:
+        conn.close()
+    return sid
+
+def sessions(db, status=None):
+    sql = """
+        SELECT s.id, s.name, l.code AS location, s.status, s.created_by, s.created_at, s.applied_at,
+               (SELECT COUNT(*) FROM stocktake_counts c WHERE c.session_id = s.id) AS counted_products
+        FROM stocktake_sessions s LEFT JOIN stock_locations l ON l.id = s.location_id
+    """
+    if status:
+        return db_query(db, sql + f" WHERE s.status = {placeholder(db)} ORDER BY s.id DESC", (status,))
+    return db_query(db, sql + " ORDER BY s.id DESC")
+
+def _session(cur, db, session_id):
+    # blocată până la commit: o singură aplicare / anulare
+    execute(cur, db, "session_lock", (int(session_id),))
+    row = cur.fetchone()
+    if row is None:
+        raise ValueError("Sesiune inexistentă.")
+    if row[0] != "OPEN":
+        raise ValueError(f"Sesiunea e {row[0]}.")
+    return row
+
+def cancel_session(db, session_id):
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        _session(cur, db, session_id)
+        execute(cur, db, "session_cancel", (int(session_id),))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# -------------------- COUNTS --------------------
+def parse_scans(text):
+    """Linii de scanner: "SKU" (= 1 buc) sau "SKU;cant" / "SKU,cant" / "SKU<tab>cant". Return DataFrame (sku, counted)."""
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        for sep in (";", "\t", ","):
+            if sep in line:
+                sku, qty = line.rsplit(sep, 1)
+                rows.append((sku.strip(), float(qty.replace(",", ".") if sep != "," else qty)))
+                break
+        else:
+            rows.append((line, 1.0))
+    df = pd.DataFrame(rows, columns=["sku", "counted"])
+    return df.groupby("sku", as_index=False)["counted"].sum()
+
+def read_counts_csv(data):
+    """CSV cu coloanele sku + counted (sau qty / cantitate). Return DataFrame (sku, counted) însumat pe SKU."""
+    df = pd.read_csv(io.BytesIO(data) if isinstance(data, bytes) else data, dtype={"sku": str}, sep=None, engine="python")
+    df.columns = [c.strip().lower() for c in df.columns]
+    qty = next((c for c in ("counted", "qty", "cantitate") if c in df.columns), None)
+    if "sku" not in df.columns or qty is None:
+        raise ValueError("CSV-ul trebuie să aibă coloanele sku și counted (sau qty / cantitate).")
+    df = df[["sku", qty]].rename(columns={qty: "counted"}).dropna(subset=["sku"])
+    df["sku"] = df["sku"].astype(str).str.strip()
+    df["counted"] = pd.to_numeric(df["counted"], errors="coerce").fillna(0.0)
+    return df.groupby("sku", as_index=False)["counted"].sum()
+
+def load_counts(db, session_id, counts, mode="set"):
+    """Încarcă numărătorile (DataFrame sku, counted; sku poate fi și cod de bare) în sesiune.
+
+    mode="set" înlocuiește numărătoarea produsului, "add" o adună (scanări repetate).
+    Return lista SKU-urilor necunoscute.
+    """
+    # SKU sau cod de bare; un produs scanat cu coduri diferite se adună
+    codes = code_map(db)
+    df = counts.assign(product_id=counts["sku"].map(codes))
+    unknown = df.loc[df["product_id"].isna(), "sku"].tolist()
+    df = df.dropna(subset=["product_id"]).groupby("product_id", as_index=False)["counted"].sum()
+    ts = now_ts()
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        if db["type"] == "sqlite":
+            cur.execute("BEGIN IMMEDIATE")
+        _session(cur, db, session_id)
+        execute_many(cur, db, "count_set" if mode == "set" else "count_add",
+                     [(int(session_id), int(pid), float(q), ts) for pid, q in zip(df["product_id"], df["counted"])])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return unknown
+
+
+# -------------------- DIFFERENCES / APPLY --------------------
+def _diff_query(db, location_id, zero_missing):
+    """(sql, params fără session_id): product_id, sku, name, unit, purchase_price, expected, counted."""
+    ph = placeholder(db)
+    cols = "p.id AS product_id, p.sku, p.name, p.unit, p.purchase_price"
+    if location_id is None:
+        sql = f"""
+            SELECT {cols}, COALESCE(p.stock, 0) AS expected, c.counted
+            FROM stocktake_counts c JOIN products p ON p.id = c.product_id
+            WHERE c.session_id = {ph}
+        """
+        missing = f"""
+            SELECT {cols}, p.stock AS expected, 0 AS counted
+            FROM products p
+            WHERE COALESCE(p.stock, 0) <> 0
+              AND NOT EXISTS (SELECT 1 FROM stocktake_counts c WHERE c.session_id = {ph} AND c.product_id = p.id)
+        """
+        return sql + (" UNION ALL " + missing if zero_missing else ""), ()
+    sql = f"""
+        SELECT {cols}, COALESCE(b.qty, 0) AS expected, c.counted
+        FROM stocktake_counts c
+        JOIN products p ON p.id = c.product_id
+        LEFT JOIN stock_balances b ON b.product_id = c.product_id AND b.location_id = {ph}
+        WHERE c.session_id = {ph}
+    """
+    missing = f"""
+        SELECT {cols}, b.qty AS expected, 0 AS counted
+        FROM stock_balances b JOIN products p ON p.id = b.product_id
+        WHERE b.location_id = {ph} AND b.qty <> 0
+          AND NOT EXISTS (SELECT 1 FROM stocktake_counts c WHERE c.session_id = {ph} AND c.product_id = b.product_id)
+    """
+    return sql + (" UNION ALL " + missing if zero_missing else ""), (int(location_id),)
+
+def _params(session_id, loc_params, zero_missing):
+    # ordinea placeholder-elor din _diff_query
+    sid = int(session_id)
+    if not loc_params:
+        return (sid, sid) if zero_missing else (sid,)
+    loc = loc_params[0]
+    return (loc, sid, loc, sid) if zero_missing else (loc, sid)
+
+def differences(db, session_id, zero_missing=False, only_diff=True):
+    """Numărat vs stoc pentru sesiune (cu valoarea diferenței la cost). zero_missing: produsele cu stoc
+    nenumărate intră cu 0."""
+    sess = db_query(db, render(db, "session_location"), (int(session_id),))
+    if sess.empty:
+        raise ValueError("Sesiune inexistentă.")
+    loc = sess.iloc[0]["location_id"]
+    loc = None if pd.isna(loc) else int(loc)
+    sql, loc_params = _diff_query(db, loc, zero_missing)
+    df = db_query(db, sql + " ORDER BY 3", _params(session_id, loc_params, zero_missing))
+    df["expected"] = df["expected"].astype(float)
+    df["counted"] = df["counted"].astype(float)
+    df["delta"] = df["counted"] - df["expected"]
+    df["value_delta"] = (df["delta"] * df["purchase_price"].fillna(0.0).astype(float)).round(2)
+    if only_diff:
+        df = df[df["delta"].abs() > TOLERANCE]
+    return df.reset_index(drop=True)
+
+def apply_session(db, session_id, zero_missing=False):
+    """Aplică toate diferențele sesiunii ca ADJ într-o singură tranzacție și închide sesiunea.
+
+    Sesiune pe locație: soldul locației devine numărătoarea. Sesiune pe total: plusurile intră în
+    locația de bază a produsului, minusurile se iau din locațiile cu stoc (cele mai pline întâi).
+    Return dict cu numărul de produse / mișcări și totalurile.
+    """
+    sid = int(session_id)
+    t0 = time.perf_counter()
+    conn = db_connect(db)
+    try:
+        cur = conn.cursor()
+        if db["type"] == "sqlite":
+            cur.execute("BEGIN IMMEDIATE")
+        else:
+            # oprește mișcările de stoc concurente cât timp citim stocul și scriem ajustările
+            cur.execute("LOCK TABLE products IN SHARE ROW EXCLUSIVE MODE")
+        _, loc, name = _session(cur, db, sid)
+        loc = None if loc is None else int(loc)
+        sql, loc_params = _diff_query(db, loc, zero_missing)
+        cur.execute(f"SELECT product_id, expected, counted FROM ({sql}) d", _params(sid, loc_params, zero_missing))
+        rows = [(int(pid), float(exp or 0.0), float(cnt)) for pid, exp, cnt in cur.fetchall()]
+        changed = [(pid, exp, cnt, cnt - exp) for pid, exp, cnt in rows if abs(cnt - exp) > TOLERANCE]
+
+        note, ref = f"Inventar: {name}", f"INV-{sid}"
+        moves = []
+        if loc is not None:
+            moves = [(pid, loc, "ADJ", cnt, d, note, ref) for pid, _, cnt, d in changed]
+        elif changed:
+            cur_home = dict(execute(cur, db, "product_home_locations", (DEFAULT_LOCATION,)).fetchall())
+            execute(cur, db, "location_by_code", (DEFAULT_LOCATION,))
+            default_loc = cur.fetchone()[0]
+            cur.execute("SELECT product_id, location_id, qty FROM stock_balances")
+            balances = {}
+            for pid, l, q in cur.fetchall():
+                balances.setdefault(int(pid), {})[int(l)] = float(q or 0.0)
+            for pid, _, _, d in changed:
+                have = balances.get(pid, {})
+                home = cur_home.get(pid) or default_loc
+                parts = [(home, d)] if d > 0 or not have else allocate_out(d, list(have.items()))
+                for l, part in parts:
+                    moves.append((pid, int(l), "ADJ", have.get(l, 0.0) + part, part, note, ref))
+
+        post_moves(cur, db, moves)
+        ts = now_ts()
+        execute_many(cur, db, "count_result", [(sid, pid, cnt, exp, cnt - exp, ts) for pid, exp, cnt in rows])
+        execute(cur, db, "session_applied", (ts, sid))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        metrics.DB_SECONDS.labels("tx", db["type"]).observe(time.perf_counter() - t0)
+    return {
+        "products": len(changed),
+        "moves": len(moves),
+        "plus": sum(d for *_, d in changed if d > 0),
+        "minus": sum(d for *_, d in changed if d < 0),
+    }
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Inventar: sesiuni de numărare, diferențe, aplicare.")
+    p.add_argument("--sqlite", default=None, help="cale fișier SQLite (implicit DATABASE_URL / SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    op = sub.add_parser("open")
+    op.add_argument("name")
+    op.add_argument("--location", default=None, help="codul locației (implicit: stocul total)")
+    ld = sub.add_parser("load")
+    ld.add_argument("session", type=int)
+    ld.add_argument("csv")
+    ld.add_argument("--add", action="store_true", help="adună la numărătorile existente")
+    for cmd in ("diff", "apply"):
+        c = sub.add_parser(cmd)
+        c.add_argument("session", type=int)
+        c.add_argument("--zero-missing", action="store_true", help="produsele cu stoc nenumărate devin 0")
+    args = p.parse_args(argv)
+
+    db = make_db(url="", path=args.sqlite) if args.sqlite else make_db()
+    init_db(db)
+
+    if args.cmd == "open":
+        loc = None
+        if args.location:
+            df = db_query(db, render(db, "location_by_code"), (args.location,))
+            if df.empty:
+                print(f"locație inexistentă: {args.location}", file=sys.stderr)
+                return 1
+            loc = int(df.iloc[0]["id"])
+        print(open_session(db, args.name, loc, user="cli"))
+    elif args.cmd == "load":
+        with open(args.csv, "rb") as f:
+            unknown = load_counts(db, args.session, read_counts_csv(f.read()), mode="add" if args.add else "set")
+        if unknown:
+            print(f"{len(unknown)} SKU necunoscute: {', '.join(unknown[:20])}", file=sys.stderr)
+    elif args.cmd == "diff":
+        print(differences(db, args.session, args.zero_missing).to_csv(index=False), end="")
+    else:
+        out = apply_session(db, args.session, args.zero_missing)
+        print(f"{out['products']} produse ajustate ({out['moves']} mișcări), +{out['plus']:g} / {out['minus']:g}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
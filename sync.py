@@ -0,0 +1,828 @@
+"""Mod hibrid (offline-first): aplicația lucrează pe un SQLite local, un worker îl sincronizează cu Postgres.
+
+    python -m sync once        # un ciclu: push, apoi pull
+    python -m sync run         # ciclu la SYNC_INTERVAL_SECONDS
+    python -m sync status      # în așteptare, watermark-uri, conflicte
+
+Activare: DATABASE_URL (Postgres central) + HYBRID_SQLITE_PATH (fișierul local al casei). Scrierile
+locale sunt jurnalizate prin triggere în sync_outbox.
+
+- push: intrările din sync_outbox, în ordine, câte SYNC_BATCH într-o tranzacție Postgres. Id-urile
+  locale și cele din Postgres sunt independente (sync_map); rândurile trimise poartă sync_origin
+  (nod:id local), deci un lot retrimis după o întrerupere nu se dublează.
+- pull: rândurile cu row_version > watermark (secvență globală, setată de trigger în Postgres) plus
+  ștergerile (sync_deletes), tabel cu tabel în ordinea cheilor străine. Versiunile se iau din secvență
+  la scriere, dar se comit în altă ordine: watermark-ul nu trece de orizontul sigur (_horizon), sub care
+  nu mai există tranzacții în curs cu versiuni necomise.
+
+Conflicte: stocul (products.stock, stock_balances.qty) nu se copiază ca valoare. Postgres adună delta
+fiecărei mișcări trimise, iar local stocul = stocul din Postgres + delta mișcărilor locale încă
+netrimise, deci vânzările făcute offline pe mai multe case se adună; un stoc negativ rezultat e trecut
+în sync_conflicts. Costul FIFO (cost_layers) nu se sincronizează: fiecare nod își ține propriile straturi,
+iar fiecare mișcare adusă de la alt nod (la push în Postgres, la pull local) trece prin cost_move pe
+straturile nodului, deci stocul și straturile rămân aliniate peste tot. Mișcarea păstrează costul
+calculat unde a fost creată; `python -m costing recompute` pe Postgres reface din tot istoricul
+costurile și cost_price pe linii (sursa de adevăr pentru COGS consolidat). Produsele / locațiile / userii cu același SKU / cod / username sunt aceeași
+entitate. Un număr de document sau cod de fișă deja folosit în Postgres primește un număr nou (și
+local). Restul câmpurilor: ultima scriere câștigă (push înainte de pull).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, date, timedelta
+
+import metrics
+from database import make_db, init_db, db_connect, sqlite_connect, now_ts, APP_TZ, EPOCH_DAY0
+from costing import cost_move
+from statements import execute
+
+
+# -------------------- CONFIG --------------------
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "10"))
+SYNC_MAX_BACKOFF_SECONDS = float(os.getenv("SYNC_MAX_BACKOFF_SECONDS", "120"))   # offline: reîncercări tot mai rare
+SYNC_BATCH = int(os.getenv("SYNC_BATCH", "500"))
+SYNC_NODE = os.getenv("SYNC_NODE", "").strip()          # implicit: id generat la prima pornire
+
+# ordinea = ordinea cheilor străine.
+# key: cheie compusă (fără id / sync_map); natural: aceeași entitate pe toate nodurile;
+# unique: se renumerotează la conflict; derived: stoc, niciodată copiat ca valoare;
+# append: doar INSERT (arhivarea locală nu șterge nimic în Postgres).
+# client_balances nu se sincronizează: îl țin triggerele, pe fiecare nod, din invoices / payments
+TABLES = {
+    "users": {"natural": ("username",)},
+    "clients": {},
+    "stock_locations": {"natural": ("code",)},
+    "products": {"natural": ("sku",), "derived": "stock"},
+    "product_barcodes": {"key": ("barcode",), "fks": {"product_id": "products"}},
+    "stock_balances": {"key": ("product_id", "location_id"), "derived": "qty",
+                       "fks": {"product_id": "products", "location_id": "stock_locations"}},
+    "service_orders": {"unique": ("code",), "fks": {"client_id": "clients"}},
+    "service_order_events": {"append": True, "fks": {"service_order_id": "service_orders"}},
+    "invoices": {"unique": ("series", "number"), "fks": {"client_id": "clients"}},
+    "invoice_items": {"append": True, "fks": {"invoice_id": "invoices", "product_id": "products"}},
+    "payments": {"append": True, "fks": {"client_id": "clients", "invoice_id": "invoices"}},
+    "stock_moves": {"append": True, "fks": {"product_id": "products", "location_id": "stock_locations"}},
+}
+
+LOCAL_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS sync_outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_key TEXT NOT NULL, -- id sau cheia compusă (a:b)
+        op TEXT NOT NULL -- I / U / D
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_map (
+        table_name TEXT NOT NULL,
+        local_id INTEGER NOT NULL,
+        remote_id INTEGER NOT NULL,
+        PRIMARY KEY (table_name, local_id)
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_map_remote ON sync_map(table_name, remote_id)",
+    "CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value TEXT)",
+    """
+    CREATE TABLE IF NOT EXISTS sync_conflicts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT,
+        detail TEXT,
+        created_at INTEGER
+    )
+    """,
+]
+
+# obiectele instalate în Postgres în afara tabelelor aplicației (backup.py le șterge înainte de pg_restore)
+PG_OBJECTS = ["TABLE sync_deletes", "FUNCTION sync_bump()", "FUNCTION sync_tombstone()", "SEQUENCE sync_version_seq"]
+
+_status = {"state": "oprit", "pending": 0, "pushed": 0, "pulled": 0, "last_ok": None, "error": ""}
+_status_lock = threading.Lock()
+_remote_ready = set()
+_columns = {}
+
+
+def is_hybrid(db):
+    return db.get("remote") is not None
+
+def _is_keyed(table):
+    return "key" in TABLES[table]
+
+
+# -------------------- VALUES --------------------
+def _to_remote(col, v):
+    # SQLite: *_at = epoch (secunde), *_date = zile de la 1970-01-01
+    if v is None:
+        return None
+    if col.endswith("_at"):
+        return datetime.fromtimestamp(v, APP_TZ)
+    if col.endswith("_date"):
+        return EPOCH_DAY0 + timedelta(days=int(v))
+    return v
+
+def _to_local(v):
+    if isinstance(v, datetime):
+        return int((v if v.tzinfo else v.replace(tzinfo=APP_TZ)).timestamp())
+    if isinstance(v, date):
+        return (v - EPOCH_DAY0).days
+    return v
+
+def _split_key(table, row_key):
+    key = TABLES[table].get("key")
+    if key is None:
+        return {"id": int(row_key)}
+    parts = row_key.split(":") if len(key) > 1 else [row_key]
+    return {c: (int(p) if c.endswith("_id") else p) for c, p in zip(key, parts)}
+
+def _where(cols, ph):
+    return " AND ".join(f"{c} = {ph}" for c in cols)
+
+
+# -------------------- INSTALL --------------------
+def _meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM sync_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT INTO sync_meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                 (key, str(value)))
+
+def _local_columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+def install_local(db):
+    """Tabelele de sincronizare + triggerele care jurnalizează scrierile locale în sync_outbox."""
+    conn = sqlite_connect(db["path"])
+    try:
+        for ddl in LOCAL_DDL:
+            conn.execute(ddl)
+        first = _meta(conn, "node") is None
+        if first:
+            _set_meta(conn, "node", SYNC_NODE or uuid.uuid4().hex[:12])
+        # rândurile aplicate de sync (pull / renumerotări) nu se jurnalizează
+        guard = "WHEN NOT EXISTS (SELECT 1 FROM sync_meta WHERE key = 'applying')"
+        for table, spec in TABLES.items():
+            key = spec.get("key", ("id",))
+            tracked = [c for c in _local_columns(conn, table) if c != "id" and c != spec.get("derived")]
+            events = [("i", "INSERT", "NEW")]
+            if not spec.get("append"):
+                events += [("u", f"UPDATE OF {', '.join(tracked)}", "NEW"), ("d", "DELETE", "OLD")]
+            for op, event, ref in events:
+                row_key = " || ':' || ".join(f"{ref}.{c}" for c in key)
+                conn.execute(f"DROP TRIGGER IF EXISTS sync_{table}_{op}")
+                conn.execute(f"""
+                    CREATE TRIGGER sync_{table}_{op} AFTER {event} ON {table} {guard}
+                    BEGIN
+                        INSERT INTO sync_outbox (table_name, row_key, op) VALUES ('{table}', {row_key}, '{op.upper()}');
+                    END
+                """)
+            if first:
+                # datele existente înainte de activarea modului hibrid se trimit la primul push
+                row_key = " || ':' || ".join(key)
+                conn.execute(f"INSERT INTO sync_outbox (table_name, row_key, op) SELECT '{table}', {row_key}, 'I' FROM {table}")
+        conn.commit()
+    finally:
+        conn.close()
+
+def install_remote(remote):
+    """Postgres: row_version (secvență globală) + sync_origin pe tabelele sincronizate, ștergerile în sync_deletes."""
+    conn = db_connect(remote)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('sync_install'))")
+            cur.execute("CREATE SEQUENCE IF NOT EXISTS sync_version_seq")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS sync_deletes (
+                    row_version BIGINT PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    old_row JSONB NOT NULL
+                )
+            """)
+            # lock partajat cât timp tranzacția ține versiuni necomise (vezi _horizon)
+            cur.execute("""
+                CREATE OR REPLACE FUNCTION sync_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM pg_advisory_xact_lock_shared(hashtext('sync_version'));
+                    NEW.row_version := nextval('sync_version_seq');
+                    RETURN NEW;
+                END $$
+            """)
+            cur.execute("""
+                CREATE OR REPLACE FUNCTION sync_tombstone() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM pg_advisory_xact_lock_shared(hashtext('sync_version'));
+                    INSERT INTO sync_deletes VALUES (nextval('sync_version_seq'), TG_TABLE_NAME, to_jsonb(OLD));
+                    RETURN OLD;
+                END $$
+            """)
+            cur.execute("SELECT c.relname FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid WHERE t.tgname = 'sync_bump'")
+            done = {r[0] for r in cur.fetchall()}
+            for table, spec in TABLES.items():
+                if table in done:
+                    continue
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_version BIGINT")
+                if not _is_keyed(table):
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS sync_origin TEXT")
+                    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_sync_origin ON {table}(sync_origin)")
+                cur.execute(f"UPDATE {table} SET row_version = nextval('sync_version_seq') WHERE row_version IS NULL")
+                cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_row_version ON {table}(row_version)")
+                cur.execute(f"CREATE TRIGGER sync_bump BEFORE INSERT OR UPDATE ON {table} "
+                            f"FOR EACH ROW EXECUTE FUNCTION sync_bump()")
+                if not spec.get("append"):
+                    cur.execute(f"DROP TRIGGER IF EXISTS sync_tombstone ON {table}")
+                    cur.execute(f"CREATE TRIGGER sync_tombstone AFTER DELETE ON {table} "
+                                f"FOR EACH ROW EXECUTE FUNCTION sync_tombstone()")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def reset_remote():
+    # după o restaurare: instalarea se verifică din nou la următorul ciclu
+    _remote_ready.clear()
+    _columns.clear()
+
+def _ensure_remote(db):
+    key = db["remote"]["url"]
+    if key not in _remote_ready:
+        init_db(db["remote"])
+        install_remote(db["remote"])
+        _remote_ready.add(key)
+
+def _columns_for(lconn, rcur, table):
+    # coloanele comune (schema locală poate fi mai veche / mai nouă decât cea din Postgres)
+    if table not in _columns:
+        rcur.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))
+        remote = {r[0] for r in rcur.fetchall()}
+        _columns[table] = [c for c in _local_columns(lconn, table) if c != "id" and c in remote]
+    return _columns[table]
+
+
+# -------------------- MAP --------------------
+def _mapped(lconn, table, local_id=None, remote_id=None):
+    if local_id is not None:
+        row = lconn.execute("SELECT remote_id FROM sync_map WHERE table_name = ? AND local_id = ?", (table, local_id)).fetchone()
+    else:
+        row = lconn.execute("SELECT local_id FROM sync_map WHERE table_name = ? AND remote_id = ?", (table, remote_id)).fetchone()
+    return row[0] if row else None
+
+def _map(lconn, table, local_id, remote_id):
+    lconn.execute("DELETE FROM sync_map WHERE table_name = ? AND remote_id = ?", (table, remote_id))
+    lconn.execute("INSERT OR REPLACE INTO sync_map (table_name, local_id, remote_id) VALUES (?, ?, ?)",
+                  (table, local_id, remote_id))
+
+def _conflict(lconn, table, detail):
+    lconn.execute("INSERT INTO sync_conflicts (table_name, detail, created_at) VALUES (?, ?, ?)",
+                  (table, detail, int(now_ts().timestamp())))
+
+
+# -------------------- PUSH --------------------
+class _Push:
+    """Un lot din sync_outbox trimis într-o singură tranzacție Postgres."""
+
+    def __init__(self, lconn, rcur, node, rdb):
+        self.l, self.r, self.node, self.rdb = lconn, rcur, node, rdb
+        self.maps = {}          # (tabel, id local) -> id Postgres, scrise local după commit
+        self.unmaps = []
+        self.renames = {}       # ref_doc vechi -> nou (documente renumerotate)
+        self.local_sql = []     # actualizări locale după commit (renumerotări)
+        self.touched = set()    # produse cu stoc modificat în Postgres
+
+    def remote_id(self, table, local_id, create=True):
+        if local_id is None:
+            return None
+        rid = self.maps.get((table, local_id))
+        if rid is None:
+            rid = _mapped(self.l, table, local_id=local_id)
+        if rid is None:
+            self.r.execute(f"SELECT id FROM {table} WHERE sync_origin = %s", (f"{self.node}:{local_id}",))
+            row = self.r.fetchone()
+            if row:
+                rid = self.maps[(table, local_id)] = row[0]
+        if rid is None and create:
+            # părinte netrimis încă (ex: creat înainte de instalarea triggerelor)
+            self.push_row(table, local_id, "I")
+            rid = self.maps.get((table, local_id))
+        return rid
+
+    def _values(self, table, row):
+        spec = TABLES[table]
+        cols = [c for c in _columns_for(self.l, self.r, table) if c != spec.get("derived")]
+        vals = {c: _to_remote(c, row[c]) for c in cols}
+        for fk, parent in spec.get("fks", {}).items():
+            if fk in vals:
+                vals[fk] = self.remote_id(parent, vals[fk])
+        if table == "stock_moves" and vals.get("ref_doc") in self.renames:
+            vals["ref_doc"] = self.renames[vals["ref_doc"]]
+        return vals
+
+    def push(self, table, row_key, op):
+        if _is_keyed(table):
+            self.push_keyed(table, _split_key(table, row_key), op)
+        else:
+            self.push_row(table, int(row_key), op)
+
+    def push_keyed(self, table, key, op):
+        spec = TABLES[table]
+        rkey = dict(key)
+        for fk, parent in spec.get("fks", {}).items():
+            if fk in rkey:
+                rkey[fk] = self.remote_id(parent, rkey[fk], create=op != "D")
+        if op == "D":
+            if None not in rkey.values():
+                self.r.execute(f"DELETE FROM {table} WHERE {_where(rkey, '%s')}", tuple(rkey.values()))
+            return
+        row = self.l.execute(f"SELECT * FROM {table} WHERE {_where(key, '?')}", tuple(key.values())).fetchone()
+        if row is None:
+            return
+        vals = self._values(table, row)
+        names = list(vals)
+        upd = [c for c in names if c not in spec["key"]]
+        self.r.execute(f"""
+            INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})
+            ON CONFLICT ({', '.join(spec['key'])}) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in upd)}
+        """, tuple(vals.values()))
+
+    def push_row(self, table, local_id, op):
+        spec = TABLES[table]
+        if op == "D":
+            rid = self.remote_id(table, local_id, create=False)
+            if rid is not None:
+                self.r.execute(f"DELETE FROM {table} WHERE id = %s", (rid,))
+                self.unmaps.append((table, local_id))
+            return
+        row = self.l.execute(f"SELECT * FROM {table} WHERE id = ?", (local_id,)).fetchone()
+        if row is None:
+            return      # șters între timp; urmează intrarea D
+        rid = self.remote_id(table, local_id, create=False)
+        if rid is not None and (spec.get("append") or (table, local_id) in self.maps and op == "I"):
+            return      # deja trimis (lot reluat / părinte trimis mai devreme în lot)
+        vals = self._values(table, row)
+
+        if rid is None and spec.get("natural"):
+            nat = spec["natural"]
+            self.r.execute(f"SELECT id FROM {table} WHERE {_where(nat, '%s')}", tuple(vals[c] for c in nat))
+            found = self.r.fetchone()
+            if found:
+                # entitate existentă deja în Postgres (ex: adminul implicit): rămâne varianta centrală, vine la pull
+                self.maps[(table, local_id)] = found[0]
+                return
+        if rid is None:
+            if spec.get("unique"):
+                self._renumber(table, local_id, vals)
+            vals["sync_origin"] = f"{self.node}:{local_id}"
+            names = list(vals)
+            self.r.execute(f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))}) RETURNING id",
+                           tuple(vals.values()))
+            rid = self.r.fetchone()[0]
+            if table == "stock_moves":
+                self._apply_delta(vals, rid)
+        else:
+            sets = [c for c in vals if c not in spec.get("natural", ())]
+            self.r.execute(f"UPDATE {table} SET {', '.join(f'{c} = %s' for c in sets)} WHERE id = %s",
+                           tuple(vals[c] for c in sets) + (rid,))
+        self.maps[(table, local_id)] = rid
+
+    def _renumber(self, table, local_id, vals):
+        cols = TABLES[table]["unique"]
+        self.r.execute(f"SELECT id FROM {table} WHERE {_where(cols, '%s')}", tuple(vals[c] for c in cols))
+        if self.r.fetchone() is None:
+            return
+        if table == "invoices":
+            self.r.execute("SELECT COALESCE(MAX(number), 0) + 1 FROM invoices WHERE series = %s", (vals["series"],))
+            old, new = vals["number"], int(self.r.fetchone()[0])
+            vals["number"] = new
+            self.renames[f"{vals['series']}-{old}"] = f"{vals['series']}-{new}"
+            self.local_sql.append(("UPDATE invoices SET number = ? WHERE id = ?", (new, local_id)))
+            # mișcările documentului încă netrimise primesc referința nouă
+            self.local_sql.append(("""
+                UPDATE stock_moves SET ref_doc = ? WHERE ref_doc = ?
+                AND id IN (SELECT CAST(row_key AS INTEGER) FROM sync_outbox WHERE table_name = 'stock_moves')
+            """, (f"{vals['series']}-{new}", f"{vals['series']}-{old}")))
+            detail = f"{vals['series']}-{old} folosit deja în Postgres -> {vals['series']}-{new}"
+        else:
+            old = vals["code"]
+            vals["code"] = f"{old}-{self.node[:6]}"
+            self.local_sql.append(("UPDATE service_orders SET code = ? WHERE id = ?", (vals["code"], local_id)))
+            detail = f"{old} folosit deja în Postgres -> {vals['code']}"
+        self.local_sql.append(("INSERT INTO sync_conflicts (table_name, detail, created_at) VALUES (?, ?, ?)",
+                               (table, detail, int(now_ts().timestamp()))))
+
+    def _apply_delta(self, vals, rid):
+        delta = vals.get("delta") or 0.0
+        if not delta:
+            return
+        # straturile FIFO centrale: intrarea deschide strat (cu costul recepției de pe casă), ieșirea consumă
+        stock = float(execute(self.r, self.rdb, "product_lock", (vals["product_id"],)).fetchone()[0] or 0.0)
+        cost = cost_move(self.r, self.rdb, vals["product_id"], vals["move_type"], delta, vals["created_at"], stock,
+                         vals.get("unit_cost") if delta > 0 else None)
+        if cost is not None and cost != vals.get("unit_cost"):
+            self.r.execute("UPDATE stock_moves SET unit_cost = %s WHERE id = %s", (cost, rid))
+        # stocul central adună delta, nu suprascrie valoarea (vânzările offline de pe case diferite se cumulează)
+        self.r.execute("UPDATE products SET stock = COALESCE(stock, 0) + %s WHERE id = %s", (delta, vals["product_id"]))
+        if vals.get("location_id") is not None:
+            self.r.execute("""
+                INSERT INTO stock_balances (product_id, location_id, qty) VALUES (%s, %s, %s)
+                ON CONFLICT (product_id, location_id) DO UPDATE SET qty = stock_balances.qty + excluded.qty
+            """, (vals["product_id"], vals["location_id"], delta))
+        self.touched.add(vals["product_id"])
+
+    def negative_stock(self):
+        if not self.touched:
+            return []
+        self.r.execute("SELECT sku, stock FROM products WHERE id = ANY(%s) AND stock < 0", (list(self.touched),))
+        return self.r.fetchall()
+
+
+def push(db):
+    """Trimite un lot din sync_outbox; return numărul de intrări trimise."""
+    lconn = sqlite_connect(db["path"])
+    lconn.row_factory = sqlite3.Row
+    try:
+        entries = lconn.execute("SELECT seq, table_name, row_key, op FROM sync_outbox ORDER BY seq LIMIT ?",
+                                (SYNC_BATCH,)).fetchall()
+        if not entries:
+            return 0
+        node = _meta(lconn, "node")
+        rconn = db_connect(db["remote"])
+        try:
+            with rconn.cursor() as rcur:
+                p = _Push(lconn, rcur, node, db["remote"])
+                seen = set()
+                for e in entries:
+                    # starea curentă a rândului; intrările repetate din lot sunt deja acoperite
+                    if (e["table_name"], e["row_key"]) in seen and e["op"] != "D":
+                        continue
+                    seen.add((e["table_name"], e["row_key"]))
+                    p.push(e["table_name"], e["row_key"], e["op"])
+                negative = p.negative_stock()
+            rconn.commit()
+        except Exception:
+            rconn.rollback()
+            raise
+        finally:
+            rconn.close()
+
+        lconn.execute("BEGIN IMMEDIATE")
+        lconn.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('applying', '1')")
+        for (table, local_id), rid in p.maps.items():
+            _map(lconn, table, local_id, rid)
+        for table, local_id in p.unmaps:
+            lconn.execute("DELETE FROM sync_map WHERE table_name = ? AND local_id = ?", (table, local_id))
+        for sql, params in p.local_sql:
+            lconn.execute(sql, params)
+        for sku, stock in negative:
+            metrics.STOCK_CONFLICTS.labels("sync").inc()
+            _conflict(lconn, "products", f"stoc negativ după sincronizare: {sku} ({stock:g})")
+        lconn.execute("DELETE FROM sync_outbox WHERE seq <= ?", (entries[-1]["seq"],))
+        lconn.execute("DELETE FROM sync_meta WHERE key = 'applying'")
+        lconn.commit()
+        metrics.SYNC_ROWS.labels("push").inc(len(entries))
+        return len(entries)
+    except Exception:
+        if lconn.in_transaction:
+            lconn.rollback()
+        raise
+    finally:
+        lconn.close()
+
+
+# -------------------- PULL --------------------
+class _Pull:
+    """Aplică local rândurile citite din Postgres (în tranzacția locală deschisă de apelant)."""
+
+    def __init__(self, lconn, rcur, node, db):
+        self.l, self.r, self.node, self.db = lconn, rcur, node, db
+        self._pending = None
+        # rânduri modificate local și încă netrimise: versiunea locală câștigă până la push
+        self.dirty = {(t, k) for t, k in lconn.execute("SELECT table_name, row_key FROM sync_outbox WHERE op != 'D'")}
+
+    def pending(self):
+        # delta mișcărilor locale încă netrimise: (product_id, location_id) -> delta
+        if self._pending is None:
+            self._pending = {}
+            for pid, loc, delta in self.l.execute("""
+                SELECT m.product_id, m.location_id, SUM(m.delta) FROM sync_outbox o
+                JOIN stock_moves m ON m.id = CAST(o.row_key AS INTEGER)
+                WHERE o.table_name = 'stock_moves' GROUP BY m.product_id, m.location_id
+            """):
+                self._pending[(pid, loc)] = delta or 0.0
+        return self._pending
+
+    def _pending_for(self, pid, loc=...):
+        return sum(d for (p, lo), d in self.pending().items() if p == pid and (loc is ... or lo == loc))
+
+    def local_id(self, table, remote_id):
+        if remote_id is None:
+            return None
+        lid = _mapped(self.l, table, remote_id=remote_id)
+        if lid is None:
+            # părinte încă necitit (ex: modificat după pagina curentă): citit direct după id
+            cols = _columns_for(self.l, self.r, table)
+            self.r.execute(f"SELECT id, {', '.join(cols)}, sync_origin FROM {table} WHERE id = %s", (remote_id,))
+            row = self.r.fetchone()
+            if row is not None:
+                lid = self.apply(table, ["id"] + cols + ["sync_origin"], row)
+        return lid
+
+    def apply(self, table, names, row):
+        spec = TABLES[table]
+        r = dict(zip(names, row))
+        vals = {c: _to_local(r[c]) for c in _columns_for(self.l, self.r, table)}
+        for fk, parent in spec.get("fks", {}).items():
+            if vals.get(fk) is not None:
+                vals[fk] = self.local_id(parent, vals[fk])
+                if vals[fk] is None:
+                    _conflict(self.l, table, f"rând fără {parent} ({r.get('id') or r})")
+                    return None
+        if _is_keyed(table):
+            return self._apply_keyed(table, vals)
+
+        rid = r["id"]
+        lid = _mapped(self.l, table, remote_id=rid)
+        origin = r.get("sync_origin") or ""
+        if lid is None and origin.startswith(self.node + ":"):
+            # trimis de acest nod, dar maparea s-a pierdut
+            own = int(origin.split(":", 1)[1])
+            if self.l.execute(f"SELECT 1 FROM {table} WHERE id = ?", (own,)).fetchone():
+                lid = own
+        if lid is None and spec.get("natural"):
+            nat = spec["natural"]
+            found = self.l.execute(f"SELECT id FROM {table} WHERE {_where(nat, '?')}", tuple(vals[c] for c in nat)).fetchone()
+            lid = found[0] if found else None
+        if spec.get("derived"):
+            vals[spec["derived"]] = float(vals[spec["derived"]] or 0.0) + (self._pending_for(lid) if lid else 0.0)
+        if lid is None and spec.get("unique"):
+            self._make_room(table, vals)
+
+        if lid is None:
+            names_l = list(vals)
+            cur = self.l.execute(f"INSERT INTO {table} ({', '.join(names_l)}) VALUES ({', '.join(['?'] * len(names_l))})",
+                                 tuple(vals.values()))
+            lid = cur.lastrowid
+            if table == "stock_moves":
+                self._cost(vals, rid, r["product_id"])
+        elif not spec.get("append"):
+            if (table, str(lid)) in self.dirty:
+                vals = {c: v for c, v in vals.items() if c == spec.get("derived")}
+            if vals:
+                self.l.execute(f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in vals)} WHERE id = ?",
+                               tuple(vals.values()) + (lid,))
+        _map(self.l, table, lid, rid)
+        return lid
+
+    def _cost(self, vals, rid, remote_pid):
+        # mișcare de pe alt nod: consumă / deschide straturile locale (costul rămâne cel calculat la origine)
+        delta = float(vals.get("delta") or 0.0)
+        if not delta:
+            return
+        cur = self.l.cursor()
+        row = cur.execute("SELECT stock FROM products WHERE id = ?", (vals["product_id"],)).fetchone()
+        # products.stock e deja cel final din snapshot-ul Postgres (+ mișcările locale netrimise): stocul de
+        # dinaintea mișcării = el minus mișcările produsului adunate în Postgres de la ea încoace (inclusiv)
+        self.r.execute("SELECT COALESCE(SUM(delta), 0) FROM stock_moves WHERE product_id = %s AND id >= %s", (remote_pid, rid))
+        stock = float(row[0] or 0.0) - float(self.r.fetchone()[0]) if row else 0.0
+        cost_move(cur, self.db, vals["product_id"], vals["move_type"], delta, vals["created_at"], stock,
+                  vals.get("unit_cost") if delta > 0 else None)
+
+    def _make_room(self, table, vals):
+        # număr / cod luat în Postgres de alt nod, dar folosit deja local de un rând netrimis: rândul local se renumerotează
+        cols = TABLES[table]["unique"]
+        row = self.l.execute(f"SELECT id FROM {table} WHERE {_where(cols, '?')}", tuple(vals[c] for c in cols)).fetchone()
+        if row is None:
+            return
+        if table == "invoices":
+            new = int(self.l.execute("SELECT COALESCE(MAX(number), 0) + 1 FROM invoices WHERE series = ?",
+                                     (vals["series"],)).fetchone()[0])
+            old_ref, new_ref = f"{vals['series']}-{vals['number']}", f"{vals['series']}-{new}"
+            self.l.execute("UPDATE invoices SET number = ? WHERE id = ?", (new, row[0]))
+            self.l.execute("""
+                UPDATE stock_moves SET ref_doc = ? WHERE ref_doc = ?
+                AND id IN (SELECT CAST(row_key AS INTEGER) FROM sync_outbox WHERE table_name = 'stock_moves')
+            """, (new_ref, old_ref))
+        else:
+            old_ref = vals["code"]
+            new_ref = f"{old_ref}-{self.node[:6]}"
+            self.l.execute("UPDATE service_orders SET code = ? WHERE id = ?", (new_ref, row[0]))
+        _conflict(self.l, table, f"{old_ref} folosit deja în Postgres -> {new_ref}")
+
+    def _apply_keyed(self, table, vals):
+        spec = TABLES[table]
+        if spec.get("derived"):
+            d = spec["derived"]
+            vals[d] = float(vals[d] or 0.0) + self._pending_for(vals["product_id"], vals["location_id"])
+        if (table, ":".join(str(vals[c]) for c in spec["key"])) in self.dirty:
+            # doar stocul derivat, restul rămâne local până la push
+            if spec.get("derived"):
+                self.l.execute(f"UPDATE {table} SET {spec['derived']} = ? WHERE {_where(spec['key'], '?')}",
+                               (vals[spec["derived"]],) + tuple(vals[c] for c in spec["key"]))
+            return True
+        names = list(vals)
+        upd = [c for c in names if c not in spec["key"]]
+        self.l.execute(f"""
+            INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['?'] * len(names))})
+            ON CONFLICT ({', '.join(spec['key'])}) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in upd)}
+        """, tuple(vals.values()))
+        return True
+
+    def delete(self, table, old):
+        spec = TABLES.get(table)
+        if spec is None:
+            return
+        if _is_keyed(table):
+            key = {c: old.get(c) for c in spec["key"]}
+            for fk, parent in spec.get("fks", {}).items():
+                if fk in key:
+                    key[fk] = _mapped(self.l, parent, remote_id=key[fk])
+            if None not in key.values():
+                self.l.execute(f"DELETE FROM {table} WHERE {_where(key, '?')}", tuple(key.values()))
+            return
+        lid = _mapped(self.l, table, remote_id=old.get("id"))
+        if lid is not None:
+            self.l.execute(f"DELETE FROM {table} WHERE id = ?", (lid,))
+            self.l.execute("DELETE FROM sync_map WHERE table_name = ? AND local_id = ?", (table, lid))
+
+
+def _pull_page(db, lconn, rcur, node, fn):
+    """Rulează fn(_Pull) într-o tranzacție locală, cu jurnalizarea oprită."""
+    lconn.execute("BEGIN IMMEDIATE")
+    try:
+        lconn.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('applying', '1')")
+        fn(_Pull(lconn, rcur, node, db))
+        lconn.execute("DELETE FROM sync_meta WHERE key = 'applying'")
+        lconn.commit()
+    except Exception:
+        lconn.rollback()
+        raise
+
+def _horizon(rconn):
+    """Versiunea până la care toate tranzacțiile care au luat versiuni s-au încheiat.
+
+    Triggerele țin un advisory lock partajat până la commit; lock-ul exclusiv așteaptă tranzacțiile
+    în curs (un lot de push întreg, de exemplu), iar ce începe după el primește versiuni mai mari.
+    Ca changelog._horizon, dar pull-ul (rar, din fundal) așteaptă lock-ul în loc să-l încerce.
+    """
+    with rconn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('sync_version'))")
+        cur.execute("SELECT last_value, is_called FROM sync_version_seq")
+        last, called = cur.fetchone()
+    rconn.commit()
+    return int(last) if called else 0
+
+def pull(db):
+    """Aduce modificările din Postgres de la ultimul watermark; return numărul de rânduri aplicate."""
+    lconn = sqlite_connect(db["path"])
+    lconn.isolation_level = None
+    rconn = db_connect(db["remote"])
+    total = 0
+    try:
+        horizon = _horizon(rconn)
+        # un singur snapshot pentru toate tabelele (luat după orizont, deci vede tot ce e sub el):
+        # părinții citiți sunt cei la care se referă copiii
+        rconn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        node = _meta(lconn, "node")
+        with rconn.cursor() as rcur:
+            for table in TABLES:
+                cols = _columns_for(lconn, rcur, table)
+                names = ([] if _is_keyed(table) else ["id"]) + cols + ([] if _is_keyed(table) else ["sync_origin"])
+                wm = int(_meta(lconn, f"wm:{table}", 0))
+                since = wm
+                while True:
+                    rcur.execute(f"SELECT {', '.join(names)}, row_version FROM {table} WHERE row_version > %s "
+                                 f"ORDER BY row_version LIMIT %s", (since, SYNC_BATCH))
+                    rows = rcur.fetchall()
+                    if not rows:
+                        break
+                    since = rows[-1][-1]
+
+                    def page(p, rows=rows, table=table, names=names, last=since):
+                        for row in rows:
+                            p.apply(table, names, row[:-1])
+                        # peste orizont pot lipsi versiuni încă necomise: rândurile se recitesc data viitoare
+                        _set_meta(lconn, f"wm:{table}", max(wm, min(last, horizon)))
+
+                    _pull_page(db, lconn, rcur, node, page)
+                    total += len(rows)
+                    if len(rows) < SYNC_BATCH:
+                        break
+
+            wm = int(_meta(lconn, "wm:deletes", 0))
+            rcur.execute("SELECT row_version, table_name, old_row FROM sync_deletes WHERE row_version > %s ORDER BY row_version",
+                         (wm,))
+            rows = rcur.fetchall()
+            if rows:
+                def deletes(p):
+                    for _, table, old in rows:
+                        p.delete(table, old)
+                    _set_meta(lconn, "wm:deletes", max(wm, min(rows[-1][0], horizon)))
+                _pull_page(db, lconn, rcur, node, deletes)
+                total += len(rows)
+        rconn.rollback()
+    finally:
+        rconn.close()
+        lconn.close()
+    metrics.SYNC_ROWS.labels("pull").inc(total)
+    return total
+
+
+# -------------------- WORKER --------------------
+def pending(db):
+    conn = sqlite_connect(db["path"])
+    try:
+        return int(conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0])
+    finally:
+        conn.close()
+
+def sync_once(db):
+    """push (tot jurnalul, în loturi), apoi pull. Return (trimise, aduse)."""
+    _ensure_remote(db)
+    pushed = 0
+    while True:
+        n = push(db)
+        pushed += n
+        if n < SYNC_BATCH:
+            break
+    pulled = pull(db)
+    with _status_lock:
+        _status.update(state="online", pushed=pushed, pulled=pulled, last_ok=now_ts(), error="", pending=pending(db))
+    return pushed, pulled
+
+def status():
+    with _status_lock:
+        return dict(_status)
+
+def start_worker(db, interval=None):
+    """Thread de sincronizare pentru modul hibrid (None dacă db nu e hibrid)."""
+    if not is_hybrid(db):
+        return None
+    install_local(db)
+    interval = SYNC_INTERVAL_SECONDS if interval is None else interval
+
+    def loop():
+        wait = interval
+        while True:
+            try:
+                sync_once(db)
+                wait = interval
+            except Exception as e:
+                # offline / Postgres indisponibil: aplicația merge pe local, jurnalul se golește la reconectare
+                with _status_lock:
+                    _status.update(state="offline", error=str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__)
+                try:
+                    with _status_lock:
+                        _status["pending"] = pending(db)
+                except Exception:
+                    pass
+                wait = min(wait * 2, SYNC_MAX_BACKOFF_SECONDS)
+            time.sleep(wait)
+
+    th = threading.Thread(target=loop, daemon=True, name="sync-worker")
+    th.start()
+    return th
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Sincronizarea bazei locale (mod hibrid) cu Postgres.")
+    p.add_argument("--sqlite", default=None, help="fișierul local (implicit HYBRID_SQLITE_PATH)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("once")
+    sub.add_parser("run")
+    sub.add_parser("status")
+    args = p.parse_args(argv)
+
+    db = make_db(local_path=args.sqlite) if args.sqlite else make_db()
+    if not is_hybrid(db):
+        print("Modul hibrid nu e configurat (DATABASE_URL + HYBRID_SQLITE_PATH).", file=sys.stderr)
+        return 2
+    init_db(db)
+    install_local(db)
+
+    if args.cmd == "status":
+        conn = sqlite_connect(db["path"])
+        try:
+            print(f"nod: {_meta(conn, 'node')}, în așteptare: {pending(db)}")
+            for key, value in conn.execute("SELECT key, value FROM sync_meta WHERE key LIKE 'wm:%' ORDER BY key"):
+                print(f"{key[3:]}: {value}")
+            for table, detail, at in conn.execute("SELECT table_name, detail, created_at FROM sync_conflicts ORDER BY id DESC LIMIT 20"):
+                print(f"conflict {datetime.fromtimestamp(at, APP_TZ):%Y-%m-%d %H:%M} {table}: {detail}")
+        finally:
+            conn.close()
+        return 0
+
+    while True:
+        pushed, pulled = sync_once(db)
+        print(f"trimise {pushed}, aduse {pulled}", file=sys.stderr)
+        if args.cmd == "once":
+            return 0
+        time.sleep(SYNC_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
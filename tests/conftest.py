@@ -0,0 +1,57 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import make_db, init_db  # noqa: E402
+
+# Postgres de test (compose.test.yml); fără el testele marcate cu fixture-ul pg_url sunt sărite
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Bază SQLite nouă, cu schema și migrările aplicate."""
+    db = make_db(url="", path=str(tmp_path / "app.db"), read_url="", local_path="")
+    init_db(db)
+    return db
+
+
+@pytest.fixture
+def pg_url():
+    """URL-ul unei baze Postgres noi (creată pe serverul din TEST_DATABASE_URL, ștearsă după test)."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL nu e setat (vezi compose.test.yml)")
+    import psycopg2
+    from psycopg2.extensions import make_dsn, parse_dsn
+
+    os.environ.setdefault("PGSSLMODE", "disable")
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(TEST_DATABASE_URL, sslmode=os.environ["PGSSLMODE"])
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f"CREATE DATABASE {name}")
+        yield make_dsn(**{**parse_dsn(TEST_DATABASE_URL), "dbname": name})
+        with admin.cursor() as cur:
+            # conexiunile din pool (database._pools) rămân deschise: FORCE le închide
+            cur.execute(f"DROP DATABASE {name} WITH (FORCE)")
+    finally:
+        admin.close()
+
+
+@pytest.fixture
+def pg_db(pg_url):
+    """Bază Postgres nouă, cu schema și migrările aplicate."""
+    db = make_db(url=pg_url, read_url="", local_path="")
+    init_db(db)
+    return db
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def any_db(request):
+    """Testul rulează pe ambele motoare (Postgres doar cu TEST_DATABASE_URL)."""
+    return request.getfixturevalue("db" if request.param == "sqlite" else "pg_db")
@@ -0,0 +1,17 @@
+import archive
+from database import ensure_partitions, add_months, month_start, now_ts
+
+
+def test_postgres_without_tablespace_archives_nothing(pg_db, monkeypatch):
+    this_month = month_start(now_ts().date())
+    ensure_partitions(pg_db, since=add_months(this_month, -2))
+
+    monkeypatch.setattr(archive, "ARCHIVE_TABLESPACE", "")
+    assert archive.archive_closed(pg_db, keep_months=0) == []
+    # nelogate: se mută când tablespace-ul e configurat
+    assert archive.archived_periods(pg_db, "invoice_items") == []
+
+    monkeypatch.setattr(archive, "ARCHIVE_TABLESPACE", "pg_default")
+    done = archive.archive_closed(pg_db, keep_months=0)
+    assert ("invoice_items", f"{add_months(this_month, -2):%Y%m}", "pg_default") in done
+    assert archive.archive_closed(pg_db, keep_months=0) == []
@@ -0,0 +1,28 @@
+import threading
+
+import pytest
+
+import auth
+from database import db_exec, now_ts
+
+
+def test_slot_is_held_until_the_hash_finishes(monkeypatch):
+    monkeypatch.setattr(auth, "_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(auth, "LOGIN_TIMEOUT", 0.05)
+    release = threading.Event()
+    with pytest.raises(TimeoutError):
+        auth._offload(release.wait)
+    # cel care aștepta a renunțat, dar hash-ul încă rulează: coada rămâne plină
+    assert auth._offload(lambda: True) is None
+    release.set()
+    assert auth._slots.acquire(timeout=5)
+    auth._slots.release()
+    assert auth._offload(lambda: True) is True
+
+
+def test_corrupt_hash_is_a_failed_login(db):
+    db_exec(db, "INSERT INTO users (username, full_name, role, salt, pass_hash, active, created_at) VALUES (?,?,?,?,?,1,?)",
+            ("stricat", "Stricat", "user", "salt", "pbkdf2_sha256$x$abcd", now_ts()))
+    res = auth.login(db, "stricat", "orice", ip="10.0.0.9")
+    assert not res.ok
+    assert res.reason == "bad_password"
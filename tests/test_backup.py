@@ -0,0 +1,35 @@
+import pytest
+
+import backup
+from business import add_product, apply_stock_move, get_stock
+from database import db_query
+
+
+@pytest.fixture(autouse=True)
+def backup_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "backups"))
+
+
+def test_snapshot_then_restore_brings_back_the_data(any_db):
+    db = any_db
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 5, 0, "")
+    name = backup.snapshot(db, label="Test 1")
+    assert backup.NAME_RE.match(name).group(2) == "test"
+
+    apply_stock_move(db, pid, "OUT", 3)
+    add_product(db, "P2", "Baterie", "", "buc", 4, 9, 1, 0, "")
+    backup.restore(db, name)
+
+    assert get_stock(db, pid) == 5.0
+    assert db_query(db, "SELECT sku FROM products")["sku"].tolist() == ["P1"]
+    # restaurarea face întâi un snapshot "pre-restore", cu starea de dinainte
+    assert sorted(backup.list_snapshots()["label"]) == ["pre-restore", "test"]
+
+
+def test_restore_rejects_missing_and_foreign_snapshots(db, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        backup.restore(db, "backup-20260101-000000-manual.db.gz")
+    (tmp_path / "backups").mkdir()
+    (tmp_path / "backups" / "backup-20260101-000000-manual.dump").write_bytes(b"")
+    with pytest.raises(ValueError, match="SQLite"):
+        backup.restore(db, "backup-20260101-000000-manual.dump")
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import psycopg2
+
+import changelog
+from business import add_client, add_product, apply_stock_move
+
+
+def test_read_consume_and_compact(any_db):
+    db = any_db
+    pid = add_product(db, "P1", "Piesă", "", "buc", 10, 20, 0, 0, "")
+    add_client(db, "ACME SRL")
+    changes, offset = changelog.read_changes(db, 0)
+    assert [(c["table"], c["op"]) for c in changes][:1] == [("products", "I")]
+    assert changes[0]["row"]["sku"] == "P1"
+    assert offset == changes[-1]["id"]
+    assert changelog.read_changes(db, offset) == ([], offset)
+    assert [c["table"] for c in changelog.read_changes(db, 0, tables=["clients"])[0]] == ["clients"]
+
+    changelog.commit_offset(db, "bi", offset)
+    assert changelog.consumer_offset(db, "bi") == offset
+    apply_stock_move(db, pid, "IN", 3)
+    apply_stock_move(db, pid, "IN", 2)
+    pending = changelog.consumers(db).set_index("name").at["bi", "pending"]
+    assert pending == len(changelog.read_changes(db, offset)[0]) > 0
+
+    # compactare: pe fiecare rând rămâne ultima intrare, cu rândul complet
+    compacted, _ = changelog.compact(db, compact_days=-1, retention_days=3650)
+    assert compacted > 0
+    rest, _ = changelog.read_changes(db, 0, limit=10_000)
+    keys = [(c["table"], c["row_id"]) for c in rest]
+    assert len(keys) == len(set(keys))
+    product = next(c for c in rest if c["table"] == "products")
+    assert float(product["row"]["stock"]) == 5
+
+    # expirarea nu șterge ce n-a citit consumatorul
+    _, expired = changelog.compact(db, compact_days=-1, retention_days=-1)
+    left = changelog.read_changes(db, 0, limit=10_000)[0]
+    assert expired > 0 and left and min(c["id"] for c in left) > offset
+    changelog.forget(db, "bi")
+    assert changelog.consumers(db).empty
+
+
+def test_read_stops_before_uncommitted_ids_without_blocking_writers(pg_db, pg_url, monkeypatch):
+    db = pg_db
+    monkeypatch.setattr(changelog, "CHANGELOG_HORIZON_WAIT", 0.3)
+    late = psycopg2.connect(pg_url)
+    try:
+        with late.cursor() as cur:
+            cur.execute("INSERT INTO clients (name) VALUES ('târziu')")      # id mic, necomis
+        add_client(db, "după")
+
+        # cititorul nu trece de id-ul necomis: amână tot ce e după el
+        assert changelog.read_changes(db, 0) == ([], 0)
+
+        # cât timp un cititor încearcă orizontul, scrierile nu așteaptă după el
+        reader = threading.Thread(target=changelog.read_changes, args=(db, 0))
+        reader.start()
+        t0 = time.monotonic()
+        add_client(db, "în timpul citirii")
+        assert time.monotonic() - t0 < 0.25
+        reader.join()
+        late.commit()
+    finally:
+        late.close()
+
+    changes, _ = changelog.read_changes(db, 0)
+    assert [c["row"]["name"] for c in changes] == ["târziu", "după", "în timpul citirii"]
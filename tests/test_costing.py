@@ -0,0 +1,42 @@
+import random
+from datetime import date
+
+import pandas as pd
+
+import costing
+from business import StockError, add_product, apply_stock_move, consume_part, create_invoice
+from database import db_query
+
+
+def _layers(db):
+    df = db_query(db, "SELECT product_id, qty_left, unit_cost FROM cost_layers WHERE qty_left > 0 ORDER BY product_id, id")
+    return [(int(p), round(float(q), 6), round(float(c), 6)) for p, q, c in df.itertuples(index=False)]
+
+
+def test_incremental_cost_matches_recompute(db):
+    rnd = random.Random(7)
+    pids = [add_product(db, f"P{i}", f"Piesă {i}", "", "buc", 10 + i, 30, rnd.randint(0, 5), 0, "") for i in range(3)]
+    for _ in range(200):
+        pid, op = rnd.choice(pids), rnd.random()
+        try:
+            if op < 0.35:
+                apply_stock_move(db, pid, "IN", rnd.randint(1, 10), unit_cost=rnd.choice([None, round(rnd.uniform(5, 50), 2)]))
+            elif op < 0.5:
+                apply_stock_move(db, pid, "OUT", rnd.randint(1, 3))
+            elif op < 0.6:
+                apply_stock_move(db, pid, "ADJ", rnd.randint(1, 15))
+            elif op < 0.7:
+                consume_part(db, "SO-TEST", pid, rnd.randint(1, 2), "")
+            else:
+                items = pd.DataFrame([{"item_type": "PRODUCT", "product_id": pid, "description": "Piesă",
+                                       "qty": float(rnd.randint(1, 4)), "unit_price": 30.0, "cost_price": 0.0}])
+                create_invoice(db, rnd.choice(["FACTURA", "BON"]), "T", date.today(), None, 19, 0, "", items)
+        except StockError:
+            pass
+
+    layers = _layers(db)
+    # costul dat mișcare cu mișcare (cost_move) = FIFO-ul vectorizat pe tot istoricul: recompute nu schimbă nimic
+    out = costing.recompute(db)
+    assert out["moves"] == 0
+    assert out["items"] == 0
+    assert _layers(db) == layers
@@ -0,0 +1,143 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import database
+from business import add_product, apply_stock_move, create_invoice
+from database import (APP_TZ, _legacy_day, _legacy_epoch, db_frame, db_query, fan_out, init_db, iter_frames, make_db,
+                      placeholder, read_db, replica_lag)
+
+
+def _slow(value, seconds=0.2):
+    time.sleep(seconds)
+    return value
+
+
+def test_fan_out_runs_calls_concurrently():
+    t0 = time.monotonic()
+    out = fan_out(a=(_slow, 1), b=(_slow, 2), c=(_slow, 3))
+    assert out == {"a": 1, "b": 2, "c": 3}
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_nested_fan_out_runs_inline_on_the_worker():
+    def outer(n):
+        inner = fan_out(x=(threading.current_thread,), y=(_slow, n, 0))
+        return inner["x"] is threading.current_thread(), inner["y"]
+
+    out = fan_out(**{f"o{i}": (outer, i) for i in range(8)})
+    assert out == {f"o{i}": (True, i) for i in range(8)}
+
+
+def test_first_error_propagates_after_all_calls_finish():
+    done = threading.Event()
+
+    def fail():
+        raise ValueError("interogare")
+
+    def slow():
+        time.sleep(0.2)
+        done.set()
+
+    with pytest.raises(ValueError, match="interogare"):
+        fan_out(bad=(fail,), slow=(slow,))
+    assert done.is_set()
+
+
+def _deviz(db, day):
+    items = pd.DataFrame([{"item_type": "LABOR", "product_id": None, "description": "Manoperă",
+                           "qty": 1.0, "unit_price": 100.0, "cost_price": 0.0}])
+    return create_invoice(db, "DEVIZ", "T", day, None, 19, 0, "", items)["id"]
+
+
+def test_dates_and_timestamps_round_trip_as_datetime64(any_db):
+    db = any_db
+    march = _deviz(db, date(2026, 3, 1))
+    _deviz(db, date(2026, 4, 2))
+    p = placeholder(db)
+    sql = f"SELECT id, invoice_date, created_at FROM invoices WHERE invoice_date BETWEEN {p} AND {p}"
+    for fetch in (db_query, db_frame):
+        df = fetch(db, sql, (date(2026, 3, 1), date(2026, 3, 31)))
+        assert df["id"].tolist() == [march]
+        assert all(pd.api.types.is_datetime64_dtype(df[c]) for c in ("invoice_date", "created_at"))
+        assert df.at[0, "invoice_date"] == pd.Timestamp("2026-03-01")
+        # ora locală (APP_TZ), naivă
+        assert abs(df.at[0, "created_at"] - datetime.now(APP_TZ).replace(tzinfo=None)) < timedelta(minutes=1)
+    # parametru datetime: filtrul pe created_at merge pe valori native, nu pe text
+    assert len(db_query(db, f"SELECT id FROM invoices WHERE created_at >= {p}", (datetime.now(APP_TZ) - timedelta(hours=1),))) == 2
+    assert db_query(db, f"SELECT id FROM invoices WHERE created_at >= {p}", (datetime.now(APP_TZ) + timedelta(hours=1),)).empty
+
+
+def test_sqlite_stores_days_and_epoch_integers(db):
+    _deviz(db, date(2026, 3, 1))
+    conn = sqlite3.connect(db["path"])
+    try:
+        row = conn.execute("SELECT typeof(invoice_date), invoice_date, typeof(created_at) FROM invoices").fetchone()
+    finally:
+        conn.close()
+    assert row == ("integer", (date(2026, 3, 1) - date(1970, 1, 1)).days, "integer")
+
+
+def test_legacy_text_values_convert(monkeypatch):
+    monkeypatch.setattr("database.LEGACY_TZ", "UTC")
+    assert _legacy_epoch("1970-01-02 00:00:00") == 86400
+    assert _legacy_day("1970-01-11") == 10 and _legacy_day("1970-01-11 10:00") == 10
+    assert _legacy_epoch("") is None and _legacy_day("nu e dată") is None
+    assert _legacy_epoch(5) == 5 and _legacy_day(None) is None
+
+
+def test_columnar_fetch_uses_compact_dtypes_and_keeps_values(any_db):
+    db = any_db
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 5, 0, "")
+    for _ in range(3):
+        apply_stock_move(db, pid, "OUT", 0.7)
+    sql = "SELECT id, product_id, location_id, move_type, qty, delta, note FROM stock_moves ORDER BY id"
+
+    df = db_frame(db, sql)
+    assert str(df["id"].dtype) == "int32" and str(df["product_id"].dtype) == "int32"
+    assert str(df["move_type"].dtype) == "category"
+    assert str(df["qty"].dtype) == "float64"
+    assert df["qty"].tolist() == [5.0, 0.7, 0.7, 0.7]
+    assert round(float(df["delta"].sum()), 9) == 2.9
+    cols = ["id", "product_id", "location_id", "move_type", "qty"]
+    assert df[cols].astype(object).values.tolist() == db_query(db, sql)[cols].astype(object).values.tolist()
+
+    chunks = list(iter_frames(db, sql, chunk=3))
+    assert [len(c) for c in chunks] == [3, 1]
+    assert str(chunks[0]["product_id"].dtype) == "int32"
+    assert pd.concat(chunks, ignore_index=True)["qty"].tolist() == df["qty"].tolist()
+
+    empty = db_frame(db, sql.replace("ORDER BY", "WHERE id < 0 ORDER BY"))
+    assert empty.empty and empty.columns.tolist() == df.columns.tolist()
+
+
+def test_reads_go_to_a_fresh_replica_and_fall_back_to_the_primary(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "READ_LAG_CHECK_SECONDS", 0)
+    primary, copy = str(tmp_path / "app.db"), str(tmp_path / "replica.db")
+    db = make_db(url="", path=primary, read_url=f"sqlite:///{copy}", local_path="")
+    assert db["read"] == {"type": "sqlite", "path": copy}
+    init_db(db)
+    add_product(db, "P1", "Display", "", "buc", 10, 20, 5, 0, "")
+
+    assert replica_lag(db) is None and read_db(db) is db          # copia nu există încă
+    shutil.copy(primary, copy)
+    add_product(db, "P2", "Baterie", "", "buc", 4, 9, 1, 0, "")
+    t = time.time()
+    os.utime(copy, (t - 100, t - 100))
+    os.utime(primary, (t, t))
+    assert replica_lag(db) == pytest.approx(100, abs=1)
+    assert read_db(db) is db
+    assert read_db(db, max_lag=300) is db["read"]
+    # replica e în urmă: vede doar ce era la copiere
+    assert db_query(read_db(db, max_lag=300), "SELECT sku FROM products")["sku"].tolist() == ["P1"]
+
+    os.utime(copy, (t, t))
+    assert read_db(db) is db["read"]
+    # replica de alt tip decât primarul e ignorată (SQL-ul e scris per motor)
+    assert "read" not in make_db(url="", path=primary, read_url="postgresql://x/y", local_path="")
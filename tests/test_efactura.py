@@ -0,0 +1,129 @@
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+from lxml import etree
+
+import efactura
+from business import add_client, add_product, create_invoice
+from database import db_query
+
+CBC = "{urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2}"
+CAC = "{urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2}"
+# ordinea din InvoiceType (UBL 2.1) pentru elementele pe care le scrie generatorul
+UBL_ORDER = ["CustomizationID", "ID", "IssueDate", "InvoiceTypeCode", "Note", "DocumentCurrencyCode",
+             "AccountingSupplierParty", "AccountingCustomerParty", "AllowanceCharge", "TaxTotal",
+             "LegalMonetaryTotal", "InvoiceLine"]
+
+
+@pytest.fixture(autouse=True)
+def _company(monkeypatch):
+    monkeypatch.setattr(efactura, "COMPANY_COUNTY", "RO-CJ")
+    monkeypatch.setattr(efactura, "COMPANY_CITY", "Cluj-Napoca")
+
+
+def _client(db, name, **fields):
+    add_client(db, name, **fields)
+    return int(db_query(db, "SELECT MAX(id) AS id FROM clients").iloc[0]["id"])
+
+def _invoice(db, client_id, vat=19, discount=0, lines=None):
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 33.33, 100, 0, "")
+    lines = lines or [{"item_type": "PRODUCT", "product_id": pid, "description": "Display", "qty": 1.0,
+                       "unit_price": 33.33, "cost_price": 10.0}]
+    doc = create_invoice(db, "FACTURA", "F", date(2024, 6, 3), client_id, vat, discount, "", pd.DataFrame(lines))
+    return doc, efactura.load_invoice(db, doc["id"])
+
+def _children(xml):
+    return [el.tag.split("}")[1] for el in etree.fromstring(xml)]
+
+def _payable(xml):
+    return Decimal(etree.fromstring(xml).find(f"{CAC}LegalMonetaryTotal/{CBC}PayableAmount").text)
+
+def _stored_total(db, inv_id):
+    return Decimal(str(db_query(db, f"SELECT total FROM invoices WHERE id = {int(inv_id)}").iloc[0]["total"])).quantize(efactura.CENT)
+
+
+def test_factura_with_client_is_valid_ubl(db):
+    cid = _client(db, "ACME SRL", address="Str. Lungă 3, Cluj-Napoca", tax_id="RO123456", city="Cluj-Napoca", county="RO-CJ")
+    inv, doc = _invoice(db, cid)
+    assert efactura.check(doc) == []
+
+    xml, errors = efactura.validate(doc)
+    assert errors == []
+    children = _children(xml)
+    assert children == sorted(children, key=UBL_ORDER.index)
+    assert _payable(xml) == _stored_total(db, inv["id"])
+    buyer = etree.fromstring(xml).find(f"{CAC}AccountingCustomerParty/{CAC}Party")
+    assert buyer.find(f"{CAC}PartyTaxScheme/{CBC}CompanyID").text == "RO123456"
+    assert buyer.find(f"{CAC}PostalAddress/{CBC}CityName").text == "Cluj-Napoca"
+
+
+def test_factura_without_client_reports_the_missing_buyer_address(db):
+    inv, doc = _invoice(db, None)
+    assert doc["buyer"]["legal_id"] == efactura.ANONYMOUS_ID
+    # fără client nu există denumire / localitate / județ pentru cumpărător: respinsă înainte de scriere
+    errors = efactura.check(doc)
+    assert errors and all("cumpărător" in e for e in errors)
+    assert {"BR-RO-100", "BR-RO-110"} <= {e.split()[0] for e in errors}
+    assert efactura.validate(doc) == (None, errors)
+
+    # XML-ul în sine respectă tot schema (regulile CIUS-RO sunt în check)
+    xml = efactura.to_bytes(doc)
+    assert efactura.xsd_errors(xml) == []
+    assert _payable(xml) == _stored_total(db, inv["id"])
+
+
+@pytest.mark.parametrize("vat", [19, 9, 5, 0])
+def test_discounted_mixed_invoice_totals_match_stored_total(db, vat):
+    # TVA-ul e pe document (invoices.vat_percent): cotele diferite sunt acoperite pe documente diferite
+    cid = _client(db, "Ion Pop", address="Bd. Eroilor 1", tax_id="1900101123456", city="SECTOR3", county="RO-B")
+    pid2 = add_product(db, "P2", "Baterie", "", "buc", 5, 19.99, 100, 0, "")
+    lines = [
+        {"item_type": "PRODUCT", "product_id": pid2, "description": "Baterie", "qty": 3.0, "unit_price": 19.99, "cost_price": 5.0},
+        {"item_type": "PRODUCT", "product_id": pid2, "description": "Baterie (promo)", "qty": 0.333, "unit_price": 7.77, "cost_price": 5.0},
+        {"item_type": "LABOR", "product_id": None, "description": "Manoperă", "qty": 1.5, "unit_price": 133.37, "cost_price": 0.0},
+    ]
+    inv, doc = _invoice(db, cid, vat=vat, discount=7.5, lines=lines)
+    assert efactura.check(doc) == []
+    assert doc["category"] == ("S" if vat else "Z")
+
+    xml, errors = efactura.validate(doc)
+    assert errors == []
+    assert _children(xml) == sorted(_children(xml), key=UBL_ORDER.index)
+    assert "AllowanceCharge" in _children(xml)
+
+    root = etree.fromstring(xml)
+    money = lambda path: Decimal(root.find(path).text)  # noqa: E731
+    total = f"{CAC}LegalMonetaryTotal/{CBC}"
+    lines_sum = sum(Decimal(x.text) for x in root.iterfind(f"{CAC}InvoiceLine/{CBC}LineExtensionAmount"))
+    assert money(total + "LineExtensionAmount") == lines_sum
+    assert money(total + "TaxExclusiveAmount") == lines_sum - money(total + "AllowanceTotalAmount")
+    assert money(total + "TaxInclusiveAmount") == money(total + "TaxExclusiveAmount") + money(f"{CAC}TaxTotal/{CBC}TaxAmount")
+    rounding = root.find(total + "PayableRoundingAmount")
+    assert money(total + "PayableAmount") == money(total + "TaxInclusiveAmount") + (Decimal(rounding.text) if rounding is not None else 0)
+    assert money(total + "PayableAmount") == _stored_total(db, inv["id"])
+
+
+def test_schema_rejects_out_of_order_elements(db):
+    cid = _client(db, "ACME SRL", address="Str. Lungă 3", tax_id="RO123456", city="Cluj-Napoca", county="RO-CJ")
+    _, doc = _invoice(db, cid)
+    root = etree.fromstring(efactura.to_bytes(doc))
+    root.append(root.find(f"{CBC}IssueDate"))   # mutat după InvoiceLine
+    errors = efactura.xsd_errors(etree.tostring(root))
+    assert errors and "IssueDate" in errors[0]
+
+
+def test_export_period_writes_only_valid_invoices(db, tmp_path):
+    cid = _client(db, "ACME SRL", address="Str. Lungă 3", tax_id="RO123456", city="Cluj-Napoca", county="RO-CJ")
+    _invoice(db, cid)
+    items = pd.DataFrame([{"item_type": "LABOR", "product_id": None, "description": "Manoperă", "qty": 1.0,
+                           "unit_price": 100.0, "cost_price": 0.0}])
+    create_invoice(db, "FACTURA", "F", date(2024, 6, 4), None, 19, 0, "", items)
+
+    out_dir = tmp_path / "efactura"
+    out = efactura.export_period(db, date(2024, 6, 1), date(2024, 6, 30), str(out_dir), workers=1)
+    assert out["written"] == 1
+    assert [name for name, _ in out["invalid"]] == ["F-2"]
+    assert sorted(p.name for p in out_dir.iterdir()) == ["F-1.xml"]
+    assert efactura.xsd_errors(str(out_dir / "F-1.xml")) == []
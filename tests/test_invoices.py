@@ -0,0 +1,60 @@
+import threading
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from business import StockError, add_product, create_invoice, list_products
+from database import db_exec
+
+
+def _items(pid=None):
+    if pid is None:
+        return pd.DataFrame([{"item_type": "LABOR", "product_id": None, "description": "Manoperă",
+                              "qty": 1.0, "unit_price": 100.0, "cost_price": 0.0}])
+    return pd.DataFrame([{"item_type": "PRODUCT", "product_id": pid, "description": "Piesă",
+                          "qty": 1.0, "unit_price": 20.0, "cost_price": 10.0}])
+
+
+def test_concurrent_invoices_get_distinct_numbers(any_db):
+    db = any_db
+    pid = add_product(db, "P1", "Piesă", "", "buc", 10, 20, 1000, 0, "")
+    numbers, errors = [], []
+    lock = threading.Lock()
+
+    def worker(i):
+        for j in range(6):
+            # DEVIZ fără produse nu blochează niciun produs: numărul trebuie rezervat oricum
+            inv_type, items = ("DEVIZ", _items()) if (i + j) % 2 else ("FACTURA", _items(pid))
+            try:
+                doc = create_invoice(db, inv_type, "T", date.today(), None, 19, 0, "", items)
+            except Exception as e:  # pragma: no cover - raportat mai jos
+                with lock:
+                    errors.append(repr(e))
+                continue
+            with lock:
+                numbers.append(doc["number"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert sorted(numbers) == list(range(1, 49))
+
+
+def test_stale_snapshot_is_checked_under_lock(db):
+    snapshot = list_products(db)     # pagina încărcată înainte de produse
+    pid = add_product(db, "P1", "Piesă", "", "buc", 10, 20, 2, 0, "")
+    with pytest.raises(StockError, match="Piesă"):
+        create_invoice(db, "FACTURA", "F", date.today(), None, 19, 0, "", pd.concat([_items(pid)] * 3), stock_df=snapshot)
+    assert create_invoice(db, "FACTURA", "F", date.today(), None, 19, 0, "", _items(pid), stock_df=snapshot)["number"] == 1
+
+    # produsul dispare după ce pagina l-a încărcat
+    gone = add_product(db, "P2", "Carcasă", "", "buc", 10, 20, 5, 0, "")
+    snapshot = list_products(db)
+    db_exec(db, f"DELETE FROM products WHERE id = {gone}")
+    with pytest.raises(StockError, match="inexistent"):
+        create_invoice(db, "BON", "F", date.today(), None, 19, 0, "", _items(gone), stock_df=snapshot)
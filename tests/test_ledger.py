@@ -0,0 +1,34 @@
+import pytest
+
+import business
+import ledger
+from business import add_product, apply_stock_move
+from database import db_query
+
+
+def test_new_product_and_opening_stock_commit_together(any_db, monkeypatch):
+    db = any_db
+    pid = add_product(db, "P1", "Piesă", "", "buc", 10, 20, 7, 0, "")
+    moves = db_query(db, f"SELECT move_type, qty, delta FROM stock_moves WHERE product_id = {pid}")
+    assert moves[["move_type", "qty", "delta"]].values.tolist() == [["ADJ", 7.0, 7.0]]
+    assert ledger.reconcile(db).empty
+    assert ledger.reconcile_locations(db).empty
+
+    # o eroare la mișcarea stocului inițial anulează și produsul
+    def boom(*args, **kwargs):
+        raise RuntimeError("cost")
+    monkeypatch.setattr(business, "cost_move", boom)
+    with pytest.raises(RuntimeError):
+        add_product(db, "P2", "Carcasă", "", "buc", 10, 20, 5, 0, "")
+    assert db_query(db, "SELECT sku FROM products")["sku"].tolist() == ["P1"]
+    assert ledger.reconcile(db).empty
+
+
+def test_stock_at_uses_checkpoint_and_later_moves(db):
+    pid = add_product(db, "P1", "Piesă", "", "buc", 10, 20, 5, 0, "")
+    assert ledger.take_checkpoint(db) is not None
+    assert ledger.take_checkpoint(db) is None          # nicio mișcare nouă
+    apply_stock_move(db, pid, "IN", 3)
+    apply_stock_move(db, pid, "OUT", 1)
+    assert ledger.expected_stock(db).set_index("product_id").at[pid, "stock"] == 7
+    assert ledger.reconcile(db).empty
@@ -0,0 +1,40 @@
+import pytest
+
+import ledger
+from business import (StockError, add_location, add_product, apply_stock_move, get_stock, list_locations,
+                      stock_by_location, transfer_stock)
+from database import db_query
+
+
+def _loc(db, code):
+    return int(list_locations(db).set_index("code").at[code, "id"])
+
+def _balances(db, pid):
+    return {r.code: float(r.qty) for r in stock_by_location(db, pid).itertuples() if r.qty}
+
+
+def test_transfer_moves_stock_between_locations(any_db):
+    db = any_db
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 10, 0, "R1")
+    add_location(db, "R2", warehouse="D2")
+    r1, r2 = _loc(db, "R1"), _loc(db, "R2")
+
+    assert transfer_stock(db, pid, r1, r2, 4, "mutare") == (6.0, 4.0)
+    assert _balances(db, pid) == {"R1": 6.0, "R2": 4.0}
+    assert get_stock(db, pid) == 10.0
+    moves = db_query(db, "SELECT location_id, delta, ref_doc FROM stock_moves WHERE move_type = 'TRANSFER' ORDER BY delta")
+    assert moves[["location_id", "delta"]].values.tolist() == [[r1, -4.0], [r2, 4.0]]
+    assert set(moves["ref_doc"]) == {"R1->R2"}
+
+    with pytest.raises(StockError):
+        transfer_stock(db, pid, r2, r1, 5)
+    with pytest.raises(ValueError):
+        transfer_stock(db, pid, r1, r1, 1)
+
+    # ieșire fără locație: din cea mai plină întâi; intrare cu locație: exact acolo
+    apply_stock_move(db, pid, "OUT", 7)
+    assert _balances(db, pid) == {"R2": 3.0}
+    apply_stock_move(db, pid, "IN", 2, location_id=r1)
+    assert _balances(db, pid) == {"R1": 2.0, "R2": 3.0}
+    assert ledger.reconcile(db).empty
+    assert ledger.reconcile_locations(db).empty
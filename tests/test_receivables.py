@@ -0,0 +1,35 @@
+import threading
+from datetime import date
+
+import pandas as pd
+
+import receivables
+from business import create_invoice
+from database import db_exec, db_query, placeholder, now_ts
+
+
+def test_concurrent_automatic_payments_do_not_overpay(any_db):
+    db = any_db
+    ph = placeholder(db)
+    db_exec(db, f"INSERT INTO clients (name, created_at) VALUES ({ph}, {ph})", ("Client", now_ts()))
+    items = pd.DataFrame([{"item_type": "LABOR", "product_id": None, "description": "Manoperă",
+                           "qty": 1.0, "unit_price": 100.0, "cost_price": 0.0}])
+    inv = create_invoice(db, "FACTURA", "F", date.today(), 1, 0, 0, "", items)
+    errors = []
+
+    def pay():
+        try:
+            receivables.record_payment(db, 1, 30, date.today())
+        except Exception as e:  # pragma: no cover - raportat mai jos
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=pay) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    paid = db_query(db, f"SELECT SUM(amount) AS s FROM payments WHERE invoice_id = {ph}", (inv["id"],)).iloc[0]["s"]
+    assert round(float(paid), 2) == 100.0
+    assert receivables.client_balance(db, 1) == {"invoiced": 100.0, "paid": 240.0, "balance": -140.0}
@@ -0,0 +1,16 @@
+import replenish
+from business import add_product
+from database import db_exec
+
+
+def test_product_edit_invalidates_cached_forecast(db):
+    pid = add_product(db, "P1", "Piesă", "", "buc", 10, 20, 2, 0, "")
+    row = replenish.forecast(db).set_index("id").loc[pid]
+    assert row["suggested_qty"] == 0
+
+    # fără mișcări noi: doar fișa produsului se schimbă
+    db_exec(db, "UPDATE products SET min_stock = ?, purchase_price = ? WHERE id = ?", (5, 12.5, pid))
+    row = replenish.forecast(db).set_index("id").loc[pid]
+    assert row["min_stock"] == 5
+    assert row["suggested_qty"] == 3
+    assert row["est_cost"] == 37.5
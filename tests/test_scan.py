@@ -0,0 +1,44 @@
+import pytest
+
+import business
+from business import add_barcode, add_product, code_map, invalidate_codes, lookup_code, remove_barcode
+from database import db_exec
+
+
+def test_barcode_and_sku_resolve_to_the_same_product(db):
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 0, 0, "")
+    other = add_product(db, "P2", "Baterie", "", "buc", 10, 20, 0, 0, "")
+    add_barcode(db, pid, "5940000000017")
+
+    assert lookup_code(db, "P1") == pid
+    assert lookup_code(db, " 5940000000017 ") == pid
+    assert lookup_code(db, "P2") == other
+    assert lookup_code(db, "NOPE") is None
+    assert lookup_code(db, "") is None
+    assert code_map(db) == {"P1": pid, "P2": other, "5940000000017": pid}
+
+    # un cod folosit (ca SKU sau cod de bare) nu mai poate fi dat altui produs
+    with pytest.raises(ValueError, match="alt produs"):
+        add_barcode(db, other, "P1")
+    with pytest.raises(ValueError, match="SKU"):
+        add_product(db, "5940000000017", "Dublură", "", "buc", 1, 1, 0, 0, "")
+
+    remove_barcode(db, "5940000000017")
+    assert lookup_code(db, "5940000000017") is None
+
+
+def test_codes_written_elsewhere_are_found_and_invalidation_reloads(db, monkeypatch):
+    monkeypatch.setattr(business, "SCAN_CACHE_TTL", 3600)
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 0, 0, "")
+    assert code_map(db) == {"P1": pid}
+
+    # scris de alt proces: dict-ul nu îl are, căutarea exactă pe index îl găsește și îl reține
+    db_exec(db, f"INSERT INTO product_barcodes (barcode, product_id) VALUES ('X-1', {pid})")
+    assert "X-1" not in code_map(db)
+    assert lookup_code(db, "X-1") == pid
+    assert code_map(db)["X-1"] == pid
+
+    db_exec(db, "UPDATE products SET sku = 'P1-NOU'")
+    assert "P1-NOU" not in code_map(db)
+    invalidate_codes()
+    assert code_map(db) == {"P1-NOU": pid, "X-1": pid}
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+import efactura
+import reports
+from bench.seed import seed
+from database import db_query, now_ts
+
+
+def test_seeded_service_orders_have_history(db):
+    out = seed(db, products=50, clients=20, service_orders=200, invoices=50, stock_moves=300, days=60)
+    assert out["service_order_events"] >= 200
+
+    board = reports.aging_board(db)
+    assert not board.empty
+    assert board["in_status_h"].notna().all()
+
+    today = now_ts().date()
+    ta = reports.turnaround(reports.service_intervals(db, today - timedelta(days=90), today))
+    assert set(ta["stage"].astype(str)) >= {"NOU", "IN_LUCRU", "GATA", "TOTAL"}
+
+
+def test_seeded_facturas_export_to_efactura(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(efactura, "COMPANY_COUNTY", "RO-CJ")
+    seed(db, products=50, clients=20, service_orders=0, invoices=120, stock_moves=300, days=60)
+    today = now_ts().date()
+    out = efactura.export_period(db, today - timedelta(days=61), today, str(tmp_path / "xml"), workers=1)
+    facturas = int(db_query(db, "SELECT COUNT(*) AS n FROM invoices WHERE type = 'FACTURA'").iloc[0]["n"])
+    assert out["invalid"] == []
+    assert out["written"] == facturas > 0
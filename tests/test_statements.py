@@ -0,0 +1,44 @@
+import statements
+from business import add_product
+from database import pooled_connection
+from statements import PREPARED, RENDERED, STATEMENTS, execute, query_rows, render, sql_for
+
+
+def test_every_statement_renders_on_both_dialects():
+    for name in STATEMENTS:
+        lite, pg = RENDERED["sqlite"][name], RENDERED["postgres"][name]
+        assert "%s" not in lite["sql"] and "?" not in pg["sql"]
+        assert lite["sql"].count("?") == pg["sql"].count("%s")
+        assert "\n" not in lite["sql"] and "  " not in pg["sql"]
+        assert ("prepare" in pg) == (name in PREPARED) and "prepare" not in lite
+
+
+def test_prepared_statement_numbers_its_parameters():
+    assert RENDERED["sqlite"]["product_lock"]["sql"] == "SELECT stock FROM products WHERE id = ?"
+    pg = RENDERED["postgres"]["move_insert"]
+    assert pg["prepare"].startswith("PREPARE move_insert AS INSERT INTO stock_moves")
+    assert pg["prepare"].endswith("VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)")
+    assert pg["execute"] == "EXECUTE move_insert (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    assert RENDERED["postgres"]["product_lock"]["sql"].endswith("WHERE id = %s FOR UPDATE")
+
+
+def test_statements_run_on_the_engine(any_db, monkeypatch):
+    db = any_db
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 5, 0, "")
+    assert query_rows(db, "product_stock", (pid,)) == [(5.0,)]
+    assert render(db, "product_stock") == RENDERED[db["type"]]["product_stock"]["sql"]
+
+    with pooled_connection(db) as conn:
+        cur = conn.cursor()
+        execute(cur, db, "stock_update", (2, pid))
+        execute(cur, db, "stock_update", (1, pid))
+        if db["type"] == "postgres":
+            # PREPARE o singură dată per conexiune, apoi EXECUTE
+            assert "stock_update" in conn.prepared
+            assert sql_for(cur, db, "stock_update").startswith("EXECUTE stock_update")
+            monkeypatch.setattr(statements, "PG_PREPARE", False)
+            assert sql_for(cur, db, "stock_update") == RENDERED["postgres"]["stock_update"]["sql"]
+        assert execute(cur, db, "product_stock", (pid,)).fetchone()[0] == 8.0
+        cur.close()
+        conn.commit()
+    assert query_rows(db, "product_stock", (pid,)) == [(8.0,)]
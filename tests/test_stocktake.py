@@ -0,0 +1,55 @@
+import pandas as pd
+
+import ledger
+import stocktake
+from business import add_barcode, add_location, add_product, get_stock, list_locations, stock_by_location, transfer_stock
+from database import db_query
+
+
+def _loc(db, code):
+    return int(list_locations(db).set_index("code").at[code, "id"])
+
+def _balances(db, pid):
+    return {r.code: float(r.qty) for r in stock_by_location(db, pid).itertuples()}
+
+
+def test_set_add_apply_keeps_the_ledger_consistent(any_db):
+    db = any_db
+    p1 = add_product(db, "P1", "Display", "", "buc", 10, 20, 5, 0, "R1")
+    p2 = add_product(db, "P2", "Baterie", "", "buc", 4, 9, 8, 0, "R1")
+    p3 = add_product(db, "P3", "Cablu", "", "buc", 1, 3, 2, 0, "R2")
+    add_barcode(db, p2, "5940000000017")
+
+    sid = stocktake.open_session(db, "Inventar test")
+    unknown = stocktake.load_counts(db, sid, stocktake.parse_scans("P1;4\nP2\nNOPE;2"))
+    assert unknown == ["NOPE"]
+    # a doua trecere: setul înlocuiește P1, scanările adunate pe P2 (SKU + cod de bare = același produs)
+    stocktake.load_counts(db, sid, pd.DataFrame({"sku": ["P1"], "counted": [6.0]}), mode="set")
+    stocktake.load_counts(db, sid, stocktake.parse_scans("5940000000017;9\nP2"), mode="add")
+
+    diff = stocktake.differences(db, sid, zero_missing=True).set_index("sku")
+    assert diff["delta"].to_dict() == {"P1": 1.0, "P2": 3.0, "P3": -2.0}
+    assert diff.at["P2", "value_delta"] == 12.0
+
+    out = stocktake.apply_session(db, sid, zero_missing=True)
+    assert out["products"] == 3 and out["plus"] == 4.0 and out["minus"] == -2.0
+    assert (get_stock(db, p1), get_stock(db, p2), get_stock(db, p3)) == (6.0, 11.0, 0.0)
+    assert ledger.reconcile(db).empty
+    assert ledger.reconcile_locations(db).empty
+    assert db_query(db, "SELECT status FROM stocktake_sessions").iloc[0]["status"] == "APPLIED"
+    assert stocktake.differences(db, sid).empty
+
+
+def test_location_session_sets_only_that_location(any_db):
+    db = any_db
+    pid = add_product(db, "P1", "Display", "", "buc", 10, 20, 5, 0, "R1")
+    add_location(db, "R2")
+    transfer_stock(db, pid, _loc(db, "R1"), _loc(db, "R2"), 2)
+
+    sid = stocktake.open_session(db, "Raft R2", location_id=_loc(db, "R2"))
+    stocktake.load_counts(db, sid, pd.DataFrame({"sku": ["P1"], "counted": [3.0]}))
+    stocktake.apply_session(db, sid)
+    assert _balances(db, pid) == {"R1": 3.0, "R2": 3.0}
+    assert get_stock(db, pid) == 6.0
+    assert ledger.reconcile(db).empty
+    assert ledger.reconcile_locations(db).empty
@@ -0,0 +1,125 @@
+"""Mod hibrid: două noduri SQLite sincronizate prin același Postgres (compose.test.yml)."""
+import threading
+from datetime import date
+
+import pandas as pd
+import psycopg2
+
+import costing
+import sync
+from business import add_product, apply_stock_move, create_invoice
+from database import make_db, init_db, db_query
+
+
+def _node(tmp_path, pg_url, name):
+    db = make_db(url=pg_url, read_url="", local_path=str(tmp_path / f"{name}.db"))
+    init_db(db)
+    sync.install_local(db)
+    return db
+
+def _sale(db, pid, qty):
+    items = pd.DataFrame([{"item_type": "PRODUCT", "product_id": pid, "description": "Piesă",
+                           "qty": float(qty), "unit_price": 20.0, "cost_price": 10.0}])
+    return create_invoice(db, "FACTURA", "F", date.today(), None, 19, 0, "", items)
+
+def _stock(db, sku):
+    return float(db_query(db, "SELECT stock FROM products WHERE sku = " + ("%s" if db["type"] == "postgres" else "?"),
+                          (sku,)).iloc[0]["stock"])
+
+
+def test_offline_sales_on_two_nodes_add_up(tmp_path, pg_url):
+    a, b = _node(tmp_path, pg_url, "a"), _node(tmp_path, pg_url, "b")
+    remote = a["remote"]
+    pid_a = add_product(a, "P1", "Piesă", "", "buc", 10, 20, 10, 0, "")
+    sync.sync_once(a)
+    sync.sync_once(b)
+    pid_b = int(db_query(b, "SELECT id FROM products WHERE sku = 'P1'").iloc[0]["id"])
+    assert _stock(b, "P1") == 10
+
+    # ambele case vând offline și își dau același număr de factură
+    assert _sale(a, pid_a, 3)["number"] == 1
+    assert _sale(b, pid_b, 4)["number"] == 1
+    sync.sync_once(a)
+    sync.sync_once(b)
+    sync.sync_once(a)
+
+    # stocul central adună delta mișcărilor, nu ultima valoare trimisă
+    assert _stock(remote, "P1") == 3
+    assert _stock(a, "P1") == 3
+    assert _stock(b, "P1") == 3
+    assert float(db_query(remote, "SELECT SUM(qty_left) AS q FROM cost_layers").iloc[0]["q"]) == 3
+
+    # factura trimisă a doua e renumerotată, în Postgres și pe casa ei
+    assert sorted(db_query(remote, "SELECT number FROM invoices WHERE series = 'F'")["number"]) == [1, 2]
+    assert sorted(db_query(remote, "SELECT ref_doc FROM stock_moves WHERE move_type = 'SALE'")["ref_doc"]) == ["F-1", "F-2"]
+    for node in (a, b):
+        assert sorted(db_query(node, "SELECT number FROM invoices WHERE series = 'F'")["number"]) == [1, 2]
+    conflicts = db_query(b, "SELECT detail FROM sync_conflicts")["detail"].tolist()
+    assert any("F-1" in c and "F-2" in c for c in conflicts)
+
+
+def test_pull_does_not_skip_versions_committed_late(tmp_path, pg_url, monkeypatch):
+    a = _node(tmp_path, pg_url, "a")
+    sync.sync_once(a)
+    monkeypatch.setattr(sync, "SYNC_BATCH", 50)
+
+    # tranzacție lungă (ca un lot de push): versiunea ei e mai mică decât tot ce se comite după
+    late = psycopg2.connect(pg_url)
+    try:
+        with late.cursor() as cur:
+            cur.execute("INSERT INTO clients (name) VALUES ('târziu')")
+        other = psycopg2.connect(pg_url)
+        try:
+            with other.cursor() as cur:
+                cur.executemany("INSERT INTO clients (name) VALUES (%s)", [(f"c{i}",) for i in range(300)])
+            other.commit()
+        finally:
+            other.close()
+
+        done = threading.Event()
+        th = threading.Thread(target=lambda: (sync.pull(a), done.set()))
+        th.start()
+        # pull-ul așteaptă tranzacția în curs în loc să mute watermark-ul peste versiunea ei
+        assert not done.wait(1.0)
+        late.commit()
+        th.join(30)
+        assert done.is_set()
+    finally:
+        late.close()
+
+    sync.pull(a)
+    names = set(db_query(a, "SELECT name FROM clients")["name"])
+    assert "târziu" in names
+    assert len(names) == 301
+
+
+def _layers(db):
+    df = db_query(db, "SELECT product_id, qty_left, unit_cost FROM cost_layers WHERE qty_left > 0 ORDER BY product_id, id")
+    return [(int(p), round(float(q), 6), round(float(c), 6)) for p, q, c in df.itertuples(index=False)]
+
+
+def test_synced_moves_keep_fifo_layers_consistent(tmp_path, pg_url):
+    a, b = _node(tmp_path, pg_url, "a"), _node(tmp_path, pg_url, "b")
+    remote = a["remote"]
+    pid_a = add_product(a, "P1", "Piesă", "", "buc", 10, 20, 2, 0, "")
+    sync.sync_once(a)
+    sync.sync_once(b)
+    pid_b = int(db_query(b, "SELECT id FROM products WHERE sku = 'P1'").iloc[0]["id"])
+
+    # recepții la costuri diferite și vânzări pe ambele case, offline
+    apply_stock_move(a, pid_a, "IN", 5, unit_cost=12.0)
+    apply_stock_move(b, pid_b, "IN", 4, unit_cost=15.0)
+    _sale(a, pid_a, 3)
+    _sale(b, pid_b, 6)
+    apply_stock_move(a, pid_a, "IN", 2, unit_cost=20.0)
+    for node in (a, b, a):
+        sync.sync_once(node)
+
+    # Postgres: mișcările costate la push, în ordinea sosirii = FIFO-ul recalculat din tot istoricul
+    layers = _layers(remote)
+    out = costing.recompute(remote)
+    assert out["moves"] == 0
+    assert _layers(remote) == layers
+    # pe fiecare nod straturile acoperă exact stocul (mișcările aduse la pull trec prin cost_move)
+    for node in (a, b):
+        assert round(sum(q for _, q, _ in _layers(node)), 6) == _stock(node, "P1") == 4
@@ -0,0 +1,40 @@
+import io
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from xlsx import Workbook, column_letter, sheet_name
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def test_workbook_reads_back_with_openpyxl_and_pandas():
+    buf = io.BytesIO()
+    rows = [(1, 12.5, "Display <A&B>", date(2026, 3, 1), datetime(2026, 3, 1, 14, 30), True),
+            (2, float("nan"), "ctrl\x01char", None, pd.NaT, False)]
+    with Workbook(buf) as wb:
+        assert wb.add_sheet("Vânzări", ["Nr", "Sumă", "Text", "Data", "Ora", "Plătit"], iter(rows)) == 2
+        wb.add_sheet("Sumar", ["Total"], [(12.5,)], index=0)
+
+    buf.seek(0)
+    book = openpyxl.load_workbook(buf)
+    assert book.sheetnames == ["Sumar", "Vânzări"]
+    ws = book["Vânzări"]
+    assert ws.freeze_panes == "A2"
+    assert [c.value for c in ws[2]] == [1, 12.5, "Display <A&B>", datetime(2026, 3, 1), datetime(2026, 3, 1, 14, 30), True]
+    assert [c.value for c in ws[3]] == [2, None, "ctrlchar", None, None, False]
+    assert ws["D2"].number_format == "yyyy-mm-dd" and ws["E2"].number_format == "yyyy-mm-dd hh:mm"
+
+    buf.seek(0)
+    df = pd.read_excel(buf, sheet_name="Vânzări")
+    assert df.columns.tolist() == ["Nr", "Sumă", "Text", "Data", "Ora", "Plătit"]
+    assert df["Nr"].tolist() == [1, 2]
+    assert df.at[0, "Data"] == pd.Timestamp("2026-03-01")
+
+
+def test_names_and_columns():
+    assert [column_letter(i) for i in (0, 25, 26, 701, 702)] == ["A", "Z", "AA", "ZZ", "AAA"]
+    assert sheet_name("a/b:c") == "a_b_c"
+    assert sheet_name("Raport", ["raport"]) == "Raport_2"
+    assert len(sheet_name("x" * 40, ["x" * 31])) == 31
@@ -0,0 +1,189 @@
+"""Scriere XLSX în flux (fără xlsxwriter / openpyxl): foile se scriu rând cu rând direct în zip.
+
+    with Workbook("raport.xlsx") as wb:
+        wb.add_sheet("Venit pe zile", ["Data", "Venit"], rows)      # rows = orice iterabil de tupluri
+
+Memoria nu crește cu numărul de rânduri: fiecare foaie e un membru zip deschis în scriere
+(ZipFile.open(..., "w")), rândurile trec printr-un buffer de text și sunt comprimate pe loc.
+Textele sunt inline (fără sharedStrings, care ar trebui ținut în memorie până la final).
+Tipul celulei vine din valoarea Python: int / float -> număr (float afișat cu 2 zecimale),
+date / datetime -> dată Excel (serial + format), bool, restul text; None / NaN / NaT -> celulă goală.
+Ordinea foilor în registru poate fi alta decât ordinea scrierii (index la add_sheet).
+"""
+import io
+import numbers
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_PREFIX = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+# indecșii din cellXfs (styles.xml)
+STYLE_DATE, STYLE_DATETIME, STYLE_HEADER, STYLE_MONEY = 1, 2, 3, 4
+EXCEL_DAY0 = datetime(1899, 12, 30)
+MAX_COL_WIDTH = 60
+BUFFER_ROWS = 1000
+
+_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_SHEET_NAME_BAD = re.compile(r"[\[\]:*?/\\]")
+
+_STYLES = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="{NS_MAIN}">
+<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/><numFmt numFmtId="165" formatCode="yyyy-mm-dd hh:mm"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="5">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>
+"""
+
+
+def column_letter(i):
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    out = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        out = chr(65 + r) + out
+    return out
+
+def _text(v):
+    v = str(v)
+    return escape(_ILLEGAL.sub("", v) if _ILLEGAL.search(v) else v)
+
+def _kind(t):
+    if issubclass(t, bool):
+        return "b"
+    if issubclass(t, numbers.Integral):
+        return "i"
+    if issubclass(t, numbers.Real):
+        return "f"
+    if issubclass(t, datetime):
+        return "dt"
+    if issubclass(t, date):
+        return "d"
+    return "s"
+
+_KINDS = {}     # tip Python -> fel de celulă (isinstance pe ABC-uri e scump per celulă)
+
+def _cell(ref, v):
+    if v is None or v != v:                     # None / NaN / NaT
+        return ""
+    t = type(v)
+    kind = _KINDS.get(t) or _KINDS.setdefault(t, _kind(t))
+    if kind == "s":
+        return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{_text(v)}</t></is></c>'
+    if kind == "f":
+        return f'<c r="{ref}" s="{STYLE_MONEY}"><v>{float(v)!r}</v></c>'
+    if kind == "i":
+        return f'<c r="{ref}"><v>{int(v)}</v></c>'
+    if kind == "dt":
+        v = v.replace(tzinfo=None)
+        serial = (v - EXCEL_DAY0).total_seconds() / 86400
+        style = STYLE_DATE if v.time() == datetime.min.time() else STYLE_DATETIME
+        return f'<c r="{ref}" s="{style}"><v>{serial!r}</v></c>'
+    if kind == "d":
+        return f'<c r="{ref}" s="{STYLE_DATE}"><v>{(v - EXCEL_DAY0.date()).days}</v></c>'
+    return f'<c r="{ref}" t="b"><v>{int(v)}</v></c>'
+
+def sheet_name(name, taken=()):
+    """Nume valid de foaie: fără []:*?/\\, max. 31 caractere, unic în registru."""
+    base = _SHEET_NAME_BAD.sub("_", str(name)).strip("'")[:31] or "Foaie"
+    out, n = base, 1
+    while out.lower() in {t.lower() for t in taken}:
+        n += 1
+        out = f"{base[:31 - len(str(n)) - 1]}_{n}"
+    return out
+
+
+class Workbook:
+    """Registru XLSX scris în flux într-un fișier (cale sau obiect binar, ex. BytesIO)."""
+
+    def __init__(self, target):
+        self.zf = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED)
+        self.sheets = []        # (nume, fișier în zip), în ordinea din registru
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.zf.close()
+
+    def add_sheet(self, name, columns, rows, widths=None, index=None):
+        """Scrie o foaie: rândul de antet `columns` (înghețat) + `rows`. Întoarce numărul de rânduri de date.
+
+        `widths` = lățimile coloanelor (caractere); implicit după antet. `index` = poziția foii în registru.
+        """
+        name = sheet_name(name, [s for s, _ in self.sheets])
+        part = f"xl/worksheets/sheet{len(self.sheets) + 1}.xml"
+        letters = [column_letter(i) for i in range(len(columns))]
+        widths = widths or [max(len(str(c)) + 4, 12) for c in columns]
+        n = 0
+        with self.zf.open(part, "w") as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+            f.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">'
+                    '<sheetViews><sheetView workbookViewId="0">'
+                    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                    '</sheetView></sheetViews>')
+            if columns:
+                f.write("<cols>" + "".join(f'<col min="{i}" max="{i}" width="{min(w, MAX_COL_WIDTH)}" customWidth="1"/>'
+                                           for i, w in enumerate(widths, 1)) + "</cols>")
+            f.write('<sheetData><row r="1">' + "".join(
+                f'<c r="{c}1" t="inlineStr" s="{STYLE_HEADER}"><is><t>{_text(v)}</t></is></c>'
+                for c, v in zip(letters, columns)) + "</row>")
+            buf = []
+            for r, row in enumerate(rows, 2):
+                buf.append(f'<row r="{r}">' + "".join(_cell(f"{c}{r}", v) for c, v in zip(letters, row)) + "</row>")
+                n += 1
+                if len(buf) >= BUFFER_ROWS:
+                    f.write("".join(buf))
+                    buf.clear()
+            f.write("".join(buf) + "</sheetData></worksheet>")
+        self.sheets.insert(len(self.sheets) if index is None else index, (name, part))
+        return n
+
+    def close(self):
+        """Scrie părțile registrului (workbook, relații, stiluri, content types) și închide zip-ul."""
+        sheets = "".join(f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                         for i, (name, _) in enumerate(self.sheets, 1))
+        self.zf.writestr("xl/workbook.xml",
+                         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         f'<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><sheets>{sheets}</sheets></workbook>')
+        rels = "".join(f'<Relationship Id="rId{i}" Type="{NS_REL}/worksheet" Target="{part[3:]}"/>'
+                       for i, (_, part) in enumerate(self.sheets, 1))
+        rels += f'<Relationship Id="rId{len(self.sheets) + 1}" Type="{NS_REL}/styles" Target="styles.xml"/>'
+        self.zf.writestr("xl/_rels/workbook.xml.rels",
+                         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         f'<Relationships xmlns="{NS_PKG_REL}">{rels}</Relationships>')
+        self.zf.writestr("xl/styles.xml", _STYLES)
+        self.zf.writestr("_rels/.rels",
+                         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         f'<Relationships xmlns="{NS_PKG_REL}">'
+                         f'<Relationship Id="rId1" Type="{NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+                         '</Relationships>')
+        overrides = "".join(f'<Override PartName="/{part}" ContentType="{CT_PREFIX}.worksheet+xml"/>' for _, part in self.sheets)
+        self.zf.writestr("[Content_Types].xml",
+                         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                         '<Default Extension="xml" ContentType="application/xml"/>'
+                         f'<Override PartName="/xl/workbook.xml" ContentType="{CT_PREFIX}.sheet.main+xml"/>'
+                         f'<Override PartName="/xl/styles.xml" ContentType="{CT_PREFIX}.styles+xml"/>'
+                         f'{overrides}</Types>')
+        self.zf.close()